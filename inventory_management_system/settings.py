@@ -147,4 +147,47 @@ AUTHENTICATION_BACKENDS = [
     "allauth.account.auth_backends.AuthenticationBackend",
 ]
 LOGIN_REDIRECT_URL = "/"   # redirect after login
-LOGOUT_REDIRECT_URL = "/"  
\ No newline at end of file
+LOGOUT_REDIRECT_URL = "/"  
+
+# Background export jobs (see mainapp/jobs.py and `manage.py export_worker`).
+EXPORT_JOB_CONCURRENCY = 2
+EXPORT_JOB_PER_USER_LIMIT = 3
+EXPORT_JOB_MAX_ATTEMPTS = 3
+EXPORT_JOB_TIMEOUT = 30 * 60  # seconds before a running job counts as stale
+EXPORT_JOB_TTL = 24 * 60 * 60  # seconds a finished export stays downloadable
+
+# Rendered export files, reused while the source tables are unchanged.
+EXPORT_CACHE_DIR = BASE_DIR / "export_cache"
+EXPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Reference numbers each process reserves at a time (see mainapp/references.py).
+# Larger blocks mean fewer writes to the sequence row but leave gaps on restart.
+REFERENCE_BLOCK_SIZE = 10
+
+# Seconds that new stock snapshots trail behind "now" (see mainapp/stock.py).
+STOCK_SNAPSHOT_LAG = 5 * 60
+
+# Purchase orders post five fields per line and bulk receive one field per
+# purchase; Django's default of 1000 fields would cap both well below their
+# own limits.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
+# Typeahead indexes with more rows than this are rebuilt in the background
+# after a change, the previous one answering meanwhile (see mainapp/typeahead.py).
+TYPEAHEAD_SYNC_REBUILD_ROWS = 20000
+
+# Scanned products are cached by SKU (see mainapp/scans.py). LocMemCache is
+# per process: with several workers, point "scans" at a shared backend such
+# as django.core.cache.backends.redis.RedisCache, so a product change drops
+# the cached entry for every worker.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "scans": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "scans",
+        # Two entries per product.
+        "OPTIONS": {"MAX_ENTRIES": 500_000},
+    },
+}
+SCAN_CACHE = "scans"
+SCAN_CACHE_TTL = 5 * 60  # seconds a cached scan may trail a racing change
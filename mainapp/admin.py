@@ -1,3 +1,63 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
+from . import repricing
+from .models import Purchase, Quotation, RepricingRun
 
 # Register your models here.
+
+# Larger selections should go through `manage.py reprice`, which runs in
+# resumable chunks instead of inside one admin request.
+REPRICE_ADMIN_LIMIT = 5000
+
+
+@admin.action(description="Recalculate totals of the selected rows")
+def reprice_selected(modeladmin, request, queryset):
+    pks = list(queryset.values_list("pk", flat=True)[: REPRICE_ADMIN_LIMIT + 1])
+    if len(pks) > REPRICE_ADMIN_LIMIT:
+        modeladmin.message_user(
+            request,
+            f"At most {REPRICE_ADMIN_LIMIT} rows can be repriced here; "
+            "use `manage.py reprice` for larger sets.",
+            messages.ERROR,
+        )
+        return
+    entity = modeladmin.repricing_entity
+    run = repricing.resume(repricing.start(entity, {"pk__in": pks}))
+    modeladmin.message_user(
+        request,
+        f"Repriced {run.seen} {entity}, {run.changed} changed.",
+        messages.SUCCESS,
+    )
+
+
+@admin.register(Purchase)
+class PurchaseAdmin(admin.ModelAdmin):
+    list_display = [
+        "reference",
+        "supplier",
+        "purchase_date",
+        "tax_rate",
+        "tax_amount",
+        "line_total",
+        "payment_status",
+    ]
+    list_filter = ["status", "payment_status", "purchase_date"]
+    search_fields = ["reference"]
+    actions = [reprice_selected]
+    repricing_entity = RepricingRun.EntityChoices.PURCHASES
+
+
+@admin.register(Quotation)
+class QuotationAdmin(admin.ModelAdmin):
+    list_display = ["reference", "customer", "status", "line_count", "grand_total"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["reference"]
+    actions = [reprice_selected]
+    repricing_entity = RepricingRun.EntityChoices.QUOTATIONS
+
+
+@admin.register(RepricingRun)
+class RepricingRunAdmin(admin.ModelAdmin):
+    list_display = ["pk", "entity", "status", "seen", "total", "changed", "created_at"]
+    list_filter = ["entity", "status"]
+    readonly_fields = [field.name for field in RepricingRun._meta.fields]
@@ -0,0 +1,220 @@
+import io
+import random
+import time
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from . import scans
+from .exports import EXPORTS, DataExporter
+from .models import Category, Product, SubCategory
+from .pricing import compute_purchase_totals, from_cents, price_purchase_columns
+
+
+# One timed step: ``count`` rows (or lookups) in ``seconds``.
+Result = namedtuple("Result", ["label", "count", "seconds"])
+
+# name -> (function, default row count, default time budget in seconds)
+BENCHMARKS = {}
+
+
+def register(name, rows, budget=None):
+    def decorator(function):
+        BENCHMARKS[name] = (function, rows, budget)
+        return function
+
+    return decorator
+
+
+def timed(label, count, call):
+    started = time.perf_counter()
+    call()
+    return Result(label, count, time.perf_counter() - started)
+
+
+def seed_products(count):
+    """Insert ``count`` products, every other one in a subcategory so the
+    exports follow both joins."""
+    category = Category.objects.create(name="Benchmark", code="benchmark-category")
+    sub_category = SubCategory.objects.create(
+        name="Benchmark", code="benchmark-subcategory", category=category
+    )
+    return Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Benchmark product {number}",
+                sku=f"BENCH-{number:07d}",
+                unit="pcs",
+                price=number % 1000,
+                quantity=number % 50,
+                sub_category=sub_category if number % 2 else None,
+            )
+            for number in range(count)
+        ],
+        batch_size=5000,
+    )
+
+
+def run(name, rows):
+    """Run benchmark ``name`` on ``rows`` generated rows.
+
+    Returns its :class:`Result` list: the first one times the code under
+    test, any others are baselines to compare it with. The rows are
+    written in a transaction that is rolled back, but on SQLite that
+    transaction holds the write lock until the benchmark ends, so run it
+    against a copy of a busy database.
+    """
+    function = BENCHMARKS[name][0]
+    with transaction.atomic():
+        results = function(rows)
+        transaction.set_rollback(True)
+    return results
+
+
+def _getattr_rows(queryset, fields):
+    # DataExporter.rows before it read values_list() tuples: model
+    # instances, with every dotted path split again for every cell.
+    for obj in queryset.iterator(chunk_size=DataExporter.CHUNK_SIZE):
+        row = []
+        for field_name, _ in fields:
+            value = obj
+            for attr in field_name.split("."):
+                value = getattr(value, attr, "")
+                if value is None:
+                    value = ""
+            row.append(str(value))
+        yield row
+
+
+@register("pdf", rows=100_000, budget=60)
+def pdf_export(rows):
+    """The products PDF export, from the queryset to the finished file."""
+    seed_products(rows)
+    spec = EXPORTS["products", "pdf"]
+    output = io.BytesIO()
+    return [
+        timed(
+            f"products PDF, {DataExporter.PDF_WORKERS} worker(s)",
+            rows,
+            lambda: DataExporter.write_pdf(
+                spec["queryset"](), spec["fields"], spec["title"], output
+            ),
+        )
+    ]
+
+
+@register("export-rows", rows=100_000)
+def export_rows(rows):
+    """Row extraction of the products Excel export (eleven fields, two of
+    them through joins) against the getattr chain it replaced. Raises
+    ``RuntimeError`` if the two disagree on any row."""
+    seed_products(rows)
+    spec = EXPORTS["products", "excel"]
+    extracted = {}
+
+    def extract(name, function):
+        def call():
+            extracted[name] = list(function(spec["queryset"](), spec["fields"]))
+
+        return call
+
+    results = [
+        timed("values_list rows", rows, extract("new", DataExporter.rows)),
+        timed("getattr chain (before)", rows, extract("old", _getattr_rows)),
+    ]
+    if extracted["new"] != extracted["old"]:
+        raise RuntimeError("The two extractions returned different rows.")
+    return results
+
+
+@register("pricing", rows=1_000_000)
+def pricing(rows, chunk_size=100_000):
+    """:func:`mainapp.pricing.price_purchase_columns` against
+    :func:`mainapp.pricing.compute_purchase_totals` line by line, on random
+    lines priced in chunks so the Decimal copies stay small. Raises
+    ``RuntimeError`` on the first line where they differ."""
+    rnd = random.Random(0)
+    column_seconds = scalar_seconds = 0.0
+    for start in range(0, rows, chunk_size):
+        count = min(chunk_size, rows - start)
+        quantities = [rnd.randint(0, 500) for _ in range(count)]
+        unit_prices = [rnd.randint(0, 999_999) for _ in range(count)]
+        discounts = [rnd.randint(0, 10_000) for _ in range(count)]
+        tax_rates = [rnd.randint(0, 3_000) for _ in range(count)]
+        decimals = [
+            [from_cents(value) for value in column]
+            for column in (unit_prices, discounts, tax_rates)
+        ]
+
+        started = time.perf_counter()
+        columns = price_purchase_columns(quantities, unit_prices, discounts, tax_rates)
+        column_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        scalar = list(map(compute_purchase_totals, quantities, *decimals))
+        scalar_seconds += time.perf_counter() - started
+
+        for line, expected in enumerate(scalar):
+            got = tuple(from_cents(column[line]) for column in columns)
+            if got != expected or list(map(str, got)) != list(map(str, expected)):
+                raise RuntimeError(
+                    f"Line {start + line}: columns gave {got}, compute_purchase_totals "
+                    f"{expected}."
+                )
+    return [
+        Result("integer columns", rows, column_seconds),
+        Result("Decimal per line (before)", rows, scalar_seconds),
+    ]
+
+
+@register("scans", rows=200_000)
+def scan_lookups(rows, lookups=5000, batch_size=500):
+    """The SKU scan endpoints, requested in-process the way a handheld
+    would, as a throwaway user, against one ORM query per scan. Raises
+    ``RuntimeError`` if a scanned SKU is not found."""
+    products = seed_products(rows)
+    rnd = random.Random(0)
+    skus = [product.sku for product in rnd.choices(products, k=lookups)]
+    batches = [skus[start : start + batch_size] for start in range(0, lookups, batch_size)]
+    user = get_user_model().objects.create_user("scan-benchmark", "scan-benchmark@example.com")
+    client = Client()
+    client.force_login(user)
+
+    def batch_scans():
+        for batch in batches:
+            response = client.get(reverse("scan_batch"), {"sku": batch})
+            if response.status_code != 200 or None in response.json()["results"]:
+                raise RuntimeError(f"Batch scan failed: HTTP {response.status_code}")
+
+    def single_scans():
+        for sku in skus:
+            response = client.get(reverse("scan"), {"sku": sku})
+            if response.status_code != 200:
+                raise RuntimeError(f"Scan of {sku} failed: HTTP {response.status_code}")
+
+    def orm_scans():
+        for sku in skus:
+            Product.objects.filter(sku=sku).values_list(
+                "pk", "sku", "name", "price", "quantity"
+            ).first()
+
+    def lookup_calls():
+        for sku in skus:
+            scans.lookup([sku])
+
+    label = f"batch endpoint, {batch_size} per request"
+    try:
+        cold = timed(f"{label} (cold cache)", lookups, batch_scans)
+        return [
+            timed(label, lookups, batch_scans),
+            cold,
+            timed("single scan endpoint", lookups, single_scans),
+            timed("scans.lookup, one SKU per call", lookups, lookup_calls),
+            timed("one ORM query per scan (before)", lookups, orm_scans),
+        ]
+    finally:
+        # The products are rolled back; their cached scans go with them.
+        scans.forget(product.pk for product in products)
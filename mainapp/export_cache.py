@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+
+def data_version(models):
+    """Return a stamp that changes whenever rows of ``models`` change.
+
+    ``MAX(updated_at)`` catches inserts and edits, the row count catches
+    deletes.
+    """
+    parts = []
+    for model in models:
+        stamp = model.objects.aggregate(last=Max("updated_at"), rows=Count("pk"))
+        last = stamp["last"].isoformat() if stamp["last"] else ""
+        parts.append(f"{model._meta.label}:{last}:{stamp['rows']}")
+    return "|".join(parts)
+
+
+class ExportCache:
+    """Disk cache for rendered export files with LRU eviction by total size.
+
+    Entries are plain files named after a hash of the export definition and
+    the data version, so a stale entry is simply never looked up again and
+    ages out. A file's mtime doubles as its last-access time.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, entity, fmt, spec, version, extension):
+        payload = json.dumps(
+            [entity, fmt, spec["title"], [list(f) for f in spec["fields"]], version]
+        )
+        digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+        return f"{entity}-{fmt}-{digest}.{extension}"
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return the cached file opened for reading, or None on a miss."""
+        path = self.path(key)
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return handle
+
+    def writer(self, key):
+        """Return an open temporary file; pass it to :meth:`commit` or
+        :meth:`discard` when done."""
+        os.makedirs(self.directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=f".{key}.", suffix=".part", delete=False
+        )
+
+    def commit(self, key, handle):
+        """Publish a finished writer under ``key`` and return it opened for
+        reading. The file is opened before eviction runs, so it stays
+        readable even if it is evicted straight away."""
+        handle.close()
+        path = self.path(key)
+        os.replace(handle.name, path)
+        cached = open(path, "rb")
+        self.evict()
+        return cached
+
+    def discard(self, handle):
+        handle.close()
+        if os.path.exists(handle.name):
+            os.remove(handle.name)
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+export_cache = ExportCache(
+    getattr(settings, "EXPORT_CACHE_DIR", settings.BASE_DIR / "export_cache"),
+    getattr(settings, "EXPORT_CACHE_MAX_BYTES", 500 * 1024 * 1024),
+)
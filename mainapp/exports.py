@@ -0,0 +1,477 @@
+import csv
+import io
+import os
+import shutil
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from .export_cache import data_version, export_cache
+from .models import (
+    Category,
+    Customer,
+    Expense,
+    Product,
+    Purchase,
+    Quotation,
+    SubCategory,
+    Supplier,
+)
+from .pdf import ChunkedPdfBuilder
+from .xlsx import XlsxStreamWriter
+
+
+CATEGORY_FIELDS = [
+    ("id", "Category ID"),
+    ("name", "Category Name"),
+    ("code", "Category Code"),
+]
+
+PRODUCT_FIELDS = [
+    ("id", "Product ID"),
+    ("name", "Product Name"),
+    ("sku", "SKU"),
+    ("sub_category.category.name", "Category"),
+    ("sub_category.name", "Sub Category"),
+    ("unit", "Unit"),
+    ("quantity", "Quantity"),
+    ("price", "Price"),
+    ("discount_percentage", "Discount %"),
+    ("status", "Status"),
+]
+
+SUBCATEGORY_FIELDS = [
+    ("id", "Sub Category ID"),
+    ("name", "Sub Category Name"),
+    ("code", "Sub Category Code"),
+    ("category.name", "Parent Category"),
+    ("description", "Description"),
+]
+
+CUSTOMER_FIELDS = [
+    ("id", "Customer ID"),
+    ("name", "Name"),
+    ("email", "Email"),
+    ("phone", "Phone"),
+    ("country", "Country"),
+    ("city", "City"),
+    ("address", "Address"),
+    ("description", "Description"),
+]
+
+SUPPLIER_FIELDS = [
+    ("id", "Supplier ID"),
+    ("name", "Name"),
+    ("email", "Email"),
+    ("phone", "Phone"),
+    ("country", "Country"),
+    ("city", "City"),
+    ("address", "Address"),
+    ("description", "Description"),
+]
+
+EXPENSE_FIELDS = [
+    ("id", "Expense ID"),
+    ("expense_category.name", "Category"),
+    ("date", "Date"),
+    ("amount", "Amount"),
+    ("reference", "Reference"),
+    ("expense_for", "Expense For"),
+    ("description", "Description"),
+]
+
+QUOTATION_FIELDS = [
+    ("id", "Quotation ID"),
+    ("reference", "Reference"),
+    ("customer.name", "Customer"),
+    ("line_count", "Lines"),
+    ("subtotal", "Subtotal"),
+    ("discount_amount", "Discount"),
+    ("tax_amount", "Tax"),
+    ("grand_total", "Grand Total"),
+    ("status", "Status"),
+    ("created_at", "Created At"),
+]
+
+PURCHASE_FIELDS = [
+    ("id", "Purchase ID"),
+    ("reference", "Reference"),
+    ("supplier.name", "Supplier"),
+    ("product.name", "Product"),
+    ("purchase_date", "Purchase Date"),
+    ("quantity", "Quantity"),
+    ("unit_price", "Unit Price"),
+    ("discount", "Discount %"),
+    ("tax_rate", "Tax %"),
+    ("tax_amount", "Tax Amount"),
+    ("line_total", "Line Total"),
+    ("status", "Status"),
+    ("payment_status", "Payment Status"),
+    ("paid_amount", "Paid Amount"),
+]
+
+
+def _categories():
+    return Category.objects.all().order_by("-created_at")
+
+
+def _products():
+    return (
+        Product.objects.select_related("sub_category", "sub_category__category")
+        .all()
+        .order_by("-created_at")
+    )
+
+
+def _subcategories():
+    return SubCategory.objects.select_related("category").all().order_by("-created_at")
+
+
+# (entity, format) -> export definition. "queryset" is a callable so every
+# export starts from a fresh queryset; "sources" are the models whose
+# changes invalidate cached copies of the export.
+EXPORTS = {
+    ("categories", "pdf"): {
+        "queryset": _categories,
+        "sources": [Category],
+        "fields": CATEGORY_FIELDS,
+        "title": "Categories Report",
+        "filename_prefix": "categories",
+    },
+    ("categories", "excel"): {
+        "queryset": _categories,
+        "sources": [Category],
+        "fields": CATEGORY_FIELDS,
+        "title": "Categories",
+        "filename_prefix": "categories",
+    },
+    ("products", "pdf"): {
+        "queryset": _products,
+        "sources": [Product, SubCategory, Category],
+        "fields": PRODUCT_FIELDS,
+        "title": "Products Report",
+        "filename_prefix": "products",
+    },
+    ("products", "excel"): {
+        "queryset": _products,
+        "sources": [Product, SubCategory, Category],
+        "fields": PRODUCT_FIELDS + [("description", "Description")],
+        "title": "Products",
+        "filename_prefix": "products",
+    },
+    ("subcategories", "pdf"): {
+        "queryset": _subcategories,
+        "sources": [SubCategory, Category],
+        "fields": SUBCATEGORY_FIELDS,
+        "title": "Sub Categories Report",
+        "filename_prefix": "subcategories",
+    },
+    ("subcategories", "excel"): {
+        "queryset": _subcategories,
+        "sources": [SubCategory, Category],
+        "fields": SUBCATEGORY_FIELDS,
+        "title": "Sub Categories",
+        "filename_prefix": "subcategories",
+    },
+}
+
+# entity -> machine-readable feed definition, served as CSV or JSON Lines.
+# Feeds read plain column tuples through values_list(), so the querysets
+# need no select_related(); joins come from the dotted field paths.
+FEEDS = {
+    "products": {
+        "queryset": lambda: Product.objects.with_pricing().order_by("id"),
+        "fields": PRODUCT_FIELDS
+        + [
+            ("discounted_price", "Discounted Price"),
+            ("line_value", "Line Value"),
+            ("stock_value", "Stock Value"),
+            ("description", "Description"),
+        ],
+        "filename_prefix": "products",
+        "keys": {"created": "created_at", "name": "name"},
+    },
+    "customers": {
+        "queryset": lambda: Customer.objects.order_by("id"),
+        "fields": CUSTOMER_FIELDS,
+        "filename_prefix": "customers",
+        "keys": {"created": "created_at", "name": "name"},
+    },
+    "suppliers": {
+        "queryset": lambda: Supplier.objects.order_by("id"),
+        "fields": SUPPLIER_FIELDS,
+        "filename_prefix": "suppliers",
+        "keys": {"created": "created_at", "name": "name"},
+    },
+    "expenses": {
+        "queryset": lambda: Expense.objects.order_by("id"),
+        "fields": EXPENSE_FIELDS,
+        "filename_prefix": "expenses",
+        "keys": {"created": "created_at", "name": "reference"},
+    },
+    "quotations": {
+        "queryset": lambda: Quotation.objects.order_by("id"),
+        "fields": QUOTATION_FIELDS,
+        "filename_prefix": "quotations",
+        "keys": {"created": "created_at", "name": "reference"},
+    },
+    "purchases": {
+        "queryset": lambda: Purchase.objects.order_by("id"),
+        "fields": PURCHASE_FIELDS,
+        "filename_prefix": "purchases",
+        "keys": {"created": "created_at", "name": "reference"},
+    },
+}
+
+EXTENSIONS = {"pdf": "pdf", "excel": "xlsx", "csv": "csv", "jsonl": "jsonl"}
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def lookups(fields):
+    """Turn dotted field paths into ORM lookups for values_list()."""
+    return [field_name.replace(".", "__") for field_name, _ in fields]
+
+
+def is_column(model, field_name):
+    """Whether ``field_name`` follows forward relations to a concrete,
+    non-relational column, i.e. can be fetched with values_list()."""
+    parts = field_name.split(".")
+    for part in parts[:-1]:
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return False
+        model = field.related_model
+    try:
+        field = model._meta.get_field(parts[-1])
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and not field.is_relation
+
+
+def accessor(field_name):
+    """Compile a dotted attribute path into a getter returning "" for any
+    missing or ``None`` link in the chain."""
+    attrs = tuple(field_name.split("."))
+
+    def get(obj):
+        for attr in attrs:
+            obj = getattr(obj, attr, "")
+            if obj is None:
+                return ""
+        return obj
+
+    return get
+
+
+class DataExporter:
+    CHUNK_SIZE = 2000
+    PDF_WORKERS = min(4, os.cpu_count() or 1)
+
+    @staticmethod
+    def rows(queryset, fields):
+        """Yield each object as a list of strings, ``None`` rendered as "".
+
+        When every dotted path ends in a database column (or names an
+        annotation on ``queryset``) the rows are read
+        as tuples through values_list(), skipping model instances entirely.
+        Otherwise (properties, related objects) the paths are compiled once
+        into accessors instead of being re-split for every cell.
+        """
+        if all(
+            field_name in queryset.query.annotations
+            or is_column(queryset.model, field_name)
+            for field_name, _ in fields
+        ):
+            values = queryset.values_list(*lookups(fields))
+            for row in values.iterator(chunk_size=DataExporter.CHUNK_SIZE):
+                yield ["" if value is None else str(value) for value in row]
+            return
+
+        getters = [accessor(field_name) for field_name, _ in fields]
+        for obj in queryset.iterator(chunk_size=DataExporter.CHUNK_SIZE):
+            yield [str(get(obj)) for get in getters]
+
+    @staticmethod
+    def footer():
+        generated_on = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return lambda count: f"Generated on: {generated_on} | Total Records: {count}"
+
+    @staticmethod
+    def filename(filename_prefix, fmt):
+        return f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXTENSIONS[fmt]}"
+
+    @staticmethod
+    def write_pdf(queryset, fields, title, output):
+        headers = [display_name for _, display_name in fields]
+        builder = ChunkedPdfBuilder(title, headers, workers=DataExporter.PDF_WORKERS)
+        builder.build(
+            DataExporter.rows(queryset, fields), output, footer=DataExporter.footer()
+        )
+
+    @staticmethod
+    def iter_excel(queryset, fields, title):
+        headers = [display_name for _, display_name in fields]
+        writer = XlsxStreamWriter(title, headers, width_sample=DataExporter.CHUNK_SIZE)
+        return writer.iter_bytes(
+            DataExporter.rows(queryset, fields), footer=DataExporter.footer()
+        )
+
+    FLUSH_SIZE = 64 * 1024
+
+    @staticmethod
+    def iter_csv(queryset, fields):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([display_name for _, display_name in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+        values = queryset.values_list(*lookups(fields))
+        for row in values.iterator(chunk_size=DataExporter.CHUNK_SIZE):
+            writer.writerow(row)
+            if buffer.tell() >= DataExporter.FLUSH_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    @staticmethod
+    def iter_jsonl(queryset, fields):
+        keys = [field_name for field_name, _ in fields]
+        encode = DjangoJSONEncoder().encode
+        lines = []
+        size = 0
+        values = queryset.values_list(*lookups(fields))
+        for row in values.iterator(chunk_size=DataExporter.CHUNK_SIZE):
+            line = encode(dict(zip(keys, row)))
+            lines.append(line)
+            size += len(line)
+            if size >= DataExporter.FLUSH_SIZE:
+                lines.append("")
+                yield "\n".join(lines).encode()
+                lines = []
+                size = 0
+        if lines:
+            lines.append("")
+            yield "\n".join(lines).encode()
+
+    @staticmethod
+    def export_feed(entity, fmt):
+        spec = FEEDS[entity]
+        iterate = DataExporter.iter_csv if fmt == "csv" else DataExporter.iter_jsonl
+        response = StreamingHttpResponse(
+            iterate(spec["queryset"](), spec["fields"]),
+            content_type=CONTENT_TYPES[fmt],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{DataExporter.filename(spec["filename_prefix"], fmt)}"'
+        )
+        return response
+
+    @staticmethod
+    def export_to_pdf(queryset, fields, title, filename_prefix):
+        response = HttpResponse(content_type=CONTENT_TYPES["pdf"])
+        response["Content-Disposition"] = (
+            f'attachment; filename="{DataExporter.filename(filename_prefix, "pdf")}"'
+        )
+        DataExporter.write_pdf(queryset, fields, title, response)
+        return response
+
+    @staticmethod
+    def export_to_excel(queryset, fields, title, filename_prefix):
+        response = StreamingHttpResponse(
+            DataExporter.iter_excel(queryset, fields, title),
+            content_type=CONTENT_TYPES["excel"],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{DataExporter.filename(filename_prefix, "excel")}"'
+        )
+        return response
+
+    @staticmethod
+    def cache_key(entity, fmt):
+        spec = EXPORTS[entity, fmt]
+        version = data_version(spec["sources"])
+        return export_cache.key(entity, fmt, spec, version, EXTENSIONS[fmt])
+
+    @staticmethod
+    def _cache_stream(key, chunks):
+        handle = export_cache.writer(key)
+        try:
+            for chunk in chunks:
+                handle.write(chunk)
+                yield chunk
+        except BaseException:
+            export_cache.discard(handle)
+            raise
+        export_cache.commit(key, handle).close()
+
+    @staticmethod
+    def _render_cached(entity, fmt, key):
+        spec = EXPORTS[entity, fmt]
+        handle = export_cache.writer(key)
+        try:
+            if fmt == "pdf":
+                DataExporter.write_pdf(
+                    spec["queryset"](), spec["fields"], spec["title"], handle
+                )
+            else:
+                for chunk in DataExporter.iter_excel(
+                    spec["queryset"](), spec["fields"], spec["title"]
+                ):
+                    handle.write(chunk)
+        except BaseException:
+            export_cache.discard(handle)
+            raise
+        return export_cache.commit(key, handle)
+
+    @staticmethod
+    def export(entity, fmt):
+        """Serve the ``(entity, fmt)`` export, from the cache when the source
+        tables have not changed since it was last rendered."""
+        spec = EXPORTS[entity, fmt]
+        filename = DataExporter.filename(spec["filename_prefix"], fmt)
+        key = DataExporter.cache_key(entity, fmt)
+        cached = export_cache.get(key)
+
+        if cached is None and fmt == "excel":
+            response = StreamingHttpResponse(
+                DataExporter._cache_stream(
+                    key,
+                    DataExporter.iter_excel(
+                        spec["queryset"](), spec["fields"], spec["title"]
+                    ),
+                ),
+                content_type=CONTENT_TYPES[fmt],
+            )
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        if cached is None:
+            cached = DataExporter._render_cached(entity, fmt, key)
+        return FileResponse(
+            cached,
+            as_attachment=True,
+            filename=filename,
+            content_type=CONTENT_TYPES[fmt],
+        )
+
+    @staticmethod
+    def write(entity, fmt, output):
+        """Render the ``(entity, fmt)`` export into the binary file ``output``."""
+        key = DataExporter.cache_key(entity, fmt)
+        cached = export_cache.get(key) or DataExporter._render_cached(entity, fmt, key)
+        with cached:
+            shutil.copyfileobj(cached, output)
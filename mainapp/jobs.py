@@ -0,0 +1,203 @@
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .exports import EXPORTS, DataExporter
+from .models import ExportJob
+
+
+CONCURRENCY = getattr(settings, "EXPORT_JOB_CONCURRENCY", 2)
+PER_USER_LIMIT = getattr(settings, "EXPORT_JOB_PER_USER_LIMIT", 3)
+MAX_ATTEMPTS = getattr(settings, "EXPORT_JOB_MAX_ATTEMPTS", 3)
+RETRY_DELAY = getattr(settings, "EXPORT_JOB_RETRY_DELAY", 30)
+TIMEOUT = getattr(settings, "EXPORT_JOB_TIMEOUT", 30 * 60)
+TTL = getattr(settings, "EXPORT_JOB_TTL", 24 * 60 * 60)
+
+# Key of the PostgreSQL advisory lock held while claiming a job.
+CLAIM_LOCK = 0x6578706F7274  # "export"
+
+ACTIVE_STATUSES = [ExportJob.StatusChoices.QUEUED, ExportJob.StatusChoices.RUNNING]
+
+
+class ExportQueueFull(Exception):
+    pass
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(user, entity, fmt):
+    if (entity, fmt) not in EXPORTS:
+        raise KeyError((entity, fmt))
+
+    active = ExportJob.objects.filter(requested_by=user, status__in=ACTIVE_STATUSES)
+    existing = active.filter(entity=entity, format=fmt).first()
+    if existing:
+        return existing
+    if active.count() >= PER_USER_LIMIT:
+        raise ExportQueueFull(
+            f"You already have {PER_USER_LIMIT} exports in progress."
+        )
+    return ExportJob.objects.create(requested_by=user, entity=entity, format=fmt)
+
+
+def claim(name):
+    """Atomically move the next due job to RUNNING, or return None.
+
+    The claim is a single ``UPDATE ... WHERE pk = (SELECT ...) AND status =
+    'queued' AND (SELECT COUNT(*) ... 'running') < CONCURRENCY`` statement,
+    so several workers polling the same table never pick up the same job
+    or run more than ``CONCURRENCY`` jobs between them, and SQLite never
+    has to upgrade a read lock. SQLite runs one such statement at a time;
+    on PostgreSQL, where concurrent statements each count from their own
+    snapshot, claims are serialized with a transaction-level advisory lock.
+    """
+    now = timezone.now()
+    next_due = (
+        ExportJob.objects.filter(status=ExportJob.StatusChoices.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+        .values("pk")[:1]
+    )
+    running = (
+        ExportJob.objects.filter(status=ExportJob.StatusChoices.RUNNING)
+        .order_by()
+        .values("status")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CLAIM_LOCK])
+        claimed = (
+            ExportJob.objects.alias(running=Coalesce(Subquery(running), 0))
+            .filter(
+                pk=Subquery(next_due),
+                status=ExportJob.StatusChoices.QUEUED,
+                running__lt=CONCURRENCY,
+            )
+            .update(
+                status=ExportJob.StatusChoices.RUNNING,
+                worker=name,
+                attempts=F("attempts") + 1,
+                started_at=now,
+                updated_at=now,
+            )
+        )
+    if not claimed:
+        return None
+    return ExportJob.objects.filter(
+        worker=name, status=ExportJob.StatusChoices.RUNNING
+    ).first()
+
+
+def _fail(job, error):
+    now = timezone.now()
+    job.error = error
+    if job.attempts < MAX_ATTEMPTS:
+        job.status = ExportJob.StatusChoices.QUEUED
+        job.run_after = now + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+    else:
+        job.status = ExportJob.StatusChoices.FAILED
+        job.finished_at = now
+        job.expires_at = now + timedelta(seconds=TTL)
+    job.worker = ""
+    job.save()
+
+
+def run(job):
+    partial = None
+    try:
+        spec = EXPORTS[job.entity, job.format]
+        filename = DataExporter.filename(spec["filename_prefix"], job.format)
+        name = f"exports/{job.pk}/{filename}"
+        path = default_storage.path(name)
+        partial = f"{path}.part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(partial, "wb") as output:
+            DataExporter.write(job.entity, job.format, output)
+        os.replace(partial, path)
+    except Exception:
+        if partial and os.path.exists(partial):
+            os.remove(partial)
+        _fail(job, traceback.format_exc())
+        return False
+
+    now = timezone.now()
+    job.status = ExportJob.StatusChoices.DONE
+    job.file.name = name
+    job.filename = filename
+    job.error = ""
+    job.finished_at = now
+    job.expires_at = now + timedelta(seconds=TTL)
+    job.save()
+    return True
+
+
+def requeue_stale():
+    """Retry or fail jobs whose worker died without reporting back."""
+    cutoff = timezone.now() - timedelta(seconds=TIMEOUT)
+    stale = ExportJob.objects.filter(
+        status=ExportJob.StatusChoices.RUNNING, started_at__lt=cutoff
+    )
+    count = 0
+    for job in stale:
+        _fail(job, f"Worker {job.worker} timed out.")
+        count += 1
+    return count
+
+
+def delete_file(job):
+    if job.file:
+        directory = os.path.dirname(job.file.path)
+        job.file.delete(save=False)
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+
+
+def cleanup():
+    """Delete expired jobs together with their files."""
+    expired = ExportJob.objects.filter(expires_at__lte=timezone.now())
+    count = 0
+    for job in expired.iterator():
+        delete_file(job)
+        job.delete()
+        count += 1
+    return count
+
+
+def work(name=None, poll_interval=2.0, once=False, cleanup_interval=300):
+    """Worker loop: claim and run jobs until stopped.
+
+    With ``once`` the loop exits as soon as there is nothing left to claim.
+    """
+    name = name or worker_name()
+    last_cleanup = None
+    while True:
+        close_old_connections()
+        if last_cleanup is None or time.monotonic() - last_cleanup >= cleanup_interval:
+            requeue_stale()
+            cleanup()
+            last_cleanup = time.monotonic()
+
+        try:
+            job = claim(name)
+        except OperationalError:
+            # The database is busy (e.g. SQLite write lock); try again later.
+            job = None
+        if job is not None:
+            run(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one of the performance-sensitive code paths on generated rows, "
+        "which are rolled back afterwards, and fail if it takes longer than "
+        "its time budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(benchmarks.BENCHMARKS))
+        parser.add_argument(
+            "--rows", type=int, help="Rows to generate (default: per benchmark)."
+        )
+        parser.add_argument(
+            "--budget",
+            type=float,
+            help="Seconds the code under test may take (default: per benchmark; 0 for none).",
+        )
+
+    def handle(self, *args, **options):
+        _, rows, budget = benchmarks.BENCHMARKS[options["name"]]
+        rows = options["rows"] or rows
+        if options["budget"] is not None:
+            budget = options["budget"] or None
+
+        try:
+            results = benchmarks.run(options["name"], rows)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        for label, count, seconds in results:
+            self.stdout.write(
+                f"{label}: {count:,} in {seconds:.2f}s ({count / max(seconds, 1e-9):,.0f}/s)"
+            )
+
+        measured = results[0]
+        if budget is not None and measured.seconds > budget:
+            raise CommandError(
+                f"{measured.label} took {measured.seconds:.2f}s, over the {budget:g}s budget."
+            )
+        if budget is not None:
+            self.stdout.write(self.style.SUCCESS(f"Within the {budget:g}s budget."))
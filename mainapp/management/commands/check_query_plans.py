@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp import query_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every hot page and data endpoint, capture EXPLAIN QUERY PLAN "
+        "for each SELECT it runs, and fail if any reads a table without an "
+        "index or sorts its whole result."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print every query with its plan, not only the problems.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = query_plans.check()
+        except (query_plans.UnsupportedBackend, RuntimeError) as exc:
+            raise CommandError(str(exc))
+
+        failures = 0
+        for label, sql, plan, problems in results:
+            if problems:
+                failures += 1
+            if problems or options["verbose_plans"]:
+                style = self.style.ERROR if problems else str
+                self.stdout.write(style(f"{label}: {sql}"))
+                for detail in plan:
+                    self.stdout.write(f"    {detail}")
+
+        paths = len({label for label, *_ in results})
+        if failures:
+            raise CommandError(
+                f"{failures} of {len(results)} queries on {paths} paths scan or sort "
+                "a whole table."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(results)} queries on {paths} paths use indexes.")
+        )
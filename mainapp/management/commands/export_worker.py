@@ -0,0 +1,75 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from mainapp import jobs
+
+
+def _work(poll_interval, once):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    jobs.work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = "Run background export workers that build queued export files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=jobs.CONCURRENCY,
+            help="Number of worker processes (default: EXPORT_JOB_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process every due job, then exit.",
+        )
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Only requeue stale jobs and delete expired ones, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            stale = jobs.requeue_stale()
+            expired = jobs.cleanup()
+            self.stdout.write(f"Requeued {stale} stale job(s), deleted {expired} expired job(s).")
+            return
+
+        workers = max(1, options["workers"])
+        if workers == 1:
+            jobs.work(poll_interval=options["poll_interval"], once=options["once"])
+            return
+
+        # Children must open their own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(
+                target=_work,
+                args=(options["poll_interval"], options["once"]),
+                daemon=False,
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {workers} export worker(s).")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily and monthly dashboard rollups from the source tables "
+        "(backfill, or repair after writes that bypassed the model signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "series",
+            nargs="*",
+            help=f"Series to rebuild (default: all of {', '.join(rollups.SERIES)}).",
+        )
+
+    def handle(self, *args, **options):
+        names = options["series"] or list(rollups.SERIES)
+        unknown = set(names) - rollups.SERIES.keys()
+        if unknown:
+            raise CommandError(f"Unknown series: {', '.join(sorted(unknown))}")
+        rollups.rebuild(names)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {', '.join(names)}."))
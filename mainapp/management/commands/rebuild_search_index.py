@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index from the source tables (backfill, "
+        "or repair after writes that bypassed the model signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "entities",
+            nargs="*",
+            help=f"Entities to re-index (default: all of {', '.join(search.ENTITIES)}).",
+        )
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError("Full-text search needs SQLite with FTS5.")
+        entities = options["entities"] or list(search.ENTITIES)
+        unknown = set(entities) - search.ENTITIES.keys()
+        if unknown:
+            raise CommandError(f"Unknown entities: {', '.join(sorted(unknown))}")
+        indexed = search.rebuild(entities)
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} rows of {', '.join(entities)}.")
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from mainapp import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the dashboard totals from the source tables and report any "
+        "drift. Run it periodically (e.g. hourly from cron)."
+    )
+
+    def handle(self, *args, **options):
+        drift = metrics.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Dashboard metrics are in sync."))
+            return
+        for name, difference in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(f"{name}: corrected by {difference}"))
@@ -0,0 +1,143 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from mainapp import repricing
+from mainapp.models import RepricingRun
+
+
+# entity -> (date lookup, party lookup, party option)
+FILTERS = {
+    RepricingRun.EntityChoices.PURCHASES: ("purchase_date", "supplier_id", "supplier"),
+    RepricingRun.EntityChoices.QUOTATIONS: ("created_at__date", "customer_id", "customer"),
+}
+
+
+def _percentage(value):
+    try:
+        rate = Decimal(value)
+    except InvalidOperation:
+        raise CommandError(f"Not a number: {value}")
+    if not 0 <= rate <= 100 or rate != rate.quantize(Decimal("0.01")):
+        raise CommandError(f"Rates are percentages between 0 and 100 with two places: {value}")
+    return rate
+
+
+def _date(value):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"Not a date (YYYY-MM-DD): {value}")
+    return day.isoformat()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate tax amounts, line totals, payment status (purchases) and "
+        "quotation totals in chunked transactions, optionally setting a new "
+        "discount or tax rate first. Interrupted runs continue with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "entity",
+            nargs="?",
+            choices=RepricingRun.EntityChoices.values,
+            help="What to reprice.",
+        )
+        parser.add_argument("--since", type=_date, help="Only rows dated on or after this day.")
+        parser.add_argument("--until", type=_date, help="Only rows dated on or before this day.")
+        parser.add_argument("--supplier", type=int, help="Only purchases of this supplier id.")
+        parser.add_argument("--customer", type=int, help="Only quotations of this customer id.")
+        parser.add_argument("--status", help="Only rows with this status.")
+        parser.add_argument(
+            "--discount",
+            type=_percentage,
+            help="Set this discount percentage on every matched row (quotations: every line).",
+        )
+        parser.add_argument(
+            "--tax-rate",
+            type=_percentage,
+            help="Set this tax percentage on every matched row (quotations: every line).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=repricing.CHUNK_SIZE,
+            help="Rows (quotations for quotations) per transaction.",
+        )
+        parser.add_argument(
+            "--resume",
+            nargs="?",
+            type=int,
+            const=0,
+            metavar="RUN_ID",
+            help="Continue an interrupted run (default: the most recent one).",
+        )
+        parser.add_argument(
+            "--list",
+            action="store_true",
+            help="List unfinished runs and exit.",
+        )
+
+    def handle(self, *args, **options):
+        unfinished = RepricingRun.objects.filter(status=RepricingRun.StatusChoices.RUNNING)
+        if options["list"]:
+            for run in unfinished:
+                self.stdout.write(
+                    f"{run.pk}: {run.entity} {run.filters or 'all rows'}, "
+                    f"{run.seen}/{run.total} done, started {run.created_at:%Y-%m-%d %H:%M}"
+                )
+            return
+
+        if options["resume"] is not None:
+            runs = unfinished.filter(pk=options["resume"]) if options["resume"] else unfinished
+            run = runs.first()
+            if run is None:
+                raise CommandError("No unfinished run to resume.")
+        else:
+            run = self._start(options)
+
+        started = time.monotonic()
+        first_seen = run.seen
+
+        def progress(run):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            share = f" ({run.seen / run.total:.1%})" if run.total else ""
+            self.stdout.write(
+                f"[run {run.pk}] {run.seen}/{run.total}{share} {run.entity}, "
+                f"{run.changed} changed, {(run.seen - first_seen) / elapsed:,.0f}/s"
+            )
+
+        repricing.resume(run, chunk_size=max(1, options["chunk_size"]), progress=progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Run {run.pk} done: {run.seen} {run.entity} checked, {run.changed} changed."
+            )
+        )
+
+    def _start(self, options):
+        entity = options["entity"]
+        if entity is None:
+            raise CommandError("Name what to reprice (purchases or quotations), or use --resume.")
+        date_field, party_field, party_option = FILTERS[entity]
+        other = "customer" if party_option == "supplier" else "supplier"
+        if options[other] is not None:
+            raise CommandError(f"--{other} does not apply to {entity}.")
+
+        filters = {}
+        if options["since"]:
+            filters[f"{date_field}__gte"] = options["since"]
+        if options["until"]:
+            filters[f"{date_field}__lte"] = options["until"]
+        if options[party_option] is not None:
+            filters[party_field] = options[party_option]
+        if options["status"]:
+            filters["status"] = options["status"]
+        return repricing.start(
+            entity,
+            filters,
+            discount=options["discount"],
+            tax_rate=options["tax_rate"],
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from mainapp import stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Write stock snapshots for products that moved since their last one. "
+        "Run it periodically (e.g. nightly from cron) to keep point-in-time "
+        "stock lookups short."
+    )
+
+    def handle(self, *args, **options):
+        written = stock.take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshots."))
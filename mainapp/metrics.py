@@ -0,0 +1,135 @@
+import threading
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Customer, DashboardMetrics, Expense, Product, Purchase, Supplier
+
+
+ROW_PK = 1
+CENT = Decimal("0.01")
+
+# Totals that are row counts, and totals that sum a column.
+COUNTS = {
+    Customer: "total_customers",
+    Supplier: "total_suppliers",
+    Product: "total_products",
+}
+SUMS = {
+    Purchase: ("total_purchases", "line_total"),
+    Expense: ("total_expenses", "amount"),
+}
+
+_local = threading.local()
+
+
+def metric_name(model):
+    return COUNTS[model] if model in COUNTS else SUMS[model][0]
+
+
+def compute(models=None):
+    """Aggregate the totals for ``models`` (default: all) from scratch."""
+    values = {}
+    for model in models or [*COUNTS, *SUMS]:
+        if model in COUNTS:
+            values[COUNTS[model]] = model.objects.count()
+        else:
+            name, field = SUMS[model]
+            total = model.objects.aggregate(total=Sum(field))["total"] or 0
+            # SQLite sums decimals as floats; keep the stored precision.
+            values[name] = Decimal(total).quantize(CENT, rounding=ROUND_HALF_UP)
+    return values
+
+
+def refresh(models=None):
+    """Recompute the totals for ``models`` and store them.
+
+    Returns ``{name: drift}`` for every total that was off. The summary row
+    is locked before aggregating, so deltas from concurrent writers either
+    land in the aggregate or are applied after it, never lost.
+    """
+    with transaction.atomic():
+        row, created = DashboardMetrics.objects.select_for_update().get_or_create(
+            pk=ROW_PK
+        )
+        fresh = compute(models)
+        drift = {}
+        for name, value in fresh.items():
+            if not created and getattr(row, name) != value:
+                drift[name] = value - getattr(row, name)
+            setattr(row, name, value)
+        if models is None:
+            row.reconciled_at = timezone.now()
+        row.save()
+    return drift
+
+
+def reconcile():
+    return refresh()
+
+
+def current():
+    """Return the summary row, building it on first use."""
+    row = DashboardMetrics.objects.filter(pk=ROW_PK).first()
+    if row is None:
+        refresh()
+        row = DashboardMetrics.objects.get(pk=ROW_PK)
+    return row
+
+
+def suspended(model):
+    return model in getattr(_local, "bulk", ())
+
+
+def changed(model, delta):
+    """Add ``delta`` to the total kept for ``model`` (one row for counts,
+    an amount for sums) in a single ``UPDATE ... SET x = x + delta``."""
+    if not delta or suspended(model):
+        return
+    name = metric_name(model)
+    updated = DashboardMetrics.objects.filter(pk=ROW_PK).update(
+        **{name: F(name) + delta}, updated_at=timezone.now()
+    )
+    if not updated:
+        refresh()
+
+
+@contextmanager
+def suspend(*models):
+    """Skip per-row deltas for ``models`` inside the block. The caller is
+    responsible for applying the net change itself."""
+    previous = getattr(_local, "bulk", frozenset())
+    _local.bulk = previous | set(models)
+    try:
+        yield previous
+    finally:
+        _local.bulk = previous
+
+
+@contextmanager
+def bulk(*models):
+    """Hook for writes that bypass model signals.
+
+    ``bulk_create()``, ``bulk_update()`` and ``QuerySet.update()`` send no
+    signals, and a large ``QuerySet.delete()`` would apply one delta per
+    row. Wrap them in ``with metrics.bulk(Model, ...)``: per-row deltas for
+    those models are skipped inside the block, their totals and rollups
+    (see ``mainapp.rollups``) are recomputed once on the way out, and the
+    row counts of their tables (see ``mainapp.tables``) are invalidated.
+    """
+    with suspend(*models) as previous:
+        yield
+    pending = [model for model in models if model not in previous]
+    counted = [model for model in pending if model in COUNTS or model in SUMS]
+    if counted:
+        refresh(counted)
+
+    from . import rollups, tables
+
+    series = [rollups.MODELS[model] for model in pending if model in rollups.MODELS]
+    if series:
+        rollups.rebuild(series)
+    tables.changed(*(model for model in pending if model in tables.MODELS))
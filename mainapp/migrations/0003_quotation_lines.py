@@ -0,0 +1,80 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+CENT = Decimal("0.01")
+
+
+def _amounts(quantity, unit_price, discount_pct, tax_pct):
+    # mainapp.pricing.compute_quotation_totals as of this migration, kept
+    # here so later changes to pricing do not change what it writes.
+    subtotal = unit_price * quantity
+    discount_amount = subtotal * discount_pct / Decimal("100")
+    tax_amount = (subtotal - discount_amount) * tax_pct / Decimal("100")
+    total = subtotal - discount_amount + tax_amount
+    return tuple(
+        value.quantize(CENT, rounding=ROUND_HALF_UP)
+        for value in (subtotal, discount_amount, tax_amount, total)
+    )
+
+
+def copy_to_lines(apps, schema_editor):
+    """Turn every single-product quotation into one ``QuotationLine`` and
+    store the quotation's totals from it."""
+    Quotation = apps.get_model("mainapp", "Quotation")
+    QuotationLine = apps.get_model("mainapp", "QuotationLine")
+    last_pk = 0
+    while True:
+        quotations = list(
+            Quotation.objects.filter(pk__gt=last_pk, lines__isnull=True).order_by("pk")[
+                :BATCH_SIZE
+            ]
+        )
+        if not quotations:
+            return
+        lines = []
+        for quotation in quotations:
+            subtotal, discount_amount, tax_amount, total = _amounts(
+                quotation.quantity,
+                quotation.unit_price,
+                quotation.discount_percentage,
+                quotation.tax_percentage,
+            )
+            lines.append(
+                QuotationLine(
+                    quotation_id=quotation.pk,
+                    product_id=quotation.product_id,
+                    quantity=quotation.quantity,
+                    unit_price=quotation.unit_price,
+                    discount_percentage=quotation.discount_percentage,
+                    tax_percentage=quotation.tax_percentage,
+                    subtotal=subtotal,
+                    discount_amount=discount_amount,
+                    tax_amount=tax_amount,
+                    total=total,
+                )
+            )
+            quotation.line_count = 1
+            quotation.subtotal = subtotal
+            quotation.discount_amount = discount_amount
+            quotation.tax_amount = tax_amount
+            quotation.grand_total = total
+        QuotationLine.objects.bulk_create(lines)
+        Quotation.objects.bulk_update(
+            quotations,
+            ["line_count", "subtotal", "discount_amount", "tax_amount", "grand_total"],
+        )
+        last_pk = quotations[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mainapp", "0002_new_models_and_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_lines),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0003_quotation_lines'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quotation',
+            name='discount_percentage',
+        ),
+        migrations.RemoveField(
+            model_name='quotation',
+            name='product',
+        ),
+        migrations.RemoveField(
+            model_name='quotation',
+            name='quantity',
+        ),
+        migrations.RemoveField(
+            model_name='quotation',
+            name='tax_percentage',
+        ),
+        migrations.RemoveField(
+            model_name='quotation',
+            name='unit_price',
+        ),
+    ]
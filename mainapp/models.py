@@ -1,5 +1,10 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower, Round
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -8,6 +13,12 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["name", "id"]),
+        ]
+
 
 class SubCategory(models.Model):
     name = models.CharField(max_length=255)
@@ -21,6 +32,65 @@ class SubCategory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["name", "id"]),
+        ]
+
+
+class MoneyOutputField(models.DecimalField):
+    """Output field for computed amounts. SQLite returns arithmetic results
+    as floats, so they are quantized back to cents on the way out."""
+
+    CENT = Decimal("0.01")
+
+    def __init__(self):
+        super().__init__(max_digits=14, decimal_places=2)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).quantize(self.CENT)
+
+
+class ProductQuerySet(models.QuerySet):
+    """Pricing figures computed in SQL, so they can be filtered, ordered
+    and aggregated on like regular columns. Amounts are rounded to cents."""
+
+    MONEY = MoneyOutputField()
+    # Multiplying by 0.01 rather than dividing by 100 keeps SQLite from
+    # doing integer division when price and discount are whole numbers.
+    PERCENT = models.Value(Decimal("0.01"), output_field=MONEY)
+
+    @classmethod
+    def _money(cls, expression):
+        return Round(expression, 2, output_field=cls.MONEY)
+
+    @classmethod
+    def _discount_factor(cls):
+        return (100 - models.F("discount_percentage")) * cls.PERCENT
+
+    def with_discounted_price(self):
+        return self.annotate(
+            discounted_price=self._money(models.F("price") * self._discount_factor())
+        )
+
+    def with_line_value(self):
+        return self.annotate(
+            line_value=self._money(models.F("price") * models.F("quantity"))
+        )
+
+    def with_stock_value(self):
+        return self.annotate(
+            stock_value=self._money(
+                models.F("price") * self._discount_factor() * models.F("quantity")
+            )
+        )
+
+    def with_pricing(self):
+        return self.with_discounted_price().with_line_value().with_stock_value()
+
 
 class Product(models.Model):
     STATUS_CHOICES = [
@@ -63,6 +133,21 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["name", "id"]),
+            models.Index(Lower("name"), name="product_name_lower_idx"),
+            # The product list filtered to active products.
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(status="active"),
+                name="product_active_name_idx",
+            ),
+        ]
+
 
 class Customer(models.Model):
     name = models.CharField(max_length=255)
@@ -80,6 +165,12 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["name", "id"]),
+        ]
+
 
 class ExpenseCategory(models.Model):
     name = models.CharField(max_length=255)
@@ -88,6 +179,11 @@ class ExpenseCategory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "id"]),
+        ]
+
 
 class Expense(models.Model):
     expense_category = models.ForeignKey(
@@ -103,6 +199,12 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["date", "id"]),
+        ]
+
 
 class Supplier(models.Model):
     name = models.CharField(max_length=255)
@@ -116,8 +218,20 @@ class Supplier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["name", "id"]),
+            models.Index(Lower("name"), name="supplier_name_lower_idx"),
+        ]
+
 
 class Quotation(models.Model):
+    """A quotation for one customer. The products quoted are its
+    ``QuotationLine`` rows; the totals below are the sums of the lines,
+    stored by ``mainapp.quotations`` whenever the lines are written so
+    lists can sort, filter and sum them in SQL."""
+
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("sent", "Sent"),
@@ -127,42 +241,51 @@ class Quotation(models.Model):
     ]
 
     reference = models.CharField(max_length=100, unique=True)
-    product = models.ForeignKey(
-        "Product",
-        on_delete=models.PROTECT,
-        related_name="quotations",
-    )
     customer = models.ForeignKey(
         "Customer",
         on_delete=models.PROTECT,
         related_name="quotations",
     )
-    quantity = models.PositiveIntegerField(default=1)
-    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
-    discount_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
-    tax_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     notes = models.TextField(blank=True, null=True)
+    line_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    grand_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["grand_total", "id"]),
+            models.Index(fields=["status", "grand_total"]),
+        ]
 
-    def get_subtotal(self):
-        return self.quantity * self.unit_price
 
-    def get_discount_amount(self):
-        return (self.get_subtotal() * self.discount_percentage) / 100
+class QuotationLine(models.Model):
+    """One product on a quotation, with its amounts stored as priced."""
 
-    def get_subtotal_after_discount(self):
-        return self.get_subtotal() - self.get_discount_amount()
-
-    def get_tax_amount(self):
-        return (self.get_subtotal_after_discount() * self.tax_percentage) / 100
-
-    def get_grand_total(self):
-        return self.get_subtotal_after_discount() + self.get_tax_amount()
+    quotation = models.ForeignKey(
+        "Quotation",
+        on_delete=models.CASCADE,
+        related_name="lines",
+    )
+    product = models.ForeignKey(
+        "Product",
+        on_delete=models.PROTECT,
+        related_name="quotation_lines",
+    )
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    discount_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    tax_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
 
 class Purchase(models.Model):
@@ -191,6 +314,13 @@ class Purchase(models.Model):
         blank=True,
         related_name="purchases",
     )
+    order = models.ForeignKey(
+        "PurchaseOrder",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="lines",
+    )
     reference = models.CharField(max_length=255, unique=True)
     purchase_date = models.DateField()
     quantity = models.IntegerField()
@@ -215,6 +345,263 @@ class Purchase(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            # The purchase list: purchases outside orders (order IS NULL),
+            # newest first, optionally by status, date range or outstanding
+            # payment. Leading with the order column lets SQLite match
+            # "order IS NULL" as an equality and read the rest in order.
+            models.Index(
+                fields=["order", "purchase_date", "created_at"],
+                name="purchase_list_idx",
+            ),
+            models.Index(
+                fields=["order", "status", "purchase_date", "created_at"],
+                name="purchase_list_status_idx",
+            ),
+            models.Index(
+                fields=["order", "purchase_date", "created_at"],
+                condition=~models.Q(payment_status="paid"),
+                name="purchase_list_outstanding_idx",
+            ),
+        ]
+
     @property
     def remaining_amount(self):
         return self.line_total - self.paid_amount
+
+
+class PurchaseOrder(models.Model):
+    """One supplier order. Its lines are ``Purchase`` rows pointing back at
+    it; supplier, status and payment are tracked here, once per order, and
+    the totals are the sums of the lines."""
+
+    supplier = models.ForeignKey(
+        "Supplier",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="purchase_orders",
+    )
+    reference = models.CharField(max_length=255, unique=True)
+    order_date = models.DateField()
+    status = models.CharField(
+        max_length=20,
+        choices=Purchase.StatusChoices.choices,
+        default=Purchase.StatusChoices.PENDING,
+    )
+    payment_status = models.CharField(
+        max_length=20,
+        choices=Purchase.PaymentStatusChoices.choices,
+        default=Purchase.PaymentStatusChoices.UNPAID,
+    )
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    line_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    description = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["order_date", "created_at"]),
+        ]
+
+    @property
+    def remaining_amount(self):
+        return self.total - self.paid_amount
+
+
+class ExportJob(models.Model):
+    class StatusChoices(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    class FormatChoices(models.TextChoices):
+        PDF = "pdf", "PDF"
+        EXCEL = "excel", "Excel"
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+    )
+    entity = models.CharField(max_length=50)
+    format = models.CharField(max_length=10, choices=FormatChoices.choices)
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    file = models.FileField(upload_to="exports/", blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["expires_at"]),
+            models.Index(fields=["requested_by", "created_at"]),
+        ]
+
+
+class RepricingRun(models.Model):
+    """A bulk recalculation of purchase or quotation totals, optionally
+    setting new discount or tax rates first. Progress is checkpointed with
+    every chunk so an interrupted run resumes where it stopped (see
+    ``mainapp.repricing``)."""
+
+    class EntityChoices(models.TextChoices):
+        PURCHASES = "purchases", "Purchases"
+        QUOTATIONS = "quotations", "Quotations"
+
+    class StatusChoices(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+
+    entity = models.CharField(max_length=20, choices=EntityChoices.choices)
+    filters = models.JSONField(default=dict, blank=True)
+    discount = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.RUNNING,
+    )
+    last_pk = models.BigIntegerField(default=0)
+    total = models.IntegerField(default=0)
+    seen = models.IntegerField(default=0)
+    changed = models.IntegerField(default=0)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+class DashboardMetrics(models.Model):
+    """Single-row summary of the dashboard totals, kept current by
+    ``mainapp.metrics`` instead of being aggregated on every page view."""
+
+    total_customers = models.IntegerField(default=0)
+    total_suppliers = models.IntegerField(default=0)
+    total_products = models.IntegerField(default=0)
+    total_purchases = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_expenses = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    reconciled_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Rollup(models.Model):
+    """Pre-aggregated total and row count of one series for one day or month,
+    maintained by ``mainapp.rollups``."""
+
+    class PeriodChoices(models.TextChoices):
+        DAY = "day", "Day"
+        MONTH = "month", "Month"
+
+    series = models.CharField(max_length=20)
+    period = models.CharField(max_length=10, choices=PeriodChoices.choices)
+    bucket = models.DateField()
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "period", "bucket"], name="unique_rollup_bucket"
+            ),
+        ]
+
+
+class ReferenceSequence(models.Model):
+    """Next free number of one reference sequence, e.g. ``purchase`` or
+    ``quotation:QT:2026``. Advanced only through ``mainapp.references``."""
+
+    scope = models.CharField(max_length=100, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DataVersion(models.Model):
+    """Change counter of one data set cached in every process, e.g.
+    ``typeahead:products``. A process compares it with the version its copy
+    was built from to tell whether the copy is stale."""
+
+    scope = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class StockMovement(models.Model):
+    """Append-only record of one change to a product's stock."""
+
+    class KindChoices(models.TextChoices):
+        RECEIPT = "receipt", "Receipt"
+        REVERSAL = "reversal", "Reversal"
+        ADJUSTMENT = "adjustment", "Adjustment"
+        COUNT = "count", "Stock count"
+
+    product = models.ForeignKey(
+        "Product",
+        on_delete=models.CASCADE,
+        related_name="stock_movements",
+    )
+    kind = models.CharField(max_length=20, choices=KindChoices.choices)
+    quantity = models.IntegerField()
+    purchase = models.ForeignKey(
+        "Purchase",
+        on_delete=models.SET_NULL,
+        related_name="stock_movements",
+        blank=True,
+        null=True,
+    )
+    note = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "created_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements are append-only.")
+        super().save(*args, **kwargs)
+
+
+class StockSnapshot(models.Model):
+    """A product's stock level at ``taken_at``, written periodically so
+    point-in-time stock only has to replay movements since the snapshot."""
+
+    product = models.ForeignKey(
+        "Product",
+        on_delete=models.CASCADE,
+        related_name="stock_snapshots",
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "taken_at"], name="unique_stock_snapshot"
+            ),
+        ]
@@ -0,0 +1,53 @@
+import string
+from collections import defaultdict, namedtuple
+
+from django.db.models.functions import Lower
+
+
+# SQLite's LOWER() folds ASCII letters only, so keys are folded the same
+# way; otherwise "ÉCLAIR" would be looked up as "éclair" and never match
+# what the case-insensitive index holds.
+_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+Resolution = namedtuple("Resolution", ["found", "missing", "ambiguous"])
+
+
+def name_key(name):
+    return name.translate(_FOLD)
+
+
+def resolve(model, names, field="name"):
+    """Resolve many names of ``model`` rows to primary keys in one query.
+
+    The query is ``WHERE LOWER(name) IN (...)``, which the ``Lower("name")``
+    index on the model answers without scanning the table. Surrounding
+    whitespace is ignored. An exact match wins over a match that differs
+    only in case; a name that still matches several rows is reported as
+    ambiguous instead of resolving to an arbitrary one.
+
+    Returns a :class:`Resolution`: ``found`` is ``{name: pk}``, ``missing``
+    and ``ambiguous`` are lists of names.
+    """
+    wanted = {name.strip() for name in names} - {""}
+    candidates = defaultdict(list)
+    if wanted:
+        rows = (
+            model.objects.alias(key=Lower(field))
+            .filter(key__in={name_key(name) for name in wanted})
+            .values_list("pk", field)
+        )
+        for pk, value in rows:
+            candidates[name_key(value)].append((pk, value))
+
+    found, missing, ambiguous = {}, [], []
+    for name in sorted(wanted):
+        matches = candidates[name_key(name)]
+        exact = [pk for pk, value in matches if value == name]
+        pks = exact or [pk for pk, _ in matches]
+        if len(pks) == 1:
+            found[name] = pks[0]
+        elif pks:
+            ambiguous.append(name)
+        else:
+            missing.append(name)
+    return Resolution(found, missing, ambiguous)
@@ -0,0 +1,153 @@
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics, references, rollups, search
+from .models import Purchase, PurchaseOrder
+from .pricing import price_lines
+
+
+# Lines inserted per INSERT statement, well below SQLite's variable limit.
+LINE_BATCH_SIZE = 500
+
+OrderLine = namedtuple(
+    "OrderLine", ["product", "quantity", "unit_price", "discount", "tax_rate"]
+)
+
+
+def payment_status(paid_amount, total):
+    if paid_amount == 0:
+        return Purchase.PaymentStatusChoices.UNPAID
+    if paid_amount < total:
+        return Purchase.PaymentStatusChoices.PARTIAL
+    return Purchase.PaymentStatusChoices.PAID
+
+
+def line_reference(order_reference, number):
+    return f"{order_reference}-{number:03d}"
+
+
+def price(lines):
+    """Return ``(priced, totals)`` for :class:`OrderLine` tuples, as
+    :func:`mainapp.pricing.price_lines` does."""
+    return price_lines(
+        (line.quantity, line.unit_price, line.discount, line.tax_rate) for line in lines
+    )
+
+
+def create(supplier, order_date, lines, status, paid_amount, description=""):
+    """Create an order and all of its lines in one transaction.
+
+    ``lines`` are :class:`OrderLine` tuples. They are priced in one pass
+    and inserted with ``bulk_create()``; since that sends no signals, the
+    purchase total, the rollups and the search index are updated once for
+    the whole order instead of once per line. Callers check
+    ``paid_amount`` against the total first (see :func:`price`).
+    """
+    priced, totals = price(lines)
+    reference = references.next_reference("purchase_order")
+    with transaction.atomic():
+        order = PurchaseOrder.objects.create(
+            supplier=supplier,
+            reference=reference,
+            order_date=order_date,
+            status=status,
+            payment_status=payment_status(paid_amount, totals["total"]),
+            paid_amount=paid_amount,
+            line_count=len(lines),
+            description=description or None,
+            **totals,
+        )
+        created = Purchase.objects.bulk_create(
+            [
+                Purchase(
+                    order=order,
+                    supplier=supplier,
+                    product=line.product,
+                    reference=line_reference(reference, number),
+                    purchase_date=order_date,
+                    quantity=line.quantity,
+                    unit_price=line.unit_price,
+                    discount=line.discount,
+                    tax_rate=line.tax_rate,
+                    tax_amount=tax_amount,
+                    line_total=line_total,
+                    status=status,
+                )
+                for number, (line, (_, tax_amount, line_total)) in enumerate(
+                    zip(lines, priced), start=1
+                )
+            ],
+            batch_size=LINE_BATCH_SIZE,
+        )
+        metrics.changed(Purchase, totals["total"])
+        rollups.add("purchases", order_date, totals["total"], len(lines))
+        search.index(created)
+    return order
+
+
+def refresh_totals(order_ids):
+    """Recompute the stored totals and payment status of the given orders
+    from their current lines, e.g. after the lines were repriced."""
+    lines = defaultdict(list)
+    for order_id, *line in Purchase.objects.filter(order_id__in=order_ids).values_list(
+        "order_id", "quantity", "unit_price", "discount", "tax_rate"
+    ):
+        lines[order_id].append(line)
+    updated = []
+    for order in PurchaseOrder.objects.filter(pk__in=order_ids):
+        _, totals = price_lines(lines[order.pk])
+        for name, value in totals.items():
+            setattr(order, name, value)
+        order.line_count = len(lines[order.pk])
+        order.payment_status = payment_status(order.paid_amount, order.total)
+        order.updated_at = timezone.now()
+        updated.append(order)
+    PurchaseOrder.objects.bulk_update(
+        updated,
+        [
+            "subtotal",
+            "discount_amount",
+            "tax_amount",
+            "total",
+            "line_count",
+            "payment_status",
+            "updated_at",
+        ],
+        batch_size=LINE_BATCH_SIZE,
+    )
+
+
+def set_payment(order, paid_amount):
+    order.paid_amount = paid_amount
+    order.payment_status = payment_status(paid_amount, order.total)
+    order.save(update_fields=["paid_amount", "payment_status", "updated_at"])
+
+
+def set_status(order, status):
+    """Set the status of the order and of all its lines."""
+    with transaction.atomic():
+        order.status = status
+        order.save(update_fields=["status", "updated_at"])
+        Purchase.objects.filter(order=order).update(
+            status=status, updated_at=order.updated_at
+        )
+
+
+def delete(order):
+    """Delete an order with its lines.
+
+    The per-line signal handlers are suspended; the purchase total and the
+    rollups are moved back once per purchase date instead.
+    """
+    with transaction.atomic():
+        removed = defaultdict(lambda: [0, 0])
+        for day, line_total in order.lines.values_list("purchase_date", "line_total"):
+            removed[day][0] += line_total
+            removed[day][1] += 1
+        with metrics.suspend(Purchase):
+            order.delete()
+        metrics.changed(Purchase, -sum(total for total, _ in removed.values()))
+        for day, (total, count) in removed.items():
+            rollups.add("purchases", day, -total, -count)
@@ -0,0 +1,211 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    PageBreak,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+
+TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4CAF50")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+        ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 1), (-1, -1), 4),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        (
+            "ROWBACKGROUNDS",
+            (0, 1),
+            (-1, -1),
+            [colors.white, colors.lightgrey],
+        ),
+    ]
+)
+
+AVAILABLE_WIDTH = 6.5 * inch
+
+
+def _styles():
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "CustomTitle",
+        parent=styles["Heading1"],
+        fontSize=10,
+        textColor=colors.HexColor("#2c3e50"),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+    )
+    return styles, title_style
+
+
+def _title_elements(title):
+    _, title_style = _styles()
+    return [Paragraph(title, title_style), Spacer(1, 0.3 * inch)]
+
+
+def _footer_elements(footer):
+    styles, _ = _styles()
+    return [Spacer(1, 0.5 * inch), Paragraph(footer, styles["Normal"])]
+
+
+def _page_table(headers, rows):
+    num_cols = len(headers)
+    table = Table(
+        [headers] + rows,
+        colWidths=[AVAILABLE_WIDTH / num_cols] * num_cols,
+        repeatRows=1,
+    )
+    table.setStyle(TABLE_STYLE)
+    return table
+
+
+def _frame_height():
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=A4)
+    return doc.height
+
+
+def page_capacity(headers, title=None):
+    """Return ``(rows_per_page, rows_on_first_page)`` for single-line rows."""
+    frame_height = _frame_height()
+    probe = _page_table(headers, [["X"] * len(headers)])
+    probe.wrap(AVAILABLE_WIDTH, frame_height)
+    header_height, row_height = probe._rowHeights[0], probe._rowHeights[1]
+    # Leave a little slack so rounding never pushes the last row over.
+    rows_per_page = max(1, int((frame_height - header_height) / row_height) - 1)
+
+    first_page = rows_per_page
+    if title:
+        used = 0
+        for flowable in _title_elements(title):
+            _, h = flowable.wrap(AVAILABLE_WIDTH, frame_height)
+            used += h + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+        first_page = max(1, int((frame_height - used - header_height) / row_height) - 1)
+    return rows_per_page, first_page
+
+
+def render_part(headers, rows, rows_per_page, title=None, first_page_rows=None, footer=None):
+    """Render ``rows`` as a standalone PDF of page-sized tables.
+
+    Every page gets its own small table with the header row, so layout cost
+    is linear in the number of rows. This runs in worker processes and only
+    touches plain lists of strings.
+    """
+    elements = []
+    start = 0
+    if title:
+        elements.extend(_title_elements(title))
+        size = first_page_rows or rows_per_page
+        elements.append(_page_table(headers, rows[:size]))
+        start = size
+    while start < len(rows):
+        if elements:
+            elements.append(PageBreak())
+        elements.append(_page_table(headers, rows[start : start + rows_per_page]))
+        start += rows_per_page
+    if footer:
+        elements.extend(_footer_elements(footer))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(elements)
+    return buffer.getvalue()
+
+
+class ChunkedPdfBuilder:
+    """Render a long table into a PDF in parts of ``pages_per_part`` pages.
+
+    Rows are consumed from an iterator one part at a time. When more than one
+    part is needed and ``workers`` > 1, parts are rendered concurrently in
+    spawned processes and stitched together in order. At most ``workers * 2``
+    parts are in flight, which bounds memory. The row count for the footer is
+    taken from the rows themselves rather than from a separate query.
+    """
+
+    def __init__(self, title, headers, workers=1, pages_per_part=20):
+        self.title = title
+        self.headers = [str(h) for h in headers]
+        self.workers = workers
+        self.rows_per_page, self.first_page_rows = page_capacity(self.headers, title)
+        self.part_size = self.rows_per_page * pages_per_part
+        self.row_count = 0
+
+    def _parts(self, rows):
+        # The first part is shorter so that every part ends on a full page.
+        size = self.first_page_rows + self.rows_per_page * (
+            self.part_size // self.rows_per_page - 1
+        )
+        part = []
+        for row in rows:
+            part.append(row)
+            if len(part) >= size:
+                yield part
+                part = []
+                size = self.part_size
+        if part or size != self.part_size:
+            yield part
+
+    def _part_args(self, part, index, last, footer):
+        self.row_count += len(part)
+        return (
+            self.headers,
+            part,
+            self.rows_per_page,
+            self.title if index == 0 else None,
+            self.first_page_rows,
+            footer(self.row_count) if (last and footer) else None,
+        )
+
+    def _iter_part_args(self, rows, footer):
+        # Look one part ahead so the final part knows it carries the footer.
+        pending = None
+        index = 0
+        for part in self._parts(rows):
+            if pending is not None:
+                yield self._part_args(pending, index, False, footer)
+                index += 1
+            pending = part
+        yield self._part_args(pending or [], index, True, footer)
+
+    def build(self, rows, output, footer=None):
+        part_args = self._iter_part_args(iter(rows), footer)
+        first = next(part_args)
+        second = next(part_args, None)
+        if second is None:
+            output.write(render_part(*first))
+            return
+
+        writer = PdfWriter()
+        if self.workers <= 1:
+            for args in (first, second):
+                writer.append(io.BytesIO(render_part(*args)))
+            for args in part_args:
+                writer.append(io.BytesIO(render_part(*args)))
+        else:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+                in_flight = [pool.submit(render_part, *first), pool.submit(render_part, *second)]
+                for args in part_args:
+                    in_flight.append(pool.submit(render_part, *args))
+                    if len(in_flight) >= self.workers * 2:
+                        writer.append(io.BytesIO(in_flight.pop(0).result()))
+                for future in in_flight:
+                    writer.append(io.BytesIO(future.result()))
+        writer.write(output)
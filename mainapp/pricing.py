@@ -0,0 +1,165 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+
+MONEY_QUANT = Decimal("0.01")
+
+
+def compute_purchase_totals(quantity, unit_price, discount_pct, tax_pct):
+
+    subtotal_base = unit_price * quantity
+
+    discount_amount = subtotal_base * (discount_pct / Decimal("100"))
+
+    taxable_base = subtotal_base
+    tax_amount = taxable_base * (tax_pct / Decimal("100"))
+
+    line_total = subtotal_base - discount_amount + tax_amount
+
+    discount_amount = discount_amount.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+    tax_amount = tax_amount.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+    line_total = line_total.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+
+    return discount_amount, tax_amount, line_total
+
+
+def price_lines(lines):
+    """Price ``[(quantity, unit_price, discount_pct, tax_pct), ...]`` in one
+    pass.
+
+    Returns ``(priced, totals)``: ``priced`` holds ``(discount_amount,
+    tax_amount, line_total)`` per line, exactly as
+    :func:`compute_purchase_totals` returns them, and ``totals`` the order
+    sums of ``subtotal``, ``discount_amount``, ``tax_amount`` and
+    ``total``. The sums add the rounded line amounts, so an order always
+    equals the sum of its lines.
+    """
+    priced = []
+    subtotal = discount_total = tax_total = total = Decimal("0.00")
+    for quantity, unit_price, discount_pct, tax_pct in lines:
+        discount_amount, tax_amount, line_total = compute_purchase_totals(
+            quantity, unit_price, discount_pct, tax_pct
+        )
+        priced.append((discount_amount, tax_amount, line_total))
+        subtotal += (unit_price * quantity).quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+        discount_total += discount_amount
+        tax_total += tax_amount
+        total += line_total
+    return priced, {
+        "subtotal": subtotal,
+        "discount_amount": discount_total,
+        "tax_amount": tax_total,
+        "total": total,
+    }
+
+
+def compute_quotation_totals(quantity, unit_price, discount_pct, tax_pct):
+    """Return ``(subtotal, discount_amount, tax_amount, total)`` of one
+    quotation line. Unlike purchases, quotations charge tax on the
+    discounted subtotal."""
+    subtotal = unit_price * quantity
+    discount_amount = subtotal * discount_pct / Decimal("100")
+    tax_amount = (subtotal - discount_amount) * tax_pct / Decimal("100")
+    total = subtotal - discount_amount + tax_amount
+    return tuple(
+        value.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
+        for value in (subtotal, discount_amount, tax_amount, total)
+    )
+
+
+def price_quotation_lines(lines):
+    """Price ``[(quantity, unit_price, discount_pct, tax_pct), ...]`` in one
+    pass, like :func:`price_lines` for quotations.
+
+    Returns ``(priced, totals)``: ``priced`` holds the
+    :func:`compute_quotation_totals` tuple of every line, ``totals`` the
+    sums of ``subtotal``, ``discount_amount``, ``tax_amount`` and
+    ``grand_total``.
+    """
+    priced = []
+    sums = [Decimal("0.00")] * 4
+    for quantity, unit_price, discount_pct, tax_pct in lines:
+        amounts = compute_quotation_totals(quantity, unit_price, discount_pct, tax_pct)
+        priced.append(amounts)
+        sums = [total + amount for total, amount in zip(sums, amounts)]
+    return priced, dict(
+        zip(["subtotal", "discount_amount", "tax_amount", "grand_total"], sums)
+    )
+
+
+def scaled(value, places=2):
+    """``value`` as a whole number of ``10 ** -places`` units, e.g. a price
+    in cents or a percentage in hundredths of a percent. Raises
+    ``ValueError`` if that would drop digits."""
+    result = Decimal(value).scaleb(places)
+    if result != result.to_integral_value():
+        raise ValueError(f"{value} has more than {places} decimal places.")
+    return int(result)
+
+
+def from_cents(cents):
+    # Multiplying is exact here and faster than scaleb() or division.
+    return Decimal(cents) * MONEY_QUANT
+
+
+def price_purchase_columns(quantities, unit_prices, discounts, tax_rates):
+    """Column-wise :func:`compute_purchase_totals` in integer arithmetic.
+
+    Takes equally long sequences of quantities, unit prices in cents, and
+    discount and tax rates in hundredths of a percent (see :func:`scaled`).
+    Returns three lists of cents: discount amounts, tax amounts and line
+    totals.
+
+    With two decimal places on every input, ``cents * rate / 10000`` is
+    the exact amount, so rounding it half-up (away from zero) to a whole
+    cent gives exactly what the Decimal version returns, without building
+    a Decimal per value.
+    """
+    discount_amounts = []
+    tax_amounts = []
+    line_totals = []
+    for quantity, unit_price, discount, tax_rate in zip(
+        quantities, unit_prices, discounts, tax_rates
+    ):
+        base = unit_price * quantity
+        for amount, out in (
+            (base * discount, discount_amounts),
+            (base * tax_rate, tax_amounts),
+            (base * (10000 - discount + tax_rate), line_totals),
+        ):
+            if amount >= 0:
+                out.append((amount + 5000) // 10000)
+            else:
+                out.append(-((5000 - amount) // 10000))
+    return discount_amounts, tax_amounts, line_totals
+
+
+def price_quotation_columns(quantities, unit_prices, discounts, tax_rates):
+    """Column-wise :func:`compute_quotation_totals`, with the same units as
+    :func:`price_purchase_columns`. Returns four lists of cents: subtotals,
+    discount amounts, tax amounts and totals.
+
+    Tax is charged on the discounted subtotal, so the exact tax and total
+    are ``base * (10000 - discount) * rate / 10000 ** 2``; each is rounded
+    half-up from its exact value, as the Decimal version does.
+    """
+    subtotals = []
+    discount_amounts = []
+    tax_amounts = []
+    totals = []
+    for quantity, unit_price, discount, tax_rate in zip(
+        quantities, unit_prices, discounts, tax_rates
+    ):
+        base = unit_price * quantity
+        subtotals.append(base)
+        discounted = base * (10000 - discount)
+        for amount, scale, out in (
+            (base * discount, 10000, discount_amounts),
+            (discounted * tax_rate, 100000000, tax_amounts),
+            (discounted * (10000 + tax_rate), 100000000, totals),
+        ):
+            half = scale // 2
+            if amount >= 0:
+                out.append((amount + half) // scale)
+            else:
+                out.append(-((half - amount) // scale))
+    return subtotals, discount_amounts, tax_amounts, totals
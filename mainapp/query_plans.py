@@ -0,0 +1,124 @@
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from .exports import FEEDS
+
+
+DATATABLE = {"draw": 1, "start": 0, "length": 10}
+
+# (label, url name, url args, query parameters) of the pages and endpoints
+# that run on every visit. Searching is left out: ``icontains`` cannot use
+# a b-tree index.
+HOT_PATHS = [
+    ("dashboard", "index", [], {}),
+    ("dashboard timeseries", "dashboard_timeseries", [], {}),
+    ("categories", "categories_index", [], {}),
+    ("subcategories", "subcategories_index", [], {}),
+    ("expense categories", "expense_categories_index", [], {}),
+    ("products", "products_data", [], DATATABLE),
+    ("active products", "products_data", [], {**DATATABLE, "status": "active"}),
+    ("customers", "customers_data", [], DATATABLE),
+    ("suppliers", "suppliers_data", [], DATATABLE),
+    ("expenses", "expenses_data", [], DATATABLE),
+    ("quotations", "quotations_data", [], DATATABLE),
+    ("purchases", "purchases_data", [], DATATABLE),
+    ("purchases by status", "purchases_data", [], {**DATATABLE, "status": "received"}),
+    (
+        "outstanding purchases",
+        "purchases_data",
+        [],
+        {**DATATABLE, "payment_status": "outstanding"},
+    ),
+    (
+        "purchases by date",
+        "purchases_data",
+        [],
+        {**DATATABLE, "since": "2024-01-01", "until": "2024-12-31"},
+    ),
+    ("purchase orders", "purchase_orders_data", [], DATATABLE),
+    ("export jobs", "export_jobs_index", [], {}),
+    *(
+        (f"{entity} feed by {order}", "feed_page", [entity], {"order": order})
+        for entity in FEEDS
+        for order in ("created", "-created", "name")
+    ),
+]
+
+class UnsupportedBackend(Exception):
+    pass
+
+
+# A table read without any index, and a sort of every matching row.
+FULL_SCAN = re.compile(r"^SCAN (\S+)(?: AS \S+)?$")
+SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@contextmanager
+def _capture(queries):
+    def wrapper(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+def explain(sql, params):
+    """Return the ``EXPLAIN QUERY PLAN`` detail lines of one query, with
+    the same bound parameters it ran with (SQLite only picks a partial
+    index when it can tell the query implies its condition)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(plan, tables):
+    """Full scans of ``tables`` and whole-result sorts in a plan."""
+    found = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if (match and match.group(1) in tables) or detail == SORT:
+            found.append(detail)
+    return found
+
+
+def check(paths=HOT_PATHS):
+    """Request every hot path and explain each ``SELECT`` it runs.
+
+    Returns ``[(label, sql, plan, problems), ...]``. Everything happens in
+    a transaction that is rolled back, including the throwaway user the
+    requests are made as, so it is safe to run against a live database.
+    """
+    if connection.vendor != "sqlite":
+        raise UnsupportedBackend(
+            f"Query plans are only checked on SQLite, not {connection.vendor}."
+        )
+    tables = {model._meta.db_table for model in apps.get_app_config("mainapp").get_models()}
+    results = []
+    with transaction.atomic():
+        user = get_user_model().objects.create_user(
+            "query-plan-check", "query-plan-check@example.com"
+        )
+        client = Client()
+        client.force_login(user)
+        for label, name, args, params in paths:
+            # The first visit may build cached rows (dashboard metrics);
+            # only the steady state is checked.
+            client.get(reverse(name, args=args), params)
+            queries = []
+            with _capture(queries):
+                response = client.get(reverse(name, args=args), params)
+            if response.status_code != 200:
+                raise RuntimeError(f"{label}: HTTP {response.status_code}")
+            for sql, query_params in queries:
+                plan = explain(sql, query_params)
+                results.append((label, sql, plan, problems(plan, tables)))
+        transaction.set_rollback(True)
+    return results
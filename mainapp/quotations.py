@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+from django.db import transaction
+
+from .models import QuotationLine
+from .pricing import price_quotation_lines
+
+
+# Lines inserted per INSERT statement, well below SQLite's variable limit.
+LINE_BATCH_SIZE = 500
+
+QuoteLine = namedtuple(
+    "QuoteLine",
+    ["product", "quantity", "unit_price", "discount_percentage", "tax_percentage"],
+)
+
+
+def save(quotation, lines):
+    """Save ``quotation`` with ``lines`` (:class:`QuoteLine` tuples) as its
+    complete set of lines, in one transaction.
+
+    The lines are priced in one pass and their sums stored on the
+    quotation before it is saved, so the header totals and the rollup
+    signals always see the final amounts. Existing lines are replaced.
+    """
+    priced, totals = price_quotation_lines(
+        (line.quantity, line.unit_price, line.discount_percentage, line.tax_percentage)
+        for line in lines
+    )
+    for name, value in totals.items():
+        setattr(quotation, name, value)
+    quotation.line_count = len(lines)
+
+    with transaction.atomic():
+        adding = quotation._state.adding
+        quotation.save()
+        if not adding:
+            quotation.lines.all().delete()
+        QuotationLine.objects.bulk_create(
+            [
+                QuotationLine(
+                    quotation=quotation,
+                    product=line.product,
+                    quantity=line.quantity,
+                    unit_price=line.unit_price,
+                    discount_percentage=line.discount_percentage,
+                    tax_percentage=line.tax_percentage,
+                    subtotal=subtotal,
+                    discount_amount=discount_amount,
+                    tax_amount=tax_amount,
+                    total=total,
+                )
+                for line, (subtotal, discount_amount, tax_amount, total) in zip(
+                    lines, priced
+                )
+            ],
+            batch_size=LINE_BATCH_SIZE,
+        )
+    return quotation
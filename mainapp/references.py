@@ -0,0 +1,152 @@
+import re
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Expense, Purchase, PurchaseOrder, Quotation, ReferenceSequence
+
+
+BLOCK_SIZE = getattr(settings, "REFERENCE_BLOCK_SIZE", 10)
+PADDING = 6
+
+# entity -> (model, default prefix, one sequence per year?)
+ENTITIES = {
+    "purchase": (Purchase, "", False),
+    "quotation": (Quotation, "QT", True),
+    "expense": (Expense, "EXP", True),
+    "purchase_order": (PurchaseOrder, "PO", True),
+}
+
+
+def scope_of(entity, prefix="", year=None):
+    return ":".join(str(part) for part in (entity, prefix, year) if part)
+
+
+def format_reference(number, prefix="", year=None):
+    """``123`` without prefix or year (the historical purchase format),
+    otherwise e.g. ``QT-2026-000123``."""
+    if not prefix and not year:
+        return str(number)
+    parts = [str(part) for part in (prefix, year) if part]
+    return "-".join(parts + [str(number).zfill(PADDING)])
+
+
+def _highest_existing(entity, prefix, year):
+    """Highest number already used in this format, so a new sequence never
+    hands out a reference that was entered or generated before it existed."""
+    model = ENTITIES[entity][0]
+    head = format_reference(0, prefix, year)[:-PADDING] if prefix or year else ""
+    pattern = re.compile(re.escape(head) + r"(\d+)$")
+    references = model.objects.filter(reference__startswith=head).values_list(
+        "reference", flat=True
+    )
+    highest = 0
+    for reference in references.iterator():
+        match = pattern.match(reference)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def allocate(entity, count=1, prefix="", year=None):
+    """Reserve ``count`` consecutive numbers and return the first one.
+
+    The reservation is one ``UPDATE ... SET next_value = next_value + count``
+    on the sequence row, so concurrent callers serialize on that row
+    instead of racing on ``COUNT(*)`` and the unique constraint.
+    """
+    scope = scope_of(entity, prefix, year)
+    sequence = ReferenceSequence.objects.filter(scope=scope)
+    advance = {"next_value": F("next_value") + count, "updated_at": timezone.now()}
+    with transaction.atomic():
+        if not sequence.update(**advance):
+            try:
+                with transaction.atomic():
+                    ReferenceSequence.objects.create(
+                        scope=scope,
+                        next_value=_highest_existing(entity, prefix, year) + 1 + count,
+                    )
+            except IntegrityError:
+                # Created concurrently; reserve from the existing row.
+                sequence.update(**advance)
+        return sequence.values_list("next_value", flat=True).get() - count
+
+
+class _Blocks:
+    """Numbers reserved by this process, per sequence scope."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ranges = {}
+
+    def take(self, entity, prefix, year):
+        scope = scope_of(entity, prefix, year)
+        with self.lock:
+            start, end = self.ranges.get(scope, (0, 0))
+            if start >= end:
+                start = allocate(entity, BLOCK_SIZE, prefix, year)
+                end = start + BLOCK_SIZE
+            self.ranges[scope] = (start + 1, end)
+            return start
+
+
+_blocks = _Blocks()
+
+
+def _defaults(entity, prefix, year):
+    _, default_prefix, yearly = ENTITIES[entity]
+    prefix = default_prefix if prefix is None else prefix
+    if year is None and yearly:
+        year = timezone.localdate().year
+    return prefix, year
+
+
+def _unused(entity, references):
+    """``references`` minus those already stored. A sequence only knows the
+    numbers it handed out, so a reference typed in the same format (or one
+    stored before the sequence caught up with it) is skipped here."""
+    model = ENTITIES[entity][0]
+    taken = set(
+        model.objects.filter(reference__in=references).values_list("reference", flat=True)
+    )
+    return [reference for reference in references if reference not in taken]
+
+
+def next_reference(entity, prefix=None, year=None):
+    """Return a new unique reference for ``entity`` (a key of
+    ``ENTITIES``).
+
+    ``prefix`` defaults to the entity's prefix; entities numbered per year
+    use the current year unless ``year`` is given. Outside a transaction
+    the number comes from a block reserved by this process, so most calls
+    need no database write. Inside one, a single number is reserved in the
+    caller's transaction: a block handed out there would be reissued by
+    another process if the transaction rolled back. Numbers whose
+    reference is already stored are skipped.
+    """
+    prefix, year = _defaults(entity, prefix, year)
+    while True:
+        if BLOCK_SIZE > 1 and not connection.in_atomic_block:
+            number = _blocks.take(entity, prefix, year)
+        else:
+            number = allocate(entity, 1, prefix, year)
+        reference = format_reference(number, prefix, year)
+        if _unused(entity, [reference]):
+            return reference
+
+
+def reserve(entity, count, prefix=None, year=None):
+    """Return ``count`` new references at once, for bulk inserts."""
+    prefix, year = _defaults(entity, prefix, year)
+    found = []
+    while len(found) < count:
+        wanted = count - len(found)
+        start = allocate(entity, wanted, prefix, year)
+        found += _unused(
+            entity,
+            [format_reference(number, prefix, year) for number in range(start, start + wanted)],
+        )
+    return found
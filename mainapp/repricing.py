@@ -0,0 +1,272 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from . import metrics, orders
+from .models import Purchase, Quotation, QuotationLine, RepricingRun
+from .pricing import (
+    from_cents,
+    price_purchase_columns,
+    price_quotation_columns,
+    scaled,
+)
+
+
+CHUNK_SIZE = 2000
+
+Entity = RepricingRun.EntityChoices
+
+
+def _scaled_column(field):
+    # Read a two-place decimal column as a whole number of hundredths, so
+    # no Decimal is built per value.
+    return Cast(Round(F(field) * 100), output_field=IntegerField())
+
+
+def _update_rows(model, fields, rows):
+    """Write ``(value, ..., pk)`` rows back to ``fields`` of ``model``.
+
+    This is ``bulk_update()`` by another route: Django's version folds
+    every row into ``CASE WHEN`` expressions, which on SQLite costs about
+    0.8 ms per row, while one parameterized ``UPDATE`` run through
+    ``executemany()`` costs microseconds. Values must already be what the
+    driver expects; exact two-place Decimals are taken as they are.
+    """
+    if not rows:
+        return
+    opts = model._meta
+    quote = connection.ops.quote_name
+    columns = ", ".join(f"{quote(opts.get_field(name).column)} = %s" for name in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {quote(opts.db_table)} SET {columns} "
+            f"WHERE {quote(opts.pk.column)} = %s",
+            rows,
+        )
+
+
+def _stamp(model, now):
+    return model._meta.get_field("updated_at").get_db_prep_save(now, connection)
+
+
+def _rates(run):
+    return (
+        None if run.discount is None else scaled(run.discount),
+        None if run.tax_rate is None else scaled(run.tax_rate),
+    )
+
+
+def reprice_purchase_chunk(rows, discount=None, tax_rate=None):
+    """Reprice one chunk of ``(pk, order_id, quantity, unit_price,
+    discount, tax_rate, tax_amount, line_total, paid_amount,
+    payment_status)`` rows, money and rates in hundredths. ``discount``
+    and ``tax_rate``, if given, replace the rates of every row.
+
+    Returns ``(changes, order_ids)``: ``(discount, tax_rate, tax_amount,
+    line_total, payment_status, pk)`` for the rows that changed, and the
+    orders they belong to.
+    """
+    rows = [
+        (
+            pk,
+            order_id,
+            quantity,
+            unit_price,
+            old_discount if discount is None else discount,
+            old_tax_rate if tax_rate is None else tax_rate,
+            old_discount,
+            old_tax_rate,
+            *rest,
+        )
+        for pk, order_id, quantity, unit_price, old_discount, old_tax_rate, *rest in rows
+    ]
+    columns = list(zip(*rows))
+    _, tax_amounts, line_totals = price_purchase_columns(*columns[2:6])
+    changes = []
+    order_ids = set()
+    for row, tax_amount, line_total in zip(rows, tax_amounts, line_totals):
+        pk, order_id, _, _, new_discount, new_tax_rate, *old = row
+        status = orders.payment_status(old[4], line_total)
+        new = (new_discount, new_tax_rate, tax_amount, line_total, status)
+        if new == (*old[:4], old[5]):
+            continue
+        changes.append(
+            (
+                from_cents(new_discount),
+                from_cents(new_tax_rate),
+                from_cents(tax_amount),
+                from_cents(line_total),
+                status,
+                pk,
+            )
+        )
+        if order_id is not None:
+            order_ids.add(order_id)
+    return changes, order_ids
+
+
+def _purchase_chunk(run, chunk_size):
+    """Reprice the next chunk of purchases. Returns ``(last_pk, seen,
+    changed)``, or ``None`` when there are no rows left."""
+    chunk = list(
+        Purchase.objects.filter(**run.filters, pk__gt=run.last_pk)
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "order_id",
+            "quantity",
+            _scaled_column("unit_price"),
+            _scaled_column("discount"),
+            _scaled_column("tax_rate"),
+            _scaled_column("tax_amount"),
+            _scaled_column("line_total"),
+            _scaled_column("paid_amount"),
+            "payment_status",
+        )[:chunk_size]
+    )
+    if not chunk:
+        return None
+    changes, order_ids = reprice_purchase_chunk(chunk, *_rates(run))
+    stamp = _stamp(Purchase, timezone.now())
+    _update_rows(
+        Purchase,
+        ["discount", "tax_rate", "tax_amount", "line_total", "payment_status", "updated_at"],
+        [(*change[:-1], stamp, change[-1]) for change in changes],
+    )
+    if order_ids:
+        orders.refresh_totals(order_ids)
+    return chunk[-1][0], len(chunk), len(changes)
+
+
+def _quotation_chunk(run, chunk_size):
+    """Reprice the lines of the next chunk of quotations and store the new
+    quotation totals. Counts quotations, not lines."""
+    quotation_ids = list(
+        Quotation.objects.filter(**run.filters, pk__gt=run.last_pk)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:chunk_size]
+    )
+    if not quotation_ids:
+        return None
+    lines = list(
+        QuotationLine.objects.filter(quotation_id__in=quotation_ids)
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "quotation_id",
+            "quantity",
+            _scaled_column("unit_price"),
+            _scaled_column("discount_percentage"),
+            _scaled_column("tax_percentage"),
+            _scaled_column("subtotal"),
+            _scaled_column("discount_amount"),
+            _scaled_column("tax_amount"),
+            _scaled_column("total"),
+        )
+    )
+    discount, tax_rate = _rates(run)
+    columns = [list(column) for column in zip(*lines)] if lines else [[]] * 10
+    pks, parents, quantities, unit_prices, discounts, tax_rates = columns[:6]
+    stored = list(zip(*columns[4:]))
+    if discount is not None:
+        discounts = [discount] * len(lines)
+    if tax_rate is not None:
+        tax_rates = [tax_rate] * len(lines)
+    amounts = price_quotation_columns(quantities, unit_prices, discounts, tax_rates)
+
+    sums = defaultdict(lambda: [0, 0, 0, 0])
+    line_rows = []
+    for pk, parent, old, *new in zip(
+        pks, parents, stored, discounts, tax_rates, *amounts
+    ):
+        total = sums[parent]
+        for index, amount in enumerate(new[2:]):
+            total[index] += amount
+        if tuple(new) != old:
+            line_rows.append((*(from_cents(value) for value in new), pk))
+
+    _update_rows(
+        QuotationLine,
+        [
+            "discount_percentage",
+            "tax_percentage",
+            "subtotal",
+            "discount_amount",
+            "tax_amount",
+            "total",
+        ],
+        line_rows,
+    )
+
+    current = {
+        pk: values
+        for pk, *values in Quotation.objects.filter(pk__in=quotation_ids).values_list(
+            "pk",
+            _scaled_column("subtotal"),
+            _scaled_column("discount_amount"),
+            _scaled_column("tax_amount"),
+            _scaled_column("grand_total"),
+        )
+    }
+    stamp = _stamp(Quotation, timezone.now())
+    header_rows = [
+        (*(from_cents(amount) for amount in sums[pk]), stamp, pk)
+        for pk in quotation_ids
+        if current.get(pk) != sums[pk]
+    ]
+    _update_rows(
+        Quotation,
+        ["subtotal", "discount_amount", "tax_amount", "grand_total", "updated_at"],
+        header_rows,
+    )
+    return quotation_ids[-1], len(quotation_ids), len(header_rows)
+
+
+CHUNKS = {
+    Entity.PURCHASES: (Purchase, _purchase_chunk),
+    Entity.QUOTATIONS: (Quotation, _quotation_chunk),
+}
+
+
+def start(entity, filters=None, discount=None, tax_rate=None):
+    """Create a run over the rows of ``entity`` matching ``filters`` (ORM
+    lookups, stored as JSON so they must be JSON-serializable)."""
+    model, _ = CHUNKS[entity]
+    filters = filters or {}
+    return RepricingRun.objects.create(
+        entity=entity,
+        filters=filters,
+        discount=discount,
+        tax_rate=tax_rate,
+        total=model.objects.filter(**filters).count(),
+    )
+
+
+def resume(run, chunk_size=CHUNK_SIZE, progress=None):
+    """Work through ``run`` chunk by chunk until no rows are left.
+
+    Every chunk is one transaction that also moves the run's checkpoint,
+    so after an interruption nothing is repriced twice or skipped, and
+    locks are held only for one chunk at a time. ``progress(run)`` is
+    called after each chunk. Dashboard totals and rollups of the entity
+    are rebuilt once at the end.
+    """
+    model, reprice_chunk = CHUNKS[run.entity]
+    with metrics.bulk(model):
+        while run.status == RepricingRun.StatusChoices.RUNNING:
+            with transaction.atomic():
+                done = reprice_chunk(run, chunk_size)
+                if done is None:
+                    run.status = RepricingRun.StatusChoices.DONE
+                    run.finished_at = timezone.now()
+                else:
+                    run.last_pk, seen, changed = done
+                    run.seen += seen
+                    run.changed += changed
+                run.save()
+            if progress is not None and done is not None:
+                progress(run)
+    return run
@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Expense, Purchase, Quotation, Rollup
+
+
+CENT = Decimal("0.01")
+
+
+class Series:
+    """A dated amount to roll up: which model, which date field, and how to
+    compute the amount both in Python (for one saved row) and in SQL (for
+    a rebuild)."""
+
+    def __init__(self, model, date_field, value, expression):
+        self.model = model
+        self.date_field = date_field
+        self.value = value
+        self.expression = expression
+
+    def day(self, instance):
+        field = self.model._meta.get_field(self.date_field)
+        value = field.to_python(getattr(instance, self.date_field))
+        if isinstance(value, datetime):
+            return timezone.localdate(value)
+        return value
+
+    def amount(self, instance):
+        return Decimal(self.value(instance)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def day_expression(self):
+        field = self.model._meta.get_field(self.date_field)
+        if field.get_internal_type() == "DateTimeField":
+            return TruncDate(self.date_field)
+        return F(self.date_field)
+
+
+SERIES = {
+    "purchases": Series(
+        Purchase, "purchase_date", lambda p: p.line_total or 0, F("line_total")
+    ),
+    "expenses": Series(Expense, "date", lambda e: e.amount or 0, F("amount")),
+    "quotations": Series(
+        Quotation, "created_at", lambda q: q.grand_total or 0, F("grand_total")
+    ),
+}
+
+MODELS = {series.model: name for name, series in SERIES.items()}
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def _add(name, period, bucket, total, count):
+    rows = Rollup.objects.filter(series=name, period=period, bucket=bucket)
+    if rows.update(total=F("total") + total, count=F("count") + count):
+        if count < 0:
+            rows.filter(count=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            Rollup.objects.create(
+                series=name, period=period, bucket=bucket, total=total, count=count
+            )
+    except IntegrityError:
+        # Another writer created the bucket first.
+        rows.update(total=F("total") + total, count=F("count") + count)
+
+
+def add(name, day, amount, count):
+    """Add ``amount`` and ``count`` rows to the day and month buckets of
+    ``day``, e.g. for rows written with ``bulk_create()`` on one date."""
+    _add(name, Rollup.PeriodChoices.DAY, day, amount, count)
+    _add(name, Rollup.PeriodChoices.MONTH, month_of(day), amount, count)
+
+
+def record(instance, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one row's contribution to
+    its day and month buckets."""
+    name = MODELS[type(instance)]
+    series = SERIES[name]
+    day = series.day(instance)
+    if day is None:
+        return
+    add(name, day, series.amount(instance) * sign, sign)
+
+
+def changed(previous, instance):
+    """Move a row's contribution from its old state to its new one."""
+    if previous is not None:
+        record(previous, -1)
+    if instance is not None:
+        record(instance, 1)
+
+
+def rebuild(names=None):
+    """Recompute the buckets of ``names`` (default: all series) from the
+    source tables, e.g. to backfill or after bulk writes."""
+    for name in names or SERIES:
+        series = SERIES[name]
+        grouped = {
+            Rollup.PeriodChoices.DAY: series.day_expression(),
+            Rollup.PeriodChoices.MONTH: TruncMonth(series.day_expression()),
+        }
+        with transaction.atomic():
+            Rollup.objects.filter(series=name).delete()
+            for period, expression in grouped.items():
+                buckets = (
+                    series.model.objects.annotate(bucket=expression, value=series.expression)
+                    .values("bucket")
+                    .annotate(total=Sum("value"), count=Count("pk"))
+                    .order_by()
+                )
+                Rollup.objects.bulk_create(
+                    [
+                        Rollup(
+                            series=name,
+                            period=period,
+                            bucket=row["bucket"],
+                            total=row["total"] or 0,
+                            count=row["count"],
+                        )
+                        for row in buckets
+                        if row["bucket"] is not None
+                    ],
+                    batch_size=1000,
+                )
+
+
+def _week_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def timeseries(name, interval, start, end):
+    """Return ``[(bucket, total, count), ...]`` for every bucket between
+    ``start`` and ``end`` inclusive, empty buckets included.
+
+    Days and months are read straight from the rollups; weeks (starting
+    on Monday) are summed from the daily rows.
+    """
+    if interval == "month":
+        start, period, step = month_of(start), Rollup.PeriodChoices.MONTH, month_of
+    else:
+        period = Rollup.PeriodChoices.DAY
+        step = _week_of if interval == "week" else (lambda day: day)
+        start = step(start)
+
+    buckets = {}
+    day = start
+    while day <= end:
+        buckets[step(day)] = [Decimal("0.00"), 0]
+        day = (
+            (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            if interval == "month"
+            else day + timedelta(days=7 if interval == "week" else 1)
+        )
+
+    rows = Rollup.objects.filter(
+        series=name, period=period, bucket__gte=start, bucket__lte=end
+    ).values_list("bucket", "total", "count")
+    for bucket, total, count in rows:
+        entry = buckets[step(bucket)]
+        entry[0] += total
+        entry[1] += count
+    return [(bucket, total, count) for bucket, (total, count) in buckets.items()]
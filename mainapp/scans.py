@@ -0,0 +1,79 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Product
+
+
+CACHE = getattr(settings, "SCAN_CACHE", "default")
+TTL = getattr(settings, "SCAN_CACHE_TTL", 5 * 60)
+
+# SKUs looked up per query, well below SQLite's variable limit.
+QUERY_BATCH_SIZE = 500
+
+
+def _sku_key(sku):
+    # SKUs may hold characters cache keys must not contain.
+    return "scan:sku:" + hashlib.sha1(sku.encode()).hexdigest()
+
+
+def _product_key(pk):
+    return f"scan:product:{pk}"
+
+
+def _entry(pk, sku, name, price, quantity):
+    return {"id": pk, "sku": sku, "name": name, "price": str(price), "stock": quantity}
+
+
+def lookup(skus):
+    """Return ``{sku: {"id", "sku", "name", "price", "stock"}}`` for the
+    known SKUs among ``skus``.
+
+    The cache holds two entries per product: SKU to id, and id to the
+    scanned fields. Product changes only drop the second one (see
+    :func:`changed`), so an id found under an SKU the product no longer
+    has is caught by comparing SKUs and looked up again. Everything not in
+    the cache is read with one ``sku IN (...)`` query per batch and cached
+    for the next scan.
+    """
+    cache = caches[CACHE]
+    skus = list(dict.fromkeys(skus))
+    pks = cache.get_many([_sku_key(sku) for sku in skus])
+    entries = cache.get_many([_product_key(pk) for pk in pks.values()])
+
+    found = {}
+    for sku in skus:
+        pk = pks.get(_sku_key(sku))
+        entry = entries.get(_product_key(pk)) if pk is not None else None
+        if entry is not None and entry["sku"] == sku:
+            found[sku] = entry
+
+    missing = [sku for sku in skus if sku not in found]
+    fresh = {}
+    for start in range(0, len(missing), QUERY_BATCH_SIZE):
+        rows = Product.objects.filter(
+            sku__in=missing[start : start + QUERY_BATCH_SIZE]
+        ).values_list("pk", "sku", "name", "price", "quantity")
+        for row in rows:
+            entry = _entry(*row)
+            found[entry["sku"]] = entry
+            fresh[_sku_key(entry["sku"])] = entry["id"]
+            fresh[_product_key(entry["id"])] = entry
+    if fresh:
+        cache.set_many(fresh, TTL)
+    return found
+
+
+def forget(product_ids):
+    caches[CACHE].delete_many([_product_key(pk) for pk in product_ids])
+
+
+def changed(product_ids):
+    """Drop the cached scans of ``product_ids`` once the current
+    transaction commits; dropped any earlier, the next scan would cache
+    the old row again. A scan that read the old row just before the commit
+    can still cache it, which ``TTL`` bounds."""
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: forget(product_ids))
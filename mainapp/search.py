@@ -0,0 +1,210 @@
+import re
+
+from django.db import connection, transaction
+from django.urls import reverse
+
+from .models import Customer, Expense, Product, Purchase, Quotation, Supplier
+
+
+TABLE = "mainapp_search"
+
+# entity -> (model, code, title field, other indexed fields). Index rows use
+# ``pk * CODES + code`` as their rowid, so one object's row is found,
+# replaced or removed through the rowid alone.
+ENTITIES = {
+    "products": (Product, 1, "name", ["sku", "description"]),
+    "customers": (Customer, 2, "name", ["email", "phone", "city"]),
+    "suppliers": (Supplier, 3, "name", ["email", "phone", "city"]),
+    "expenses": (Expense, 4, "reference", ["expense_for"]),
+    "quotations": (Quotation, 5, "reference", []),
+    "purchases": (Purchase, 6, "reference", []),
+}
+CODES = 8
+MODELS = {model: entity for entity, (model, *_) in ENTITIES.items()}
+BY_CODE = {code: entity for entity, (_, code, *_) in ENTITIES.items()}
+
+# Queries matching more rows than this are ranked among the newest this
+# many matches, so no query has to read every posting of a common word.
+RANK_WINDOW = 2000
+MAX_TERMS = 8
+BATCH_SIZE = 2000
+
+TERM = re.compile(r"\w+")
+
+
+def available():
+    return connection.vendor == "sqlite"
+
+
+def create_table():
+    """Create the FTS5 index if it does not exist yet. Prefixes of two and
+    three characters are indexed too, so search-as-you-type stays fast."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def fields(entity):
+    _, _, title, others = ENTITIES[entity]
+    return [title, *others]
+
+
+def _row(code, pk, title, *others):
+    return (
+        pk * CODES + code,
+        title or "",
+        " ".join(str(value) for value in others if value),
+    )
+
+
+def index(instances):
+    """Add or replace the index rows of saved objects (of indexed models)."""
+    if not available():
+        return
+    rows = []
+    for instance in instances:
+        entity = MODELS[type(instance)]
+        code = ENTITIES[entity][1]
+        rows.append(
+            _row(code, instance.pk, *(getattr(instance, name) for name in fields(entity)))
+        )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+            rows,
+        )
+
+
+def remove(instances):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {TABLE} WHERE rowid = %s",
+            [
+                (instance.pk * CODES + ENTITIES[MODELS[type(instance)]][1],)
+                for instance in instances
+            ],
+        )
+
+
+def rebuild(entities=None):
+    """Re-index every row of ``entities`` (default: all), e.g. to backfill
+    or after writes that bypassed the model signals. Returns the number of
+    rows indexed."""
+    create_table()
+    indexed = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for entity in entities or ENTITIES:
+            model, code, *_ = ENTITIES[entity]
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid %% {CODES} = %s", [code])
+            rows = model.objects.order_by().values_list("pk", *fields(entity))
+            batch = []
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(_row(code, *row))
+                if len(batch) == BATCH_SIZE:
+                    cursor.executemany(
+                        f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                        batch,
+                    )
+                    indexed += len(batch)
+                    batch = []
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)", batch
+            )
+            indexed += len(batch)
+        # Merge the index segments written above into one.
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def match_expression(text):
+    """Turn what a user typed into an FTS5 query: every word must match,
+    and the last one, which may still be being typed, as a prefix if it
+    has two or more characters. Each word is quoted, so FTS5 syntax in the
+    input is matched literally.
+
+    Only the last word is a prefix because a prefix query merges the
+    postings of every indexed word it covers, which on a large index
+    costs far more than looking up one word.
+    """
+    terms = [f'"{term}"' for term in TERM.findall(text)[:MAX_TERMS]]
+    if terms and len(terms[-1]) > 3:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _url(entity, pk, order_id=None):
+    if entity == "purchases" and order_id is not None:
+        return reverse("purchase_orders_detail", args=[order_id])
+    return reverse(f"{entity}_edit", args=[pk])
+
+
+def _broad_score(terms, title, body):
+    # Titles containing every word first, then titles containing some.
+    title = title.lower()
+    return -sum(term in title for term in terms) - len(terms) * all(
+        term in title for term in terms
+    )
+
+
+def search(text, entities=None, limit=20):
+    """Return up to ``limit`` ``{"type", "id", "title", "detail", "url"}``
+    dicts matching ``text``, best first.
+
+    Results are ranked by BM25, with titles weighing ten times as much as
+    the other fields. BM25 needs the number of rows matching each word, so
+    for a query matching more than ``RANK_WINDOW`` rows the newest
+    ``RANK_WINDOW`` matches are ranked instead: titles containing the
+    words first, newest first within that.
+    """
+    expression = match_expression(text)
+    if not expression or not available():
+        return []
+    codes = [ENTITIES[entity][1] for entity in entities or ENTITIES]
+    condition = (
+        f"{TABLE} MATCH %s AND rowid %% {CODES} IN ({', '.join(['%s'] * len(codes))})"
+    )
+    with connection.cursor() as cursor:
+        # Reading matches newest first stops after the window, however
+        # many rows match.
+        cursor.execute(
+            f"SELECT rowid, title, body FROM {TABLE} WHERE {condition} "
+            f"ORDER BY rowid DESC LIMIT {RANK_WINDOW + 1}",
+            [expression, *codes],
+        )
+        rows = cursor.fetchall()
+        if len(rows) > RANK_WINDOW:
+            terms = [term.lower() for term in TERM.findall(text)[:MAX_TERMS]]
+            rows = sorted(rows[:RANK_WINDOW], key=lambda row: _broad_score(terms, *row[1:]))
+            rows = rows[:limit]
+        else:
+            cursor.execute(
+                f"SELECT rowid, title, body FROM {TABLE} WHERE {condition} "
+                f"ORDER BY bm25({TABLE}, 10.0, 1.0) LIMIT %s",
+                [expression, *codes, limit],
+            )
+            rows = cursor.fetchall()
+    hits = [
+        (BY_CODE[rowid % CODES], rowid // CODES, title, body)
+        for rowid, title, body in rows
+    ]
+
+    purchase_ids = [pk for entity, pk, *_ in hits if entity == "purchases"]
+    orders = {}
+    if purchase_ids:
+        orders = dict(
+            Purchase.objects.filter(pk__in=purchase_ids).values_list("pk", "order_id")
+        )
+    return [
+        {
+            "type": entity,
+            "id": pk,
+            "title": title,
+            "detail": body,
+            "url": _url(entity, pk, orders.get(pk)),
+        }
+        for entity, pk, title, body in hits
+    ]
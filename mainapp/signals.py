@@ -0,0 +1,121 @@
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+
+from . import metrics, rollups, scans, search, tables, typeahead
+from .models import Product
+
+
+def _count_saved(sender, instance, created, **kwargs):
+    if created:
+        metrics.changed(sender, 1)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    metrics.changed(sender, -1)
+
+
+def _remember_previous(sender, instance, **kwargs):
+    # The stored row is needed to turn an edit into a delta.
+    instance._previous = None
+    if instance._state.adding or metrics.suspended(sender):
+        return
+    instance._previous = sender.objects.filter(pk=instance.pk).first()
+
+
+def _amount(sender, instance):
+    if instance is None:
+        return 0
+    _, field = metrics.SUMS[sender]
+    return sender._meta.get_field(field).to_python(getattr(instance, field)) or 0
+
+
+def _amount_saved(sender, instance, **kwargs):
+    previous = _amount(sender, instance._previous)
+    metrics.changed(sender, _amount(sender, instance) - previous)
+
+
+def _amount_deleted(sender, instance, **kwargs):
+    metrics.changed(sender, -_amount(sender, instance))
+
+
+def _rollup_saved(sender, instance, **kwargs):
+    if not metrics.suspended(sender):
+        rollups.changed(instance._previous, instance)
+
+
+def _rollup_deleted(sender, instance, **kwargs):
+    if not metrics.suspended(sender):
+        rollups.changed(instance, None)
+
+
+def _index_saved(sender, instance, update_fields=None, **kwargs):
+    entity = search.MODELS[sender]
+    if update_fields is None or not update_fields.isdisjoint(search.fields(entity)):
+        search.index([instance])
+
+
+def _index_deleted(sender, instance, **kwargs):
+    search.remove([instance])
+
+
+def _typeahead_saved(sender, instance, update_fields=None, **kwargs):
+    for entity, fields in typeahead.MODELS[sender]:
+        if update_fields is None or not update_fields.isdisjoint(fields):
+            typeahead.changed(entity)
+
+
+def _typeahead_deleted(sender, instance, **kwargs):
+    for entity, _ in typeahead.MODELS[sender]:
+        typeahead.changed(entity)
+
+
+def _table_changed(sender, instance, **kwargs):
+    tables.changed(sender)
+
+
+def _product_changed(sender, instance, **kwargs):
+    scans.changed([instance.pk])
+
+
+def _create_search_table(sender, **kwargs):
+    if sender.name == "mainapp" and search.available():
+        search.create_table()
+
+
+for model in metrics.COUNTS:
+    label = model._meta.label
+    post_save.connect(_count_saved, sender=model, dispatch_uid=f"metrics-{label}")
+    post_delete.connect(_count_deleted, sender=model, dispatch_uid=f"metrics-{label}")
+
+for model in {*metrics.SUMS, *rollups.MODELS}:
+    label = model._meta.label
+    pre_save.connect(_remember_previous, sender=model, dispatch_uid=f"previous-{label}")
+
+for model in metrics.SUMS:
+    label = model._meta.label
+    post_save.connect(_amount_saved, sender=model, dispatch_uid=f"metrics-{label}")
+    post_delete.connect(_amount_deleted, sender=model, dispatch_uid=f"metrics-{label}")
+
+for model in rollups.MODELS:
+    label = model._meta.label
+    post_save.connect(_rollup_saved, sender=model, dispatch_uid=f"rollups-{label}")
+    post_delete.connect(_rollup_deleted, sender=model, dispatch_uid=f"rollups-{label}")
+
+for model in search.MODELS:
+    label = model._meta.label
+    post_save.connect(_index_saved, sender=model, dispatch_uid=f"search-{label}")
+    post_delete.connect(_index_deleted, sender=model, dispatch_uid=f"search-{label}")
+
+for model in typeahead.MODELS:
+    label = model._meta.label
+    post_save.connect(_typeahead_saved, sender=model, dispatch_uid=f"typeahead-{label}")
+    post_delete.connect(_typeahead_deleted, sender=model, dispatch_uid=f"typeahead-{label}")
+
+for model in tables.MODELS:
+    label = model._meta.label
+    post_save.connect(_table_changed, sender=model, dispatch_uid=f"tables-{label}")
+    post_delete.connect(_table_changed, sender=model, dispatch_uid=f"tables-{label}")
+
+post_save.connect(_product_changed, sender=Product, dispatch_uid="scans-product")
+post_delete.connect(_product_changed, sender=Product, dispatch_uid="scans-product")
+
+post_migrate.connect(_create_search_table, dispatch_uid="search-table")
@@ -28,4 +28,29 @@ document.addEventListener('DOMContentLoaded', function() {
     var donut = new ApexCharts(document.querySelector("#donut-chart"), donutChart);
     donut.render();
   }
+
+  var trendChart = document.getElementById('trend-chart');
+  if (trendChart) {
+    fetch(trendChart.dataset.source, { credentials: 'same-origin' })
+      .then(function(response) { return response.json(); })
+      .then(function(data) {
+        var names = { purchases: 'Purchases', expenses: 'Expenses', quotations: 'Quotations' };
+        var series = Object.keys(names).map(function(key) {
+          return {
+            name: names[key],
+            data: (data.series[key] || []).map(function(point) {
+              return { x: point.bucket, y: parseFloat(point.total) };
+            })
+          };
+        });
+        new ApexCharts(trendChart, {
+          chart: { height: 350, type: 'area', toolbar: { show: false } },
+          series: series,
+          colors: ['#28c76f', '#ea5455', '#7367f0'],
+          dataLabels: { enabled: false },
+          stroke: { curve: 'smooth', width: 2 },
+          xaxis: { type: 'datetime' }
+        }).render();
+      });
+  }
 });
@@ -0,0 +1,43 @@
+// Tables marked .datatable-server load their rows from the JSON endpoint in
+// data-source; searching, ordering and paging are done on the server.
+// Inputs marked data-filter-for="<table id>" send their value along as a
+// query parameter named after the input and reload the table on change.
+$(function () {
+    $('.datatable-server').each(function () {
+        var table = $(this);
+        table.DataTable({
+            serverSide: true,
+            processing: true,
+            ajax: {
+                url: table.data('source'),
+                data: function (params) {
+                    $('[data-filter-for="' + table.attr('id') + '"]').each(function () {
+                        if (this.value) {
+                            params[this.name] = this.value;
+                        }
+                    });
+                },
+            },
+            searchDelay: 400,
+            order: [],
+            bFilter: true,
+            sDom: 'fBtlpi',
+            pagingType: 'numbers',
+            ordering: true,
+            language: {
+                search: ' ',
+                sLengthMenu: '_MENU_',
+                searchPlaceholder: 'Search...',
+                info: '_START_ - _END_ of _TOTAL_ items',
+            },
+            initComplete: function () {
+                $('.dataTables_filter').appendTo('#tableSearch');
+                $('.dataTables_filter').appendTo('.search-input');
+            },
+        });
+    });
+});
+
+$(document).on('change', '[data-filter-for]', function () {
+    $('#' + $(this).data('filter-for')).DataTable().ajax.reload();
+});
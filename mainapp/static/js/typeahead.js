@@ -0,0 +1,37 @@
+// Select boxes marked data-typeahead="<url>" load their options from that
+// endpoint as the user types instead of listing every row in the page.
+// The page only renders the empty option and the current choice.
+function initTypeahead(scope) {
+    $(scope).find('select[data-typeahead]').each(function () {
+        var select = $(this);
+        select.select2({
+            width: '100%',
+            placeholder: select.find('option[value=""]').text(),
+            allowClear: !select.prop('required'),
+            ajax: {
+                url: select.data('typeahead'),
+                dataType: 'json',
+                delay: 250,
+                data: function (params) {
+                    return {q: params.term || ''};
+                },
+            },
+        });
+    });
+}
+
+// A row cloned from the page carries a copy of the first row's widget and
+// choice; drop both and set the row's selects up again.
+function resetTypeahead(row) {
+    row = $(row);
+    row.find('.select2-container').remove();
+    row.find('select[data-typeahead]')
+        .removeClass('select2-hidden-accessible')
+        .removeAttr('data-select2-id aria-hidden tabindex')
+        .find('option[value!=""]').remove();
+    initTypeahead(row);
+}
+
+$(function () {
+    initTypeahead(document);
+});
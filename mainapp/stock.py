@@ -0,0 +1,406 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from . import scans
+from .models import Product, Purchase, StockMovement, StockSnapshot
+
+
+# Movements younger than this are left out of new snapshots, so a movement
+# still being committed cannot land before a snapshot that missed it.
+SNAPSHOT_LAG = getattr(settings, "STOCK_SNAPSHOT_LAG", 5 * 60)
+
+Kind = StockMovement.KindChoices
+
+# Purchases flipped per UPDATE statement, and products read per
+# ``IN (...)`` query, well below SQLite's variable limit.
+FLIP_BATCH_SIZE = 500
+READ_BATCH_SIZE = 500
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Not enough stock of product {product_id} to remove {requested}.")
+
+
+def _change(product_id, delta, now):
+    """Apply one delta as ``UPDATE ... SET quantity = quantity + delta``.
+
+    A decrement carries ``WHERE quantity >= -delta``, so the check and the
+    write are one statement and stock can never go below zero, however
+    many requests race on the same product.
+    """
+    if not delta:
+        return
+    products = Product.objects.filter(pk=product_id)
+    if delta < 0:
+        products = products.filter(quantity__gte=-delta)
+    if not products.update(quantity=F("quantity") + delta, updated_at=now):
+        raise InsufficientStock(product_id, -delta)
+    scans.changed([product_id])
+
+
+def _apply(movements):
+    """Apply unsaved :class:`StockMovement` objects to stock and append them
+    to the ledger, all in one transaction.
+
+    Deltas for the same product are netted first, and products are updated
+    in id order so concurrent batches lock rows in the same order.
+    """
+    net = defaultdict(int)
+    for movement in movements:
+        net[movement.product_id] += movement.quantity
+
+    now = timezone.now()
+    with transaction.atomic():
+        for product_id in sorted(net):
+            _change(product_id, net[product_id], now)
+        for movement in movements:
+            movement.created_at = now
+        StockMovement.objects.bulk_create(
+            [movement for movement in movements if movement.quantity], batch_size=1000
+        )
+
+
+def apply(adjustments, kind=Kind.ADJUSTMENT, note=""):
+    """Apply ``{product_id: delta}`` (or ``[(product_id, delta), ...]``) in
+    one transaction: either every product changes or none does."""
+    items = adjustments.items() if isinstance(adjustments, dict) else adjustments
+    _apply(
+        [
+            StockMovement(product_id=product_id, kind=kind, quantity=delta, note=note)
+            for product_id, delta in items
+        ]
+    )
+
+
+def adjust(product_id, delta, note=""):
+    apply({product_id: delta}, note=note)
+
+
+def apply_bulk(adjustments, kind=Kind.ADJUSTMENT, note=""):
+    """:func:`apply` for adjustments of many products at once.
+
+    :func:`apply` runs one guarded ORM ``UPDATE`` per product, which for
+    tens of thousands of products takes a while. Here they are one
+    parameterized ``UPDATE ... SET quantity = quantity + %s`` run through
+    ``executemany()`` and one ``bulk_create()`` of the movements. The
+    column's own ``CHECK (quantity >= 0)`` stands in for the per-statement
+    guard: a decrement the stock cannot cover rolls the whole batch back
+    and raises :class:`InsufficientStock` for the first such product.
+    """
+    items = list(adjustments.items() if isinstance(adjustments, dict) else adjustments)
+    net = defaultdict(int)
+    for product_id, delta in items:
+        net[product_id] += delta
+    rows = sorted((product_id, delta) for product_id, delta in net.items() if delta)
+
+    now = timezone.now()
+    opts = Product._meta
+    quote = connection.ops.quote_name
+    quantity = quote(opts.get_field("quantity").column)
+    updated_at = opts.get_field("updated_at")
+    stamp = updated_at.get_db_prep_save(now, connection)
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {quote(opts.db_table)} SET {quantity} = {quantity} + %s, "
+                    f"{quote(updated_at.column)} = %s WHERE {quote(opts.pk.column)} = %s",
+                    [(delta, stamp, product_id) for product_id, delta in rows],
+                )
+            StockMovement.objects.bulk_create(
+                [
+                    StockMovement(
+                        product_id=product_id,
+                        kind=kind,
+                        quantity=delta,
+                        note=note,
+                        created_at=now,
+                    )
+                    for product_id, delta in items
+                    if delta
+                ],
+                batch_size=1000,
+            )
+            scans.changed(product_id for product_id, _ in rows)
+    except (IntegrityError, DataError):
+        decrements = {product_id: delta for product_id, delta in rows if delta < 0}
+        ids = sorted(decrements)
+        short = []
+        for offset in range(0, len(ids), READ_BATCH_SIZE):
+            quantities = Product.objects.filter(
+                pk__in=ids[offset : offset + READ_BATCH_SIZE]
+            ).values_list("pk", "quantity")
+            short.extend(pk for pk, current in quantities if current + decrements[pk] < 0)
+        if not short:
+            raise
+        product_id = min(short)
+        raise InsufficientStock(product_id, -decrements[product_id]) from None
+
+
+class Line:
+    """Per-purchase outcomes of :func:`receive` and :func:`unreceive`."""
+
+    RECEIVED = "received"
+    ALREADY_RECEIVED = "already_received"
+    REVERSED = "reversed"
+    NOT_RECEIVED = "not_received"
+    INSUFFICIENT_STOCK = "insufficient_stock"
+    NO_PRODUCT = "no_product"
+    NOT_FOUND = "not_found"
+
+
+def _can_return_from_update():
+    # Django's can_return_columns_from_insert only covers INSERT.
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == "postgresql"
+
+
+def _flip(purchase_ids, received, now):
+    """Set ``is_quantity_added_to_product`` to ``received`` on the purchases
+    where it is not set yet, and return the ids that changed.
+
+    This is one ``UPDATE ... WHERE id IN (...) AND flag = NOT received``,
+    so a purchase received twice at the same time is counted once. On
+    SQLite 3.35+ and PostgreSQL the changed ids come back from that
+    statement's ``RETURNING``; elsewhere (MariaDB and MySQL have no
+    ``UPDATE ... RETURNING``) each purchase gets its own guarded UPDATE.
+    Either way the first statement writes, so SQLite never has to upgrade
+    a read lock inside the transaction.
+    """
+    if not _can_return_from_update():
+        flipped = []
+        for purchase_id in purchase_ids:
+            if Purchase.objects.filter(
+                pk=purchase_id,
+                product__isnull=False,
+                is_quantity_added_to_product=not received,
+            ).update(is_quantity_added_to_product=received, updated_at=now):
+                flipped.append(purchase_id)
+        return flipped
+
+    opts = Purchase._meta
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    pk = quote(opts.pk.column)
+    product = quote(opts.get_field("product").column)
+    flag = quote(opts.get_field("is_quantity_added_to_product").column)
+    updated_at = opts.get_field("updated_at")
+    stamp = updated_at.get_db_prep_value(now, connection)
+
+    flipped = []
+    for offset in range(0, len(purchase_ids), FLIP_BATCH_SIZE):
+        batch = purchase_ids[offset : offset + FLIP_BATCH_SIZE]
+        placeholders = ", ".join(["%s"] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {flag} = %s, {quote(updated_at.column)} = %s "
+                f"WHERE {pk} IN ({placeholders}) AND {product} IS NOT NULL "
+                f"AND {flag} = %s RETURNING {pk}",
+                [received, stamp, *batch, not received],
+            )
+            flipped.extend(row[0] for row in cursor.fetchall())
+    return flipped
+
+
+def _set_received(purchase_ids, received):
+    """Receive or reverse many purchases in one transaction and return
+    ``{purchase_id: Line.*}``.
+
+    Quantities are netted per product and applied with one guarded UPDATE
+    per product. When a product does not have enough stock for a reversal,
+    only the purchases of that product are left untouched.
+    """
+    purchase_ids = sorted(set(purchase_ids))
+    now = timezone.now()
+    sign, kind = (1, Kind.RECEIPT) if received else (-1, Kind.REVERSAL)
+    done, skipped = (
+        (Line.RECEIVED, Line.ALREADY_RECEIVED)
+        if received
+        else (Line.REVERSED, Line.NOT_RECEIVED)
+    )
+
+    with transaction.atomic():
+        flipped = _flip(purchase_ids, received, now)
+        lines = defaultdict(list)
+        for purchase_id, product_id, quantity in Purchase.objects.filter(
+            pk__in=flipped
+        ).values_list("pk", "product_id", "quantity"):
+            lines[product_id].append((purchase_id, quantity))
+
+        results = {}
+        movements = []
+        short = []
+        for product_id in sorted(lines):
+            delta = sign * sum(quantity for _, quantity in lines[product_id])
+            try:
+                _change(product_id, delta, now)
+            except InsufficientStock:
+                short.extend(purchase_id for purchase_id, _ in lines[product_id])
+                continue
+            for purchase_id, quantity in lines[product_id]:
+                results[purchase_id] = done
+                if quantity:
+                    movements.append(
+                        StockMovement(
+                            product_id=product_id,
+                            kind=kind,
+                            quantity=sign * quantity,
+                            purchase_id=purchase_id,
+                            created_at=now,
+                        )
+                    )
+        if short:
+            Purchase.objects.filter(pk__in=short).update(
+                is_quantity_added_to_product=not received
+            )
+            results.update(dict.fromkeys(short, Line.INSUFFICIENT_STOCK))
+        StockMovement.objects.bulk_create(movements, batch_size=1000)
+
+    remaining = [pk for pk in purchase_ids if pk not in results]
+    existing = dict(
+        Purchase.objects.filter(pk__in=remaining).values_list("pk", "product_id")
+    )
+    for purchase_id in remaining:
+        if purchase_id not in existing:
+            results[purchase_id] = Line.NOT_FOUND
+        elif existing[purchase_id] is None:
+            results[purchase_id] = Line.NO_PRODUCT
+        else:
+            results[purchase_id] = skipped
+    return results
+
+
+def receive(purchase_ids):
+    """Add the quantities of the given purchases to stock.
+
+    Returns ``{purchase_id: Line.*}``; purchases that are already received
+    are reported and skipped.
+    """
+    return _set_received(purchase_ids, True)
+
+
+def unreceive(purchase_ids):
+    """Take the quantities of the given purchases back out of stock.
+
+    Returns ``{purchase_id: Line.*}``. Stock never goes below zero: the
+    purchases of a product that cannot cover them are reported as
+    ``Line.INSUFFICIENT_STOCK`` and left received.
+    """
+    return _set_received(purchase_ids, False)
+
+
+def _moved(product_id, after=None, until=None):
+    movements = StockMovement.objects.filter(product_id=product_id)
+    if after is not None:
+        movements = movements.filter(created_at__gt=after)
+    if until is not None:
+        movements = movements.filter(created_at__lte=until)
+    return movements.aggregate(total=Sum("quantity"))["total"] or 0
+
+
+def quantity_at(product_id, when):
+    """Stock of a product at ``when``: the nearest snapshot plus (or minus)
+    the movements between it and ``when``.
+
+    Before the first snapshot, the earliest snapshot (or, without any, the
+    current quantity) is wound back instead.
+    """
+    snapshots = StockSnapshot.objects.filter(product_id=product_id)
+    before = snapshots.filter(taken_at__lte=when).order_by("-taken_at").first()
+    if before is not None:
+        return before.quantity + _moved(product_id, after=before.taken_at, until=when)
+
+    after = snapshots.order_by("taken_at").first()
+    if after is not None:
+        return after.quantity - _moved(product_id, after=when, until=after.taken_at)
+
+    # One statement, so the quantity and the movements are read together.
+    moved_since = (
+        StockMovement.objects.filter(product_id=OuterRef("pk"), created_at__gt=when)
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    current, moved = (
+        Product.objects.filter(pk=product_id)
+        .annotate(moved=Subquery(moved_since))
+        .values_list("quantity", "moved")
+        .get()
+    )
+    return current - (moved or 0)
+
+
+def take_snapshots(now=None):
+    """Snapshot every product with movements since its last snapshot, and
+    every product that has none yet. Returns the number written.
+
+    Snapshots are taken ``SNAPSHOT_LAG`` in the past and derived from the
+    previous snapshot plus the ledger, never from ``Product.quantity``
+    directly, so they stay consistent with concurrent writers. A product's
+    first snapshot winds its current quantity back to that moment.
+
+    Everything is read in one statement over the products: the last
+    snapshot and the movements since it (or, without one, after the
+    cutoff) are correlated subqueries on the ``(product, taken_at)`` and
+    ``(product, created_at)`` indexes, so a run costs one query plus the
+    inserts however many products there are.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=SNAPSHOT_LAG)
+    latest = StockSnapshot.objects.filter(product_id=OuterRef("pk")).order_by("-taken_at")
+
+    def moved(**window):
+        movements = (
+            StockMovement.objects.filter(product_id=OuterRef("pk"), **window)
+            .values("product_id")
+        )
+        return (
+            Subquery(movements.annotate(total=Sum("quantity")).values("total")),
+            Subquery(movements.annotate(rows=Count("pk")).values("rows")),
+        )
+
+    since_total, since_rows = moved(
+        created_at__gt=OuterRef("last_taken"), created_at__lte=cutoff
+    )
+    after_total, _ = moved(created_at__gt=cutoff)
+    rows = (
+        Product.objects.annotate(
+            last_taken=Subquery(latest.values("taken_at")[:1]),
+            last_quantity=Subquery(latest.values("quantity")[:1]),
+        )
+        .annotate(
+            since_total=since_total,
+            since_rows=since_rows,
+            after_total=after_total,
+        )
+        .values_list(
+            "pk",
+            "quantity",
+            "last_taken",
+            "last_quantity",
+            "since_total",
+            "since_rows",
+            "after_total",
+        )
+        .order_by("pk")
+    )
+
+    snapshots = []
+    for pk, current, last_taken, last_quantity, since, since_rows, after in rows.iterator():
+        if last_taken is None:
+            quantity = current - (after or 0)
+        elif last_taken >= cutoff or not since_rows:
+            continue
+        else:
+            quantity = last_quantity + since
+        snapshots.append(StockSnapshot(product_id=pk, taken_at=cutoff, quantity=quantity))
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
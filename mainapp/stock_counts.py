@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from collections import namedtuple
+
+from . import stock
+from .models import Product, StockMovement
+
+
+MAX_LINES = 100_000
+
+Problem = namedtuple("Problem", ["line", "sku", "message"])
+Reconciliation = namedtuple(
+    "Reconciliation", ["lines", "skus", "unchanged", "differences", "problems", "applied"]
+)
+
+
+class Difference(namedtuple("Difference", ["product_id", "sku", "name", "recorded", "counted"])):
+    @property
+    def difference(self):
+        return self.counted - self.recorded
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+def _integer(text):
+    # int() rather than str.isdigit(), which also accepts digits such as
+    # "²" that int() rejects.
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def read_csv(lines):
+    """Yield ``(line, sku, counted_quantity)`` from CSV rows of an SKU and a
+    counted quantity. A first row whose quantity is not a number is taken
+    as a header and skipped."""
+    rows = csv.reader(lines)
+    try:
+        for number, row in enumerate(rows, start=1):
+            if not any(cell.strip() for cell in row):
+                continue
+            sku = row[0].strip()
+            quantity = row[1].strip() if len(row) > 1 else ""
+            if number == 1 and _integer(quantity) is None:
+                continue
+            yield number, sku, quantity
+    except UnicodeDecodeError:
+        raise InvalidUpload("The file is not UTF-8 text.") from None
+    except csv.Error as exc:
+        raise InvalidUpload(f"The file is not valid CSV: {exc}") from None
+
+
+def read_json(stream):
+    """Yield ``(item, sku, counted_quantity)`` from a JSON list of
+    ``{"sku": ..., "counted_quantity": ...}`` objects or ``[sku, quantity]``
+    pairs; ``item`` counts from 1."""
+    try:
+        items = json.load(stream)
+    except ValueError:
+        raise InvalidUpload("The file is not valid JSON.") from None
+    if not isinstance(items, list):
+        raise InvalidUpload("Expected a JSON list of counts.")
+    for number, item in enumerate(items, start=1):
+        if isinstance(item, dict):
+            sku, quantity = item.get("sku"), item.get("counted_quantity")
+        elif isinstance(item, list) and len(item) == 2:
+            sku, quantity = item
+        else:
+            sku, quantity = None, None
+        yield number, str(sku or "").strip(), quantity
+
+
+def read(upload):
+    """Stream the counts of an uploaded CSV or JSON file, told apart by
+    the file name or content type."""
+    if upload.name.lower().endswith(".json") or "json" in (upload.content_type or ""):
+        return read_json(upload)
+    return read_csv(io.TextIOWrapper(upload, encoding="utf-8-sig", newline=""))
+
+
+def _quantity(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if value >= 0 else None
+    if isinstance(value, str):
+        number = _integer(value)
+        if number is not None and number >= 0:
+            return number
+    return None
+
+
+def reconcile(rows, apply=False, note="Stock count"):
+    """Compare counted quantities with ``Product.quantity``.
+
+    ``rows`` are ``(line, sku, counted_quantity)`` as the readers above
+    yield them. Counts of the same SKU on several lines (several shelves)
+    add up. SKUs are resolved with one ``sku IN (...)`` query per batch.
+    With ``apply``, every difference is booked at once through
+    :func:`mainapp.stock.apply_bulk` as a ``count`` movement; lines with
+    problems (an unknown SKU, a quantity that is not a whole number) are
+    reported and left out.
+
+    Differences are applied as deltas, like every other stock change, so
+    a movement booked between reading and applying the count is kept
+    rather than overwritten. May raise :class:`InvalidUpload`, and
+    :class:`mainapp.stock.InsufficientStock` if such a movement left too
+    little stock for a decrement (nothing is applied then).
+    """
+    counts = {}
+    first_line = {}
+    problems = []
+    lines = 0
+    for line, sku, quantity in rows:
+        lines += 1
+        if lines > MAX_LINES:
+            raise InvalidUpload(f"A count may have at most {MAX_LINES} lines.")
+        value = _quantity(quantity)
+        if not sku:
+            problems.append(Problem(line, "", "No SKU."))
+        elif value is None:
+            problems.append(
+                Problem(line, sku, "Counted quantity must be a whole number of at least 0.")
+            )
+        else:
+            counts[sku] = counts.get(sku, 0) + value
+            first_line.setdefault(sku, line)
+
+    skus = list(counts)
+    differences = []
+    unchanged = 0
+    for offset in range(0, len(skus), stock.READ_BATCH_SIZE):
+        products = Product.objects.filter(
+            sku__in=skus[offset : offset + stock.READ_BATCH_SIZE]
+        ).values_list("pk", "sku", "name", "quantity")
+        for pk, sku, name, recorded in products:
+            # What is left in ``counts`` afterwards are the unknown SKUs.
+            counted = counts.pop(sku)
+            if counted == recorded:
+                unchanged += 1
+            else:
+                differences.append(Difference(pk, sku, name, recorded, counted))
+    problems.extend(Problem(first_line[sku], sku, "Unknown SKU.") for sku in counts)
+    problems.sort()
+    differences.sort(key=lambda difference: first_line[difference.sku])
+
+    if apply and differences:
+        stock.apply_bulk(
+            [(difference.product_id, difference.difference) for difference in differences],
+            kind=StockMovement.KindChoices.COUNT,
+            note=note,
+        )
+    return Reconciliation(
+        lines, len(skus), unchanged, differences, problems, bool(apply and differences)
+    )
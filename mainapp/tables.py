@@ -0,0 +1,388 @@
+import threading
+
+from django.db.models import Q
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.template.defaultfilters import date as date_filter, floatformat
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html
+
+from . import versions
+from .models import (
+    Customer,
+    Expense,
+    Product,
+    Purchase,
+    PurchaseOrder,
+    Quotation,
+    Supplier,
+)
+
+
+MAX_PAGE_LENGTH = 500
+# Unfiltered row counts kept per process, oldest dropped first.
+MAX_CACHED_COUNTS = 256
+
+# Models listed in tables; their signals call changed().
+MODELS = [Customer, Expense, Product, Purchase, PurchaseOrder, Quotation, Supplier]
+
+# (scope, SQL, params) -> (version, row count)
+_counts = {}
+_counts_lock = threading.Lock()
+
+
+class Column:
+    """One DataTables column: how to render a cell and which model field(s)
+    to order by (``None`` if the column cannot be sorted in SQL)."""
+
+    def __init__(self, render, order_by=None):
+        self.render = render
+        self.order_by = [order_by] if isinstance(order_by, str) else order_by
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def scope_of(model):
+    return f"rows:{model._meta.label_lower}"
+
+
+def changed(*models):
+    """Record that rows of ``models`` were added, removed or changed, so
+    every process counts their tables again. Model signals call this for
+    single rows; bulk writes are covered by ``metrics.bulk()``."""
+    for model in models:
+        versions.bump(scope_of(model))
+
+
+def count(queryset):
+    """Return ``queryset.count()``, counted once per version of its model's
+    rows instead of on every request. The filters of a table are only ever
+    on the model's own columns, so its version covers them too."""
+    scope = scope_of(queryset.model)
+    sql, params = queryset.query.sql_with_params()
+    key = (scope, sql, tuple(map(str, params)))
+    version = versions.current(scope)
+    cached = _counts.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    total = queryset.count()
+    with _counts_lock:
+        _counts.pop(key, None)
+        _counts[key] = (version, total)
+        while len(_counts) > MAX_CACHED_COUNTS:
+            del _counts[next(iter(_counts))]
+    return total
+
+
+def datatable_response(request, queryset, columns, search_fields):
+    """Answer a DataTables server-side processing request.
+
+    Filtering, ordering and paging all happen in SQL, so only one page of
+    rows is ever loaded and rendered. The unfiltered total comes from
+    :func:`count`; only a search runs a ``COUNT`` on every draw.
+    """
+    params = request.GET
+    draw = _int(params.get("draw"), 0)
+    start = max(_int(params.get("start"), 0), 0)
+    length = _int(params.get("length"), 10)
+    if length <= 0 or length > MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+
+    records_total = count(queryset)
+    records_filtered = records_total
+    search = params.get("search[value]", "").strip()
+    if search:
+        condition = Q()
+        for field in search_fields:
+            condition |= Q(**{f"{field}__icontains": search})
+        queryset = queryset.filter(condition)
+        records_filtered = queryset.count()
+
+    ordering = []
+    i = 0
+    while f"order[{i}][column]" in params:
+        index = _int(params.get(f"order[{i}][column]"), -1)
+        descending = params.get(f"order[{i}][dir]") == "desc"
+        if 0 <= index < len(columns) and columns[index].order_by:
+            for field in columns[index].order_by:
+                ordering.append(f"-{field}" if descending else field)
+        i += 1
+    if ordering:
+        queryset = queryset.order_by(*ordering, "pk")
+
+    page = queryset[start : start + length]
+    data = [[column.render(obj, request) for column in columns] for obj in page]
+    return JsonResponse(
+        {
+            "draw": draw,
+            "recordsTotal": records_total,
+            "recordsFiltered": records_filtered,
+            "data": data,
+        }
+    )
+
+
+def _text(attr):
+    def render(obj, request):
+        value = obj
+        for part in attr.split("."):
+            value = getattr(value, part, None)
+            if value is None:
+                return ""
+        return format_html("{}", value)
+
+    return render
+
+
+def _display(field):
+    """Render the display label of a choice field, escaped: a value outside
+    the choices is shown as stored."""
+
+    def render(obj, request):
+        return format_html("{}", getattr(obj, f"get_{field}_display")())
+
+    return render
+
+
+def _money(attr):
+    def render(obj, request):
+        value = getattr(obj, attr)
+        return floatformat(value() if callable(value) else value, 2)
+
+    return render
+
+
+def _image_name(name, image):
+    def render(obj, request):
+        url = image(obj)
+        return format_html(
+            '<a href="javascript:void(0);" class="product-img">{}</a>'
+            '<a href="javascript:void(0);">{}</a>',
+            format_html('<img src="{}" alt="img">', url) if url else "",
+            name(obj),
+        )
+
+    return render
+
+
+def _buttons(edit_name, delete_name):
+    def render(obj, request):
+        return format_html(
+            '<a href="{}" class="btn btn-sm btn-primary me-2">Edit</a>'
+            '<a href="{}" class="btn btn-sm btn-danger">Delete</a>',
+            reverse(edit_name, args=[obj.pk]),
+            reverse(delete_name, args=[obj.pk]),
+        )
+
+    return render
+
+
+def _product_category(obj, request):
+    if not obj.sub_category:
+        return "-"
+    return format_html(
+        "{} / {}", obj.sub_category.category.name, obj.sub_category.name
+    )
+
+
+def _discounted_price(obj, request):
+    return f"{floatformat(obj.discounted_price, 2)}$"
+
+
+PRODUCT_COLUMNS = [
+    Column(_text("id"), "id"),
+    Column(
+        _image_name(lambda p: p.name, lambda p: p.main_image.url if p.main_image else None),
+        "name",
+    ),
+    Column(_product_category, ["sub_category__category__name", "sub_category__name"]),
+    Column(_text("sku"), "sku"),
+    Column(_text("quantity"), "quantity"),
+    Column(_text("unit"), "unit"),
+    Column(lambda p, request: f"{p.price}$", "price"),
+    Column(lambda p, request: f"{p.discount_percentage}%", "discount_percentage"),
+    Column(_discounted_price, "discounted_price"),
+    Column(_display("status"), "status"),
+    Column(_buttons("products_edit", "products_delete")),
+]
+
+PRODUCT_SEARCH = ["name", "sku", "sub_category__name", "sub_category__category__name"]
+
+
+CUSTOMER_COLUMNS = [
+    Column(
+        _image_name(lambda c: c.name, lambda c: c.avatar.url if c.avatar else None), "name"
+    ),
+    Column(_text("phone"), "phone"),
+    Column(_text("email"), "email"),
+    Column(_text("country"), "country"),
+    Column(_text("city"), "city"),
+    Column(_text("address"), "address"),
+    Column(_buttons("customers_edit", "customers_delete")),
+]
+
+CUSTOMER_SEARCH = ["name", "phone", "email", "country", "city", "address"]
+
+
+SUPPLIER_COLUMNS = [
+    Column(
+        _image_name(lambda s: s.name, lambda s: s.avatar.url if s.avatar else None), "name"
+    ),
+    Column(_text("phone"), "phone"),
+    Column(_text("email"), "email"),
+    Column(_text("country"), "country"),
+    Column(_buttons("suppliers_edit", "suppliers_delete")),
+]
+
+SUPPLIER_SEARCH = ["name", "phone", "email", "country"]
+
+
+EXPENSE_COLUMNS = [
+    Column(_text("id"), "id"),
+    Column(lambda e, request: date_filter(e.date, "N j, Y"), "date"),
+    Column(_text("expense_category.name"), "expense_category__name"),
+    Column(_text("reference"), "reference"),
+    Column(_text("expense_for"), "expense_for"),
+    Column(_text("amount"), "amount"),
+    Column(_buttons("expenses_edit", "expenses_delete")),
+]
+
+EXPENSE_SEARCH = ["reference", "expense_for", "expense_category__name"]
+
+
+QUOTATION_BADGES = {
+    "accepted": "bg-lightgreen",
+    "sent": "bg-lightgreen",
+    "ordered": "bg-lightyellow",
+    "pending": "bg-lightred",
+    "rejected": "bg-lightred",
+}
+
+
+def _quotation_status(obj, request):
+    return format_html(
+        '<span class="badges {}">{}</span>',
+        QUOTATION_BADGES.get(obj.status, "bg-lightgrey"),
+        obj.get_status_display(),
+    )
+
+
+def _quotation_actions(obj, request):
+    return format_html(
+        '<a class="me-3" href="{}"><img src="{}" alt="img"></a>'
+        '<a class="me-3" href="{}"><img src="{}" alt="img"></a>',
+        reverse("quotations_edit", args=[obj.pk]),
+        static("img/icons/edit.svg"),
+        reverse("quotations_delete", args=[obj.pk]),
+        static("img/icons/delete.svg"),
+    )
+
+
+QUOTATION_COLUMNS = [
+    Column(_text("reference"), "reference"),
+    Column(_text("customer.name"), "customer__name"),
+    Column(_quotation_status, "status"),
+    Column(_text("line_count"), "line_count"),
+    Column(_money("subtotal"), "subtotal"),
+    Column(_money("discount_amount"), "discount_amount"),
+    Column(_money("tax_amount"), "tax_amount"),
+    Column(_money("grand_total"), "grand_total"),
+    Column(lambda q, request: date_filter(q.created_at, "Y-m-d"), "created_at"),
+    Column(_quotation_actions),
+]
+
+QUOTATION_SEARCH = ["reference", "customer__name", "status"]
+
+
+def _purchase_actions(obj, request):
+    return format_html(
+        '<a class="me-2" href="{edit}"><img src="{edit_icon}" alt="Edit"></a>'
+        '<a class="me-2" href="{delete}" onclick="event.preventDefault(); '
+        "document.getElementById('delete-form-{pk}').submit();\">"
+        '<img src="{delete_icon}" alt="Delete"></a>'
+        '<form id="delete-form-{pk}" action="{delete}" method="post" hidden>'
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{csrf}"></form>'
+        '<a class="me-2" href="{more}"><img src="{more_icon}" alt="More"></a>',
+        pk=obj.pk,
+        edit=reverse("purchases_edit", args=[obj.pk]),
+        edit_icon=static("img/icons/edit.svg"),
+        delete=reverse("purchases_delete", args=[obj.pk]),
+        delete_icon=static("img/icons/delete.svg"),
+        csrf=get_token(request),
+        more=reverse("purchases_more_options", args=[obj.pk]),
+        more_icon=static("img/icons/plus.svg"),
+    )
+
+
+def _purchase_select(obj, request):
+    return format_html(
+        '<input type="checkbox" name="purchase_ids" value="{}" form="bulk-receive-form" '
+        'class="purchase-select" aria-label="Select {}">',
+        obj.pk,
+        obj.reference,
+    )
+
+
+PURCHASE_COLUMNS = [
+    Column(_purchase_select),
+    Column(_text("supplier.name"), "supplier__name"),
+    Column(_text("product.name"), "product__name"),
+    Column(_text("reference"), "reference"),
+    Column(lambda p, request: date_filter(p.purchase_date, "Y-m-d"), "purchase_date"),
+    Column(_text("quantity"), "quantity"),
+    Column(_money("unit_price"), "unit_price"),
+    Column(_money("discount"), "discount"),
+    Column(_money("tax_rate"), "tax_rate"),
+    Column(_money("tax_amount"), "tax_amount"),
+    Column(_money("line_total"), "line_total"),
+    Column(_display("status"), "status"),
+    Column(_display("payment_status"), "payment_status"),
+    Column(_money("paid_amount"), "paid_amount"),
+    Column(_money("remaining_amount")),
+    Column(_text("description"), "description"),
+    Column(_purchase_actions),
+]
+
+PURCHASE_SEARCH = ["reference", "supplier__name", "product__name", "description"]
+
+
+def _purchase_order_actions(obj, request):
+    return format_html(
+        '<a class="me-2" href="{view}"><img src="{view_icon}" alt="View"></a>'
+        '<a class="me-2" href="{delete}" onclick="event.preventDefault(); '
+        "document.getElementById('delete-order-form-{pk}').submit();\">"
+        '<img src="{delete_icon}" alt="Delete"></a>'
+        '<form id="delete-order-form-{pk}" action="{delete}" method="post" hidden>'
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{csrf}"></form>',
+        pk=obj.pk,
+        view=reverse("purchase_orders_detail", args=[obj.pk]),
+        view_icon=static("img/icons/eye.svg"),
+        delete=reverse("purchase_orders_delete", args=[obj.pk]),
+        delete_icon=static("img/icons/delete.svg"),
+        csrf=get_token(request),
+    )
+
+
+PURCHASE_ORDER_COLUMNS = [
+    Column(_text("reference"), "reference"),
+    Column(_text("supplier.name"), "supplier__name"),
+    Column(lambda o, request: date_filter(o.order_date, "Y-m-d"), "order_date"),
+    Column(_text("line_count"), "line_count"),
+    Column(_money("subtotal"), "subtotal"),
+    Column(_money("discount_amount"), "discount_amount"),
+    Column(_money("tax_amount"), "tax_amount"),
+    Column(_money("total"), "total"),
+    Column(_display("status"), "status"),
+    Column(_display("payment_status"), "payment_status"),
+    Column(_money("paid_amount"), "paid_amount"),
+    Column(_money("remaining_amount")),
+    Column(_purchase_order_actions),
+]
+
+PURCHASE_ORDER_SEARCH = ["reference", "supplier__name", "description"]
@@ -1,3 +1,197 @@
-from django.test import TestCase
+import random
+import threading
+import time
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from . import stock
+from .models import Product, Purchase, StockMovement, Supplier
+
+
+def _retrying(call):
+    """Run ``call`` until the database lets it through. SQLite's shared
+    in-memory test database reports a busy table at once instead of
+    waiting, and the failed attempt is rolled back."""
+    while True:
+        try:
+            return call()
+        except OperationalError:
+            time.sleep(0.001)
+
+
+def _concurrently(workers, target):
+    """Run ``target(worker)`` in ``workers`` threads at the same time and
+    return their results in worker order."""
+    results = [None] * workers
+    errors = []
+    start = threading.Barrier(workers)
+
+    def run(worker):
+        try:
+            start.wait()
+            results[worker] = target(worker)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    WORKERS = 8
+
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name="Supplier")
+
+    def product(self, sku, quantity=0):
+        return Product.objects.create(
+            name=sku, unit="pcs", sku=sku, price=1, quantity=quantity
+        )
+
+    def moved(self, product):
+        return StockMovement.objects.filter(product=product).aggregate(
+            total=Sum("quantity")
+        )["total"] or 0
+
+    def test_concurrent_decrements_lose_nothing_and_stop_at_zero(self):
+        product = self.product("DEC", quantity=100)
+
+        def take(worker):
+            taken = refused = 0
+            for _ in range(25):
+                try:
+                    _retrying(lambda: stock.adjust(product.pk, -1))
+                    taken += 1
+                except stock.InsufficientStock:
+                    refused += 1
+            return taken, refused
+
+        results = _concurrently(self.WORKERS, take)
+
+        product.refresh_from_db()
+        self.assertEqual(sum(taken for taken, _ in results), 100)
+        self.assertEqual(sum(refused for _, refused in results), self.WORKERS * 25 - 100)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(self.moved(product), -100)
+
+    def test_concurrent_receive_and_unreceive_keep_stock_consistent(self):
+        products = [self.product(f"RCV-{number}") for number in range(3)]
+        purchases = [
+            Purchase.objects.create(
+                supplier=self.supplier,
+                product=products[number % 3],
+                reference=f"R{number}",
+                purchase_date=date.today(),
+                quantity=number % 9 + 1,
+                unit_price=1,
+            ).pk
+            for number in range(24)
+        ]
+
+        def churn(worker):
+            rnd = random.Random(worker)
+            adjusted = dict.fromkeys((product.pk for product in products), 0)
+            for _ in range(50):
+                batch = rnd.sample(purchases, rnd.randint(1, 4))
+                choice = rnd.random()
+                if choice < 0.2:
+                    product_id = rnd.choice(products).pk
+                    delta = rnd.choice([-3, 2])
+                    try:
+                        _retrying(lambda: stock.adjust(product_id, delta))
+                    except stock.InsufficientStock:
+                        continue
+                    adjusted[product_id] += delta
+                elif choice < 0.6:
+                    _retrying(lambda: stock.receive(batch))
+                else:
+                    _retrying(lambda: stock.unreceive(batch))
+            return adjusted
+
+        results = _concurrently(self.WORKERS, churn)
+
+        for product in products:
+            product.refresh_from_db()
+            received = (
+                Purchase.objects.filter(
+                    product=product, is_quantity_added_to_product=True
+                ).aggregate(total=Sum("quantity"))["total"]
+                or 0
+            )
+            adjusted = sum(result[product.pk] for result in results)
+            self.assertGreaterEqual(product.quantity, 0)
+            self.assertEqual(product.quantity, received + adjusted)
+            self.assertEqual(self.moved(product), product.quantity)
+
+
+class ProductEditTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("editor", "editor@example.com")
+        self.client.force_login(user)
+        self.product = Product.objects.create(
+            name="Edited", unit="pcs", sku="EDIT", price=1, quantity=10
+        )
+        self.url = reverse("products_edit", args=[self.product.pk])
+
+    def edit(self, form, **changes):
+        data = {
+            "name": "Edited",
+            "unit": "pcs",
+            "sku": "EDIT",
+            "price": "1",
+            "status": "active",
+            "quantity": "10",
+            "original_quantity": form.context["old"]["original_quantity"],
+        }
+        data.update(changes)
+        return self.client.post(self.url, data)
+
+    def test_receipt_booked_while_editing_survives(self):
+        form = self.client.get(self.url)
+        self.assertContains(form, 'name="original_quantity" value="10"')
+        purchase = Purchase.objects.create(
+            supplier=Supplier.objects.create(name="Supplier"),
+            product=self.product,
+            reference="R1",
+            purchase_date=date.today(),
+            quantity=5,
+            unit_price=1,
+        )
+        stock.receive([purchase.pk])
+
+        self.assertRedirects(
+            self.edit(form, quantity="12"),
+            reverse("products_index"),
+            fetch_redirect_response=False,
+        )
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 17)
+        self.assertEqual(
+            StockMovement.objects.get(product=self.product, note="Product edit").quantity, 2
+        )
+
+    def test_unchanged_quantity_books_no_movement(self):
+        form = self.client.get(self.url)
+        stock.adjust(self.product.pk, -4)
+
+        self.edit(form, name="Renamed")
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.quantity), ("Renamed", 6))
+        self.assertFalse(
+            StockMovement.objects.filter(product=self.product, note="Product edit").exists()
+        )
@@ -0,0 +1,228 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+from . import versions
+from .models import (
+    Category,
+    Customer,
+    ExpenseCategory,
+    Product,
+    SubCategory,
+    Supplier,
+)
+
+
+# entity -> (model, fields read per row, label of a row). Every word of a
+# label can be typed to find the row.
+ENTITIES = {
+    "products": (Product, ["name", "sku"], lambda name, sku: f"{name} ({sku})"),
+    "customers": (Customer, ["name"], str),
+    "suppliers": (Supplier, ["name"], str),
+    "subcategories": (
+        SubCategory,
+        ["category__name", "name"],
+        lambda category, name: f"{category} - {name}",
+    ),
+    "expense_categories": (ExpenseCategory, ["name"], str),
+}
+
+# model -> [(entity, fields whose change alters its labels), ...]
+MODELS = {model: [(entity, {*fields})] for entity, (model, fields, _) in ENTITIES.items()}
+MODELS[Category] = [("subcategories", {"name"})]
+
+# Indexes of more rows than this are rebuilt in a background thread while
+# the previous one keeps answering; smaller ones are rebuilt before
+# answering. Building takes about a second per 100,000 rows.
+SYNC_REBUILD_ROWS = getattr(settings, "TYPEAHEAD_SYNC_REBUILD_ROWS", 20000)
+
+# Candidates examined per lookup beyond the rows whose label starts with
+# the query, so two very common words typed together cannot walk the
+# whole index.
+SCAN_LIMIT = 20000
+
+TERM = re.compile(r"\w+")
+LAST = chr(0x10FFFF)
+
+
+def normalize(text):
+    return " ".join(TERM.findall(text.lower()))
+
+
+def scope_of(entity):
+    return f"typeahead:{entity}"
+
+
+class PrefixIndex:
+    """The labels of one entity's rows, searchable by prefix.
+
+    Rows are numbered in label order, and ``names`` holds the normalized
+    labels in that order, so the rows whose label starts with the query
+    are one run found by bisection. ``words`` is every distinct word,
+    sorted, with ``postings`` listing the rows of each word in label order;
+    the words starting with a term are one run as well.
+    """
+
+    def __init__(self, rows):
+        pks, labels, names = [], [], []
+        for pk, label in rows:
+            pks.append(pk)
+            labels.append(label)
+            names.append(normalize(label))
+        order = sorted(range(len(names)), key=names.__getitem__)
+        self.names = [names[row] for row in order]
+        self.labels = [labels[row] for row in order]
+        self.pks = array("q", [pks[row] for row in order])
+
+        postings = defaultdict(list)
+        for row, name in enumerate(self.names):
+            for word in set(name.split()):
+                postings[word].append(row)
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+        # before[i]: how many postings the words ahead of word i have, so
+        # the size of any run of words is one subtraction.
+        self.before = array("q", [0])
+        for rows in self.postings:
+            self.before.append(self.before[-1] + len(rows))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _span(self, term):
+        return (
+            bisect_left(self.words, term),
+            bisect_left(self.words, term + LAST),
+        )
+
+    def _candidates(self, start, stop):
+        for word in range(start, stop):
+            yield from self.postings[word]
+
+    def find(self, text, limit):
+        """Row numbers of up to ``limit`` rows matching ``text``: first the
+        rows whose label starts with it, alphabetically, then the rows with
+        a word starting with each of its words."""
+        query = normalize(text)
+        found = []
+        row = bisect_left(self.names, query)
+        while row < len(self.names) and len(found) < limit:
+            if not self.names[row].startswith(query):
+                break
+            found.append(row)
+            row += 1
+
+        terms = query.split()
+        if len(found) == limit or not terms:
+            return found
+        # Walk the rows of the rarest term and check the others per row.
+        start, stop = min(
+            (self._span(term) for term in terms),
+            key=lambda span: self.before[span[1]] - self.before[span[0]],
+        )
+        seen = set(found)
+        for row in islice(self._candidates(start, stop), SCAN_LIMIT):
+            if row in seen:
+                continue
+            seen.add(row)
+            words = self.names[row].split()
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                found.append(row)
+                if len(found) == limit:
+                    break
+        return found
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_indexes = {}
+_refreshing = set()
+
+
+def current_version(entity):
+    return versions.current(scope_of(entity))
+
+
+def _rows(entity):
+    model, fields, label = ENTITIES[entity]
+    for pk, *values in model.objects.order_by().values_list("pk", *fields).iterator():
+        yield pk, label(*values)
+
+
+def _build(entity, version):
+    # ``version`` was read before the rows, so a change made during the
+    # build bumps it again and is picked up by the next lookup.
+    index = PrefixIndex(_rows(entity))
+    with _lock:
+        cached = _indexes.get(entity)
+        if cached is None or cached[0] < version:
+            _indexes[entity] = (version, index)
+    return index
+
+
+def _build_in_background(entity, version):
+    try:
+        _build(entity, version)
+    finally:
+        with _lock:
+            _refreshing.discard(entity)
+        connection.close()
+
+
+def index_of(entity):
+    """Return this process's index of ``entity``, refreshed if the rows
+    changed since it was built. Checking costs one indexed lookup."""
+    version = current_version(entity)
+    cached = _indexes.get(entity)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if cached is not None and len(cached[1]) > SYNC_REBUILD_ROWS:
+        with _lock:
+            start = entity not in _refreshing
+            _refreshing.add(entity)
+        if start:
+            threading.Thread(
+                target=_build_in_background, args=(entity, version), daemon=True
+            ).start()
+        return cached[1]
+    with _build_lock:
+        cached = _indexes.get(entity)
+        if cached is not None and cached[0] >= version:
+            return cached[1]
+        return _build(entity, version)
+
+
+def lookup(entity, text, limit=20):
+    """Return up to ``limit`` ``{"id", "text"}`` options of ``entity``
+    matching what was typed so far, in the format Select2 expects."""
+    index = index_of(entity)
+    return [
+        {"id": index.pks[row], "text": index.labels[row]}
+        for row in index.find(text, limit)
+    ]
+
+
+def labels(entity, pks):
+    """Return ``{str(pk): label}`` for the given primary keys, e.g. to show
+    the current choice of a form without listing every row."""
+    model, fields, label = ENTITIES[entity]
+    wanted = {int(pk) for pk in pks if str(pk or "").isdigit()}
+    if not wanted:
+        return {}
+    return {
+        str(pk): label(*values)
+        for pk, *values in model.objects.filter(pk__in=wanted).values_list("pk", *fields)
+    }
+
+
+def changed(entity):
+    """Record that rows of ``entity`` changed, so every process rebuilds its
+    index on its next lookup. Runs in the caller's transaction: a change
+    that is rolled back does not invalidate anything."""
+    versions.bump(scope_of(entity))
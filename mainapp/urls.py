@@ -3,6 +3,16 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path(
+        "dashboard/timeseries/",
+        views.dashboard_timeseries,
+        name="dashboard_timeseries",
+    ),
+    path("search/", views.search_index, name="search"),
+    path("search/data/", views.search_data, name="search_data"),
+    path("typeahead/<str:entity>/", views.typeahead_data, name="typeahead"),
+    path("scan/", views.scan, name="scan"),
+    path("scan/batch/", views.scan_batch, name="scan_batch"),
     path("categories/create/", views.category_create, name="categories_create"),
     path("categories/", views.categories_index, name="categories_index"),
     path("categories/<int:pk>/edit/", views.category_edit, name="categories_edit"),
@@ -23,11 +33,17 @@ urlpatterns = [
         views.subcategories_delete,
         name="subcategories_delete",
     ),
+    path("products/data/", views.products_data, name="products_data"),
+    path(
+        "products/<int:pk>/stock/", views.product_stock_at, name="products_stock_at"
+    ),
     path("products/create/", views.product_create, name="products_create"),
+    path("products/stock-count/", views.stock_count, name="stock_count"),
     path("products/", views.products_index, name="products_index"),
     path("products/<int:pk>/edit/", views.product_edit, name="products_edit"),
     path("products/<int:pk>/delete/", views.products_delete, name="products_delete"),
     path("customers/", views.customers_index, name="customers_index"),
+    path("customers/data/", views.customers_data, name="customers_data"),
     path("customers/create/", views.customer_create, name="customers_create"),
     path("customers/<int:pk>/edit/", views.customer_edit, name="customers_edit"),
     path("customers/<int:pk>/delete/", views.customer_delete, name="customers_delete"),
@@ -60,6 +76,24 @@ urlpatterns = [
         views.export_subcategories_excel,
         name="export_subcategories_excel",
     ),
+    path("feeds/<str:entity>/", views.feed_page, name="feed_page"),
+    path("feeds/<str:entity>.<str:fmt>", views.export_feed, name="export_feed"),
+    path("exports/", views.export_jobs_index, name="export_jobs_index"),
+    path(
+        "exports/<str:entity>/<str:fmt>/",
+        views.export_job_create,
+        name="export_jobs_create",
+    ),
+    path(
+        "exports/jobs/<int:pk>/status/",
+        views.export_job_status,
+        name="export_jobs_status",
+    ),
+    path(
+        "exports/jobs/<int:pk>/download/",
+        views.export_job_download,
+        name="export_jobs_download",
+    ),
     path(
         "expense-categories/",
         views.expense_categories_index,
@@ -81,20 +115,24 @@ urlpatterns = [
         name="expense_categories_delete",
     ),
     path("expenses/", views.expenses_index, name="expenses_index"),
+    path("expenses/data/", views.expenses_data, name="expenses_data"),
     path("expenses/create/", views.expense_create, name="expenses_create"),
     path("expenses/<int:pk>/edit/", views.expense_edit, name="expenses_edit"),
     path("expenses/<int:pk>/delete/", views.expense_delete, name="expenses_delete"),
     path("suppliers/", views.suppliers_index, name="suppliers_index"),
+    path("suppliers/data/", views.suppliers_data, name="suppliers_data"),
     path("suppliers/create/", views.supplier_create, name="suppliers_create"),
     path("suppliers/<int:pk>/edit/", views.supplier_edit, name="suppliers_edit"),
     path("suppliers/<int:pk>/delete/", views.supplier_delete, name="suppliers_delete"),
     path("quotations/", views.quotations_index, name="quotations_index"),
+    path("quotations/data/", views.quotations_data, name="quotations_data"),
     path("quotations/create/", views.quotation_create, name="quotations_create"),
     path("quotations/<int:pk>/edit/", views.quotation_edit, name="quotations_edit"),
     path(
         "quotations/<int:pk>/delete/", views.quotation_delete, name="quotations_delete"
     ),
     path("purchases/", views.purchases_index, name="purchases_index"),
+    path("purchases/data/", views.purchases_data, name="purchases_data"),
     path("purchases/create/", views.purchase_create, name="purchases_create"),
     path("purchases/<int:pk>/edit/", views.purchase_edit, name="purchases_edit"),
     path("purchases/<int:pk>/delete/", views.purchase_delete, name="purchases_delete"),
@@ -103,6 +141,32 @@ urlpatterns = [
         views.purchase_adjust_quantity,
         name="purchases_adjust_quantity",
     ),
+    path(
+        "purchases/bulk-receive/",
+        views.purchases_bulk_receive,
+        name="purchases_bulk_receive",
+    ),
+    path("purchase-orders/", views.purchase_orders_index, name="purchase_orders_index"),
+    path(
+        "purchase-orders/data/",
+        views.purchase_orders_data,
+        name="purchase_orders_data",
+    ),
+    path(
+        "purchase-orders/create/",
+        views.purchase_order_create,
+        name="purchase_orders_create",
+    ),
+    path(
+        "purchase-orders/<int:pk>/",
+        views.purchase_order_detail,
+        name="purchase_orders_detail",
+    ),
+    path(
+        "purchase-orders/<int:pk>/delete/",
+        views.purchase_order_delete,
+        name="purchase_orders_delete",
+    ),
     path(
         "purchases/<int:pk>/more-options/",
         views.purchase_more_options,
@@ -0,0 +1,28 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+
+def current(scope):
+    """Return the version of ``scope``, 0 if it never changed."""
+    return (
+        DataVersion.objects.filter(scope=scope).values_list("version", flat=True).first()
+        or 0
+    )
+
+
+def bump(scope):
+    """Record that the data of ``scope`` changed, so every process drops
+    its copy on next use. Runs in the caller's transaction: a change that
+    is rolled back does not invalidate anything."""
+    versions = DataVersion.objects.filter(scope=scope)
+    if versions.update(version=F("version") + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(scope=scope, version=1)
+    except IntegrityError:
+        # Created concurrently.
+        versions.update(version=F("version") + 1, updated_at=timezone.now())
@@ -1,7 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib import messages
-from django.db import models
 from .models import (
     Category,
     SubCategory,
@@ -12,20 +15,34 @@ from .models import (
     Supplier,
     Quotation,
     Purchase,
+    PurchaseOrder,
+    ExportJob,
 )
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from decimal import Decimal, ROUND_HALF_UP
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from datetime import datetime
+from decimal import Decimal
+from .exports import DataExporter, FEEDS, lookups
+from .orders import OrderLine
+from .pagination import InvalidCursor, keyset_page
+from .pricing import compute_purchase_totals
+from . import (
+    jobs,
+    metrics,
+    names,
+    orders,
+    quotations,
+    references,
+    rollups,
+    scans,
+    search,
+    stock,
+    stock_counts,
+    tables,
+    typeahead,
+)
+from .tables import datatable_response
+from datetime import datetime, timedelta
 from django.db import transaction
 
 from allauth.socialaccount.models import SocialAccount
@@ -45,53 +62,173 @@ def login_with_google(request):
         "picture":picture
     }
     return render(request,"index.html",context)
-MONEY_QUANT = Decimal("0.01")
-
-
-def compute_purchase_totals(quantity, unit_price, discount_pct, tax_pct):
-
-    subtotal_base = unit_price * quantity
-
-    discount_amount = subtotal_base * (discount_pct / Decimal("100"))
-
-    taxable_base = subtotal_base
-    tax_amount = taxable_base * (tax_pct / Decimal("100"))
-
-    line_total = subtotal_base - discount_amount + tax_amount
-
-    discount_amount = discount_amount.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
-    tax_amount = tax_amount.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
-    line_total = line_total.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
-
-    return discount_amount, tax_amount, line_total
-
-
 @login_required
 def index(request):
     products = Product.objects.all().order_by("-created_at")[:4]
     
-    # Get counts from database
-    total_customers = Customer.objects.count()
-    total_suppliers = Supplier.objects.count()
-    total_products = Product.objects.count()
-    total_purchases = Purchase.objects.aggregate(total=models.Sum('line_total'))['total'] or 0
-    total_expenses = Expense.objects.aggregate(total=models.Sum('amount'))['total'] or 0
+    # Totals are kept in a single summary row (see mainapp.metrics)
+    totals = metrics.current()
     
     # Convert Decimal to float for JSON serialization
-    total_purchases = float(total_purchases) if total_purchases else 0
-    total_expenses = float(total_expenses) if total_expenses else 0
+    total_purchases = float(totals.total_purchases) if totals.total_purchases else 0
+    total_expenses = float(totals.total_expenses) if totals.total_expenses else 0
     
     context = {
         'products': products,
-        'total_customers': total_customers,
-        'total_suppliers': total_suppliers,
-        'total_products': total_products,
+        'total_customers': totals.total_customers,
+        'total_suppliers': totals.total_suppliers,
+        'total_products': totals.total_products,
         'total_purchases': total_purchases,
         'total_expenses': total_expenses,
     }
     return render(request, "index.html", context)
 
 
+TIMESERIES_MAX_BUCKETS = 1000
+
+
+@login_required
+def dashboard_timeseries(request):
+    series_names = request.GET.get("series", ",".join(rollups.SERIES)).split(",")
+    interval = request.GET.get("interval", "month")
+    if (
+        interval not in ("day", "week", "month")
+        or not set(series_names) <= rollups.SERIES.keys()
+    ):
+        return JsonResponse({"error": "Unknown series or interval."}, status=400)
+    try:
+        end = timezone.localdate()
+        if request.GET.get("end"):
+            end = datetime.strptime(request.GET["end"], "%Y-%m-%d").date()
+        # Default to the last twelve full months plus the current one.
+        start = (end - timedelta(days=365)).replace(day=1)
+        if request.GET.get("start"):
+            start = datetime.strptime(request.GET["start"], "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD."}, status=400)
+    days_per_bucket = {"day": 1, "week": 7, "month": 28}[interval]
+    if start > end or (end - start).days // days_per_bucket > TIMESERIES_MAX_BUCKETS:
+        return JsonResponse({"error": "Invalid or too large date range."}, status=400)
+
+    series = {
+        name: [
+            {"bucket": bucket.isoformat(), "total": total, "count": count}
+            for bucket, total, count in rollups.timeseries(name, interval, start, end)
+        ]
+        for name in series_names
+    }
+    return JsonResponse(
+        {
+            "interval": interval,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "series": series,
+        }
+    )
+
+
+SEARCH_MAX_RESULTS = 100
+
+
+def _search_params(request):
+    """``(query, entity, limit)`` of a search request; ``entity`` is empty
+    for a search across everything."""
+    query = request.GET.get("q", "").strip()
+    entity = request.GET.get("type", "")
+    if entity not in search.ENTITIES:
+        entity = ""
+    try:
+        limit = min(max(int(request.GET.get("limit", 20)), 1), SEARCH_MAX_RESULTS)
+    except ValueError:
+        limit = 20
+    return query, entity, limit
+
+
+@login_required
+def search_index(request):
+    query, entity, limit = _search_params(request)
+    results = []
+    if query:
+        results = search.search(query, [entity] if entity else None, limit=limit)
+    context = {
+        "query": query,
+        "entity": entity,
+        "entity_choices": [(name, name.capitalize()) for name in search.ENTITIES],
+        "results": results,
+    }
+    return render(request, "search/results.html", context)
+
+
+@login_required
+def search_data(request):
+    query, entity, limit = _search_params(request)
+    results = search.search(query, [entity] if entity else None, limit=limit)
+    return JsonResponse({"results": results})
+
+
+TYPEAHEAD_MAX_RESULTS = 50
+
+
+@login_required
+def typeahead_data(request, entity):
+    """Options of one select box matching what was typed so far."""
+    if entity not in typeahead.ENTITIES:
+        raise Http404
+    try:
+        limit = min(max(int(request.GET.get("limit", 20)), 1), TYPEAHEAD_MAX_RESULTS)
+    except ValueError:
+        limit = 20
+    results = typeahead.lookup(entity, request.GET.get("q", ""), limit)
+    return JsonResponse({"results": results})
+
+
+SCAN_BATCH_MAX = 500
+COMPACT_JSON = {"separators": (",", ":")}
+
+
+@login_required
+def scan(request):
+    """Look up one scanned SKU: ``{"id", "sku", "name", "price", "stock"}``."""
+    sku = request.GET.get("sku", "").strip()
+    if not sku:
+        return JsonResponse({"error": "Pass the scanned code as sku."}, status=400)
+    found = scans.lookup([sku]).get(sku)
+    if found is None:
+        return JsonResponse(
+            {"error": "Unknown SKU.", "sku": sku}, status=404, json_dumps_params=COMPACT_JSON
+        )
+    return JsonResponse(found, json_dumps_params=COMPACT_JSON)
+
+
+@login_required
+def scan_batch(request):
+    """Look up many SKUs, passed as repeated ``sku`` parameters (query
+    string or form body). ``results`` follows their order, with ``null``
+    for unknown SKUs."""
+    params = request.POST if request.method == "POST" else request.GET
+    skus = [sku.strip() for sku in params.getlist("sku")]
+    if not skus:
+        return JsonResponse({"error": "Pass the scanned codes as sku."}, status=400)
+    if len(skus) > SCAN_BATCH_MAX:
+        return JsonResponse(
+            {"error": f"At most {SCAN_BATCH_MAX} codes per request."}, status=400
+        )
+    found = scans.lookup([sku for sku in skus if sku])
+    return JsonResponse(
+        {"results": [found.get(sku) for sku in skus]}, json_dumps_params=COMPACT_JSON
+    )
+
+
+def _add_labels(rows, entity, field):
+    """Set ``<field>_label`` (``product_id`` -> ``product_label``) on each
+    dict in ``rows`` to the label of the row it picked. Forms only render
+    the current choice; the other options are fetched as the user types."""
+    found = typeahead.labels(entity, [row.get(field) for row in rows])
+    for row in rows:
+        row[f"{field.removesuffix('_id')}_label"] = found.get(str(row.get(field)), "")
+    return rows
+
+
 @login_required
 def category_create(request):
     errors = []
@@ -309,14 +446,49 @@ def subcategories_delete(request, pk):
 
 @login_required
 def products_index(request):
-    products = Product.objects.select_related("sub_category").order_by("name")
+    return render(request, "productlist.html")
+
+
+@login_required
+def products_data(request):
+    products = (
+        Product.objects.with_discounted_price()
+        .select_related("sub_category", "sub_category__category")
+        .order_by("name")
+    )
+    if request.GET.get("status") in ("active", "inactive"):
+        products = products.filter(status=request.GET["status"])
+    return datatable_response(
+        request, products, tables.PRODUCT_COLUMNS, tables.PRODUCT_SEARCH
+    )
 
-    for p in products:
-        price = p.price or 0
-        disc = p.discount_percentage or 0
-        p.discounted_price = price * (Decimal("1") - Decimal(disc) / Decimal("100"))
 
-    return render(request, "productlist.html", {"products": products})
+@login_required
+def product_stock_at(request, pk):
+    product = get_object_or_404(Product, pk=pk)
+    at = request.GET.get("at", "")
+    try:
+        day = parse_date(at)
+        when = None if day else parse_datetime(at)
+    except ValueError:
+        day = when = None
+    if day is not None:
+        # A bare date means stock at the end of that day.
+        when = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        when -= timedelta(microseconds=1)
+    if when is None:
+        return JsonResponse(
+            {"error": "'at' must be a date or datetime (ISO 8601)."}, status=400
+        )
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return JsonResponse(
+        {
+            "product": product.pk,
+            "at": when.isoformat(),
+            "quantity": stock.quantity_at(product.pk, when),
+        }
+    )
 
 
 @login_required
@@ -345,6 +517,8 @@ def product_create(request):
             errors.append("SKU must be unique.")
         if not price:
             errors.append("Price is required.")
+        if status not in dict(Product.STATUS_CHOICES):
+            errors.append("Invalid status selected.")
 
         sub_category = None
         if sub_category_id:
@@ -360,18 +534,20 @@ def product_create(request):
             errors.append("Quantity must be a number.")
 
         if not errors:
-            Product.objects.create(
-                name=name,
-                sub_category=sub_category,
-                unit=unit,
-                sku=sku,
-                quantity=quantity_val,
-                description=description or None,
-                status=status,
-                price=price or 0,
-                discount_percentage=discount_percentage or 0,
-                main_image=main_image,
-            )
+            with transaction.atomic():
+                product = Product.objects.create(
+                    name=name,
+                    sub_category=sub_category,
+                    unit=unit,
+                    sku=sku,
+                    description=description or None,
+                    status=status,
+                    price=price or 0,
+                    discount_percentage=discount_percentage or 0,
+                    main_image=main_image,
+                )
+                # Opening stock is booked through the ledger like any change.
+                stock.adjust(product.pk, quantity_val, note="Initial stock")
             messages.success(request, "Product created successfully!")
             return redirect("products_index")
 
@@ -389,12 +565,10 @@ def product_create(request):
     else:
         old = {}
 
+    _add_labels([old], "subcategories", "sub_category_id")
     context = {
         "errors": errors,
         "old": old,
-        "subcategories": SubCategory.objects.select_related("category").order_by(
-            "category__name", "name"
-        ),
     }
     return render(request, "addproduct.html", context)
 
@@ -410,6 +584,7 @@ def product_edit(request, pk):
         unit = request.POST.get("unit", "").strip()
         sku = request.POST.get("sku", "").strip()
         quantity = request.POST.get("quantity", "0").strip()
+        original_quantity = request.POST.get("original_quantity", "").strip()
         description = request.POST.get("description", "").strip()
         status = request.POST.get("status", "active")
         price = request.POST.get("price", "").strip()
@@ -426,6 +601,8 @@ def product_edit(request, pk):
             errors.append("SKU must be unique.")
         if not price:
             errors.append("Price is required.")
+        if status not in dict(Product.STATUS_CHOICES):
+            errors.append("Invalid status selected.")
 
         sub_category = None
         if sub_category_id:
@@ -439,22 +616,49 @@ def product_edit(request, pk):
                 errors.append("Quantity cannot be negative.")
         except ValueError:
             errors.append("Quantity must be a number.")
+        try:
+            # The stock the form was loaded with; the typed quantity is
+            # a change from that, not from whatever is stored now.
+            original_quantity_val = int(original_quantity)
+        except ValueError:
+            original_quantity_val = product.quantity
 
         if not errors:
             product.name = name
             product.sub_category = sub_category
             product.unit = unit
             product.sku = sku
-            product.quantity = quantity_val
             product.description = description or None
             product.status = status
             product.price = price or 0
             product.discount_percentage = discount_percentage or 0
             if main_image:
                 product.main_image = main_image
-            product.save()
-            messages.success(request, "Product updated successfully!")
-            return redirect("products_index")
+            try:
+                with transaction.atomic():
+                    # Quantity goes through the stock service as the change
+                    # made in the form, so receipts booked since the form was
+                    # loaded are kept.
+                    product.save(
+                        update_fields=[
+                            field.name
+                            for field in Product._meta.concrete_fields
+                            if not field.primary_key and field.name != "quantity"
+                        ]
+                    )
+                    if quantity_val != original_quantity_val:
+                        stock.adjust(
+                            product.pk,
+                            quantity_val - original_quantity_val,
+                            note="Product edit",
+                        )
+            except stock.InsufficientStock:
+                errors.append("Stock changed while you were editing. Please try again.")
+                product.refresh_from_db(fields=["quantity"])
+                quantity = original_quantity_val = product.quantity
+            else:
+                messages.success(request, "Product updated successfully!")
+                return redirect("products_index")
 
         old = {
             "name": name,
@@ -462,6 +666,7 @@ def product_edit(request, pk):
             "unit": unit,
             "sku": sku,
             "quantity": quantity,
+            "original_quantity": original_quantity_val,
             "description": description,
             "status": status,
             "price": price,
@@ -474,23 +679,95 @@ def product_edit(request, pk):
             "unit": product.unit,
             "sku": product.sku,
             "quantity": product.quantity,
+            "original_quantity": product.quantity,
             "description": product.description or "",
             "status": product.status,
             "price": product.price,
             "discount_percentage": product.discount_percentage,
         }
 
+    _add_labels([old], "subcategories", "sub_category_id")
     context = {
         "errors": errors,
         "old": old,
         "product": product,
-        "subcategories": SubCategory.objects.select_related("category").order_by(
-            "category__name", "name"
-        ),
     }
     return render(request, "editproduct.html", context)
 
 
+STOCK_COUNT_PREVIEW_ROWS = 500
+
+
+@login_required
+def stock_count(request):
+    """Upload a stock count as a CSV or JSON ``file`` of SKUs and counted
+    quantities, and compare it with the recorded stock. With ``apply``
+    set, the differences are booked as ``count`` movements. Answers JSON
+    when asked for (``Accept: application/json``), otherwise shows the
+    first ``STOCK_COUNT_PREVIEW_ROWS`` differences and problems.
+    """
+    wants_json = "application/json" in request.headers.get("Accept", "")
+    if request.method != "POST":
+        return render(request, "stock_counts/upload.html")
+
+    upload = request.FILES.get("file")
+    apply = request.POST.get("apply") in ("1", "on", "true")
+    result = None
+    error = None
+    if upload is None:
+        error = "Choose a CSV or JSON file to upload."
+    else:
+        try:
+            result = stock_counts.reconcile(
+                stock_counts.read(upload), apply=apply, note=f"Stock count {upload.name}"[:255]
+            )
+        except stock_counts.InvalidUpload as exc:
+            error = str(exc)
+        except stock.InsufficientStock as exc:
+            error = (
+                f"The stock of product {exc.product_id} changed while the count was "
+                "applied; nothing was applied. Upload the count again."
+            )
+    if error:
+        if wants_json:
+            return JsonResponse({"error": error}, status=400)
+        messages.error(request, error)
+        return redirect("stock_count")
+
+    if wants_json:
+        return JsonResponse(
+            {
+                "applied": result.applied,
+                "lines": result.lines,
+                "skus": result.skus,
+                "unchanged": result.unchanged,
+                "differences": [
+                    {
+                        "id": difference.product_id,
+                        "sku": difference.sku,
+                        "recorded": difference.recorded,
+                        "counted": difference.counted,
+                        "difference": difference.difference,
+                    }
+                    for difference in result.differences
+                ],
+                "problems": [problem._asdict() for problem in result.problems],
+            }
+        )
+
+    if result.applied:
+        messages.success(
+            request, f"Stock of {len(result.differences)} products updated from the count."
+        )
+    context = {
+        "result": result,
+        "differences": result.differences[:STOCK_COUNT_PREVIEW_ROWS],
+        "problems": result.problems[:STOCK_COUNT_PREVIEW_ROWS],
+        "preview_rows": STOCK_COUNT_PREVIEW_ROWS,
+    }
+    return render(request, "stock_counts/upload.html", context)
+
+
 @login_required
 def products_delete(request, pk):
     product = get_object_or_404(Product, pk=pk)
@@ -588,8 +865,15 @@ def logout_view(request):
 
 @login_required
 def customers_index(request):
+    return render(request, "customerlist.html")
+
+
+@login_required
+def customers_data(request):
     customers = Customer.objects.all().order_by("name")
-    return render(request, "customerlist.html", {"customers": customers})
+    return datatable_response(
+        request, customers, tables.CUSTOMER_COLUMNS, tables.CUSTOMER_SEARCH
+    )
 
 
 @login_required
@@ -732,291 +1016,130 @@ def customer_delete(request, pk):
     return redirect("customers_index")
 
 
-class DataExporter:
-    @staticmethod
-    def export_to_pdf(queryset, fields, title, filename_prefix):
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'attachment; filename="{filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-        )
-
-        doc = SimpleDocTemplate(response, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            "CustomTitle",
-            parent=styles["Heading1"],
-            fontSize=10,
-            textColor=colors.HexColor("#2c3e50"),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-        )
-
-        elements.append(Paragraph(title, title_style))
-        elements.append(Spacer(1, 0.3 * inch))
-
-        headers = [display_name for _, display_name in fields]
-        data = [headers]
-
-        for obj in queryset:
-            row = []
-            for field_name, _ in fields:
-
-                value = obj
-                for attr in field_name.split("."):
-                    value = getattr(value, attr, "")
-                    if value is None:
-                        value = ""
-                row.append(str(value))
-            data.append(row)
-        num_cols = len(fields)
-        available_width = 6.5 * inch
-        col_width = available_width / num_cols
-        table = Table(data, colWidths=[col_width] * num_cols)
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4CAF50")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 6),
-                    ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 1), (-1, -1), 4),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    (
-                        "ROWBACKGROUNDS",
-                        (0, 1),
-                        (-1, -1),
-                        [colors.white, colors.lightgrey],
-                    ),
-                ]
-            )
-        )
-
-        elements.append(table)
-        elements.append(Spacer(1, 0.5 * inch))
-        footer_text = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Total Records: {queryset.count()}"
-        elements.append(Paragraph(footer_text, styles["Normal"]))
+@login_required
+def export_categories_pdf(request):
+    return DataExporter.export("categories", "pdf")
 
-        doc.build(elements)
-        return response
 
-    @staticmethod
-    def export_to_excel(queryset, fields, title, filename_prefix):
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = title[:31]
+@login_required
+def export_categories_excel(request):
+    return DataExporter.export("categories", "excel")
 
-        header_font = Font(name="Calibri", size=12, bold=True, color="FFFFFF")
-        header_fill = PatternFill(
-            start_color="4CAF50", end_color="4CAF50", fill_type="solid"
-        )
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        cell_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
 
-        num_cols = len(fields)
-        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=num_cols)
-        title_cell = ws.cell(row=1, column=1)
-        title_cell.value = title
-        title_cell.font = Font(name="Calibri", size=16, bold=True)
-        title_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        for col_num, (_, display_name) in enumerate(fields, 1):
-            cell = ws.cell(row=3, column=col_num)
-            cell.value = display_name
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border
-
-        for row_num, obj in enumerate(queryset, 4):
-            for col_num, (field_name, _) in enumerate(fields, 1):
-                value = obj
-                for attr in field_name.split("."):
-                    value = getattr(value, attr, "")
-                    if value is None:
-                        value = ""
-
-                cell = ws.cell(row=row_num, column=col_num)
-                cell.value = str(value)
-                cell.alignment = cell_alignment
-                cell.border = border
-        for col_num in range(1, num_cols + 1):
-            column_letter = openpyxl.utils.get_column_letter(col_num)
-            max_length = 0
-            for cell in ws[column_letter]:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-        last_row = ws.max_row + 2
-        ws.cell(
-            row=last_row,
-            column=1,
-            value=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Total Records: {queryset.count()}",
-        )
+@login_required
+def export_products_pdf(request):
+    return DataExporter.export("products", "pdf")
 
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = (
-            f'attachment; filename="{filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        )
 
-        wb.save(response)
-        return response
+@login_required
+def export_products_excel(request):
+    return DataExporter.export("products", "excel")
 
 
 @login_required
-def export_categories_pdf(request):
+def export_subcategories_pdf(request):
+    return DataExporter.export("subcategories", "pdf")
 
-    queryset = Category.objects.all().order_by("-created_at")
-    fields = [
-        ("id", "Category ID"),
-        ("name", "Category Name"),
-        ("code", "Category Code"),
-    ]
 
-    return DataExporter.export_to_pdf(
-        queryset=queryset,
-        fields=fields,
-        title="Categories Report",
-        filename_prefix="categories",
-    )
+@login_required
+def export_subcategories_excel(request):
+    return DataExporter.export("subcategories", "excel")
 
 
 @login_required
-def export_categories_excel(request):
-    queryset = Category.objects.all().order_by("-created_at")
-    fields = [
-        ("id", "Category ID"),
-        ("name", "Category Name"),
-        ("code", "Category Code"),
-    ]
-
-    return DataExporter.export_to_excel(
-        queryset=queryset,
-        fields=fields,
-        title="Categories",
-        filename_prefix="categories",
-    )
+def export_feed(request, entity, fmt):
+    if entity not in FEEDS or fmt not in ("csv", "jsonl"):
+        raise Http404("Unknown export.")
+    return DataExporter.export_feed(entity, fmt)
 
 
 @login_required
-def export_products_pdf(request):
-
-    queryset = (
-        Product.objects.select_related("sub_category", "sub_category__category")
-        .all()
-        .order_by("-created_at")
-    )
-    fields = [
-        ("id", "Product ID"),
-        ("name", "Product Name"),
-        ("sku", "SKU"),
-        ("sub_category.category.name", "Category"),
-        ("sub_category.name", "Sub Category"),
-        ("unit", "Unit"),
-        ("quantity", "Quantity"),
-        ("price", "Price"),
-        ("discount_percentage", "Discount %"),
-        ("status", "Status"),
-    ]
+def feed_page(request, entity):
+    if entity not in FEEDS:
+        raise Http404("Unknown feed.")
+    spec = FEEDS[entity]
+    ordering = request.GET.get("order", "created")
+    key = spec["keys"].get(ordering.lstrip("-"))
+    if key is None:
+        return JsonResponse({"error": "Unknown ordering."}, status=400)
+    try:
+        limit = int(request.GET.get("limit", 100))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit."}, status=400)
 
-    return DataExporter.export_to_pdf(
-        queryset=queryset,
-        fields=fields,
-        title="Products Report",
-        filename_prefix="products",
+    field_names = [field_name for field_name, _ in spec["fields"]]
+    queryset = spec["queryset"]().values_list(*lookups(spec["fields"]), key, "pk")
+    try:
+        rows, next_cursor = keyset_page(
+            queryset,
+            key,
+            ordering,
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+            descending=ordering.startswith("-"),
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(
+        {"results": [dict(zip(field_names, row)) for row in rows], "next": next_cursor}
     )
 
 
 @login_required
-def export_products_excel(request):
-    queryset = (
-        Product.objects.select_related("sub_category", "sub_category__category")
-        .all()
-        .order_by("-created_at")
-    )
-    fields = [
-        ("id", "Product ID"),
-        ("name", "Product Name"),
-        ("sku", "SKU"),
-        ("sub_category.category.name", "Category"),
-        ("sub_category.name", "Sub Category"),
-        ("unit", "Unit"),
-        ("quantity", "Quantity"),
-        ("price", "Price"),
-        ("discount_percentage", "Discount %"),
-        ("status", "Status"),
-        ("description", "Description"),
-    ]
-    return DataExporter.export_to_excel(
-        queryset=queryset, fields=fields, title="Products", filename_prefix="products"
+def export_job_create(request, entity, fmt):
+    try:
+        jobs.enqueue(request.user, entity, fmt)
+    except KeyError:
+        raise Http404("Unknown export.")
+    except jobs.ExportQueueFull as exc:
+        messages.warning(request, str(exc))
+        return redirect("export_jobs_index")
+    messages.success(
+        request, "Your export has been queued. It will be ready to download shortly."
     )
+    return redirect("export_jobs_index")
 
 
 @login_required
-def export_subcategories_pdf(request):
-    queryset = (
-        SubCategory.objects.select_related("category").all().order_by("-created_at")
-    )
-    fields = [
-        ("id", "Sub Category ID"),
-        ("name", "Sub Category Name"),
-        ("code", "Sub Category Code"),
-        ("category.name", "Parent Category"),
-        ("description", "Description"),
-    ]
-
-    return DataExporter.export_to_pdf(
-        queryset=queryset,
-        fields=fields,
-        title="Sub Categories Report",
-        filename_prefix="subcategories",
-    )
+def export_jobs_index(request):
+    export_jobs = ExportJob.objects.filter(requested_by=request.user)
+    return render(request, "exports/list.html", {"export_jobs": export_jobs})
 
 
 @login_required
-def export_subcategories_excel(request):
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user)
+    data = {
+        "id": job.pk,
+        "entity": job.entity,
+        "format": job.format,
+        "status": job.status,
+        "attempts": job.attempts,
+        "download_url": None,
+    }
+    if job.status == ExportJob.StatusChoices.DONE:
+        data["download_url"] = reverse("export_jobs_download", args=[job.pk])
+    if job.status == ExportJob.StatusChoices.FAILED:
+        data["error"] = "Export failed."
+    return JsonResponse(data)
 
-    queryset = (
-        SubCategory.objects.select_related("category").all().order_by("-created_at")
-    )
-    fields = [
-        ("id", "Sub Category ID"),
-        ("name", "Sub Category Name"),
-        ("code", "Sub Category Code"),
-        ("category.name", "Parent Category"),
-        ("description", "Description"),
-    ]
 
-    return DataExporter.export_to_excel(
-        queryset=queryset,
-        fields=fields,
-        title="Sub Categories",
-        filename_prefix="subcategories",
+@login_required
+def export_job_download(request, pk):
+    job = get_object_or_404(
+        ExportJob,
+        pk=pk,
+        requested_by=request.user,
+        status=ExportJob.StatusChoices.DONE,
     )
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("Export file is no longer available.")
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.filename)
 
 
 @login_required
 def expense_categories_index(request):
-    categories = ExpenseCategory.objects.all()
+    categories = ExpenseCategory.objects.order_by("name")
     return render(
         request,
         "expense_categories/list.html",
@@ -1128,10 +1251,17 @@ def expense_category_delete(request, pk):
 
 @login_required
 def expenses_index(request):
+    return render(request, "expenses/list.html")
+
+
+@login_required
+def expenses_data(request):
     expenses = Expense.objects.select_related("expense_category").order_by(
         "-date", "-id"
     )
-    return render(request, "expenses/list.html", {"expenses": expenses})
+    return datatable_response(
+        request, expenses, tables.EXPENSE_COLUMNS, tables.EXPENSE_SEARCH
+    )
 
 
 @login_required
@@ -1153,8 +1283,6 @@ def expense_create(request):
             errors.append("Date is required.")
         if not amount:
             errors.append("Amount is required.")
-        if not reference:
-            errors.append("Reference is required.")
         if reference and Expense.objects.filter(reference=reference).exists():
             errors.append("Reference must be unique.")
         if not expense_for:
@@ -1182,7 +1310,7 @@ def expense_create(request):
                 expense_category=expense_category,
                 date=date,
                 amount=amount_val,
-                reference=reference,
+                reference=reference or references.next_reference("expense"),
                 expense_for=expense_for,
                 description=description or None,
             )
@@ -1198,11 +1326,10 @@ def expense_create(request):
             "description": description,
         }
 
-    categories = ExpenseCategory.objects.order_by("name")
+    _add_labels([old], "expense_categories", "expense_category_id")
     context = {
         "errors": errors,
         "old": old,
-        "categories": categories,
     }
     return render(request, "expenses/add.html", context)
 
@@ -1284,12 +1411,11 @@ def expense_edit(request, pk):
             "description": expense.description or "",
         }
 
-    categories = ExpenseCategory.objects.order_by("name")
+    _add_labels([old], "expense_categories", "expense_category_id")
     context = {
         "errors": errors,
         "old": old,
         "expense": expense,
-        "categories": categories,
     }
     return render(request, "expenses/edit.html", context)
 
@@ -1311,9 +1437,17 @@ def expense_delete(request, pk):
 @login_required
 def suppliers_index(request):
 
+    return render(request, "suppliers/list.html")
+
+
+@login_required
+def suppliers_data(request):
+
     suppliers = Supplier.objects.order_by("name")
 
-    return render(request, "suppliers/list.html", {"suppliers": suppliers})
+    return datatable_response(
+        request, suppliers, tables.SUPPLIER_COLUMNS, tables.SUPPLIER_SEARCH
+    )
 
 
 @login_required
@@ -1497,108 +1631,165 @@ def supplier_delete(request, pk):
     return redirect("suppliers_index")
 
 
-@login_required
-def quotations_index(request):
-    quotations = Quotation.objects.select_related("product", "customer").order_by(
-        "-created_at"
+def _posted_lines(post, errors, fields, line_class, min_quantity=0, max_lines=None):
+    """Read the repeated line fields of a multi-line form into
+    ``line_class`` tuples.
+
+    ``fields`` names the product, quantity, unit price, discount and tax
+    inputs, in that order. Rows left completely empty are skipped. Returns
+    ``(lines, old_lines)``, the latter to refill the form.
+    """
+    columns = [post.getlist(field) for field in fields]
+    rows = []
+    for number, values in enumerate(zip(*columns), start=1):
+        values = [value.strip() for value in values]
+        if not values[0] and not values[1] and not values[2]:
+            continue
+        rows.append((number, values))
+    if not rows:
+        errors.append("Add at least one line.")
+        return [], []
+    if max_lines is not None and len(rows) > max_lines:
+        errors.append(f"At most {max_lines} lines are allowed.")
+        return [], []
+
+    products = Product.objects.in_bulk(
+        {int(values[0]) for _, values in rows if values[0].isdigit()}
     )
-    return render(request, "quotations/list.html", {"quotations": quotations})
+
+    lines = []
+    old_lines = []
+    for number, values in rows:
+        old_lines.append(dict(zip(fields, values)))
+        product_id, quantity, unit_price, discount, tax = values
+        product = products.get(int(product_id)) if product_id.isdigit() else None
+        if product is None:
+            errors.append(f"Line {number}: select an existing product.")
+        try:
+            quantity_val = int(quantity)
+            if quantity_val < min_quantity:
+                errors.append(f"Line {number}: quantity must be at least {min_quantity}.")
+        except ValueError:
+            errors.append(f"Line {number}: quantity must be an integer.")
+            quantity_val = 0
+        amounts = []
+        for value, field_name, max_val in (
+            (unit_price, "unit price", None),
+            (discount or "0", "discount", Decimal("100")),
+            (tax or "0", "tax rate", Decimal("100")),
+        ):
+            try:
+                d = Decimal(value)
+                if not d.is_finite():
+                    raise ValueError
+            except Exception:
+                errors.append(f"Line {number}: {field_name} must be a valid number.")
+                d = Decimal("0")
+            if d < 0:
+                errors.append(f"Line {number}: {field_name} must be at least 0.")
+            if max_val is not None and d > max_val:
+                errors.append(f"Line {number}: {field_name} must not exceed {max_val}.")
+            amounts.append(d)
+        lines.append(line_class(product, quantity_val, *amounts))
+    return lines, old_lines
 
 
 @login_required
-def quotation_create(request):
-    products = Product.objects.order_by("name")
-    customers = Customer.objects.order_by("name")
-    errors = []
+def quotations_index(request):
+    return render(request, "quotations/list.html")
 
-    if request.method == "POST":
-        reference = request.POST.get("reference", "").strip()
-        product_id = request.POST.get("product_id")
-        customer_id = request.POST.get("customer_id")
-        quantity_raw = request.POST.get("quantity", "1").strip()
-        unit_price_raw = request.POST.get("unit_price", "0").strip()
-        discount_raw = request.POST.get("discount_percentage", "0").strip()
-        tax_raw = request.POST.get("tax_percentage", "0").strip()
-        status = request.POST.get("status", "pending").strip()
-        notes = request.POST.get("notes", "").strip()
 
-        product = Product.objects.filter(pk=product_id).first()
-        customer = Customer.objects.filter(pk=customer_id).first()
+@login_required
+def quotations_data(request):
+    queryset = Quotation.objects.select_related("customer").order_by("-created_at")
+    return datatable_response(
+        request, queryset, tables.QUOTATION_COLUMNS, tables.QUOTATION_SEARCH
+    )
 
-        try:
-            quantity = int(quantity_raw)
-            if quantity <= 0:
-                raise ValueError
-        except ValueError:
-            errors.append("Quantity must be a positive integer.")
-            quantity = None
 
-        try:
-            unit_price = Decimal(unit_price_raw)
-        except Exception:
-            errors.append("Unit price must be a number.")
-            unit_price = None
+QUOTATION_LINE_FIELDS = [
+    "product_id",
+    "quantity",
+    "unit_price",
+    "discount_percentage",
+    "tax_percentage",
+]
+QUOTATION_MAX_LINES = 1000
 
-        try:
-            discount_percentage = Decimal(discount_raw or 0)
-        except Exception:
-            errors.append("Discount must be a number.")
-            discount_percentage = None
 
-        try:
-            tax_percentage = Decimal(tax_raw or 0)
-        except Exception:
-            errors.append("Tax must be a number.")
-            tax_percentage = None
+def _quotation_form(request, quotation):
+    """Shared POST handling of the quotation create and edit forms. Returns
+    ``(errors, old, old_lines)``; nothing is saved unless ``errors`` is
+    empty."""
+    errors = []
+    reference = request.POST.get("reference", "").strip()
+    customer_id = request.POST.get("customer_id", "").strip()
+    status = request.POST.get("status", quotation.status).strip()
+    notes = request.POST.get("notes", "").strip()
 
-        if not reference:
-            errors.append("Reference is required.")
-        elif Quotation.objects.filter(reference=reference).exists():
-            errors.append("Reference must be unique.")
+    customer = None
+    if customer_id.isdigit():
+        customer = Customer.objects.filter(pk=customer_id).first()
+    if not customer:
+        errors.append("Customer is required.")
+
+    if not reference and not quotation._state.adding:
+        errors.append("Reference is required.")
+    elif (
+        reference
+        and Quotation.objects.filter(reference=reference)
+        .exclude(pk=quotation.pk)
+        .exists()
+    ):
+        errors.append("Reference must be unique.")
+
+    if status and status not in dict(Quotation.STATUS_CHOICES):
+        errors.append("Invalid status selected.")
+
+    lines, old_lines = _posted_lines(
+        request.POST,
+        errors,
+        QUOTATION_LINE_FIELDS,
+        quotations.QuoteLine,
+        min_quantity=1,
+        max_lines=QUOTATION_MAX_LINES,
+    )
 
-        if not product:
-            errors.append("Product is required.")
+    if not errors:
+        quotation.reference = reference or references.next_reference("quotation")
+        quotation.customer = customer
+        quotation.status = status or quotation.status
+        quotation.notes = notes or None
+        quotations.save(quotation, lines)
+
+    old = {
+        "reference": reference,
+        "customer_id": customer_id,
+        "status": status,
+        "notes": notes,
+    }
+    return errors, old, old_lines or [{}]
 
-        if not customer:
-            errors.append("Customer is required.")
 
-        if status and status not in dict(Quotation.STATUS_CHOICES):
-            errors.append("Invalid status selected.")
+@login_required
+def quotation_create(request):
+    errors = []
 
+    if request.method == "POST":
+        errors, old, old_lines = _quotation_form(request, Quotation())
         if not errors:
-            Quotation.objects.create(
-                reference=reference,
-                product=product,
-                customer=customer,
-                quantity=quantity,
-                unit_price=unit_price,
-                discount_percentage=discount_percentage or 0,
-                tax_percentage=tax_percentage or 0,
-                status=status or "pending",
-                notes=notes or None,
-            )
             messages.success(request, "Quotation created successfully!")
             return redirect("quotations_index")
-
-        old = {
-            "reference": reference,
-            "product_id": product_id,
-            "customer_id": customer_id,
-            "quantity": quantity_raw,
-            "unit_price": unit_price_raw,
-            "discount_percentage": discount_raw,
-            "tax_percentage": tax_raw,
-            "status": status,
-            "notes": notes,
-        }
     else:
-        old = {"quantity": "1", "status": "pending"}
+        old = {"status": "pending"}
+        old_lines = [{"quantity": "1"}]
 
+    _add_labels([old], "customers", "customer_id")
+    _add_labels(old_lines, "products", "product_id")
     context = {
         "errors": errors,
         "old": old,
-        "products": products,
-        "customers": customers,
+        "old_lines": old_lines,
         "status_choices": Quotation.STATUS_CHOICES,
     }
     return render(request, "quotations/add.html", context)
@@ -1607,111 +1798,37 @@ def quotation_create(request):
 @login_required
 def quotation_edit(request, pk):
     quotation = get_object_or_404(Quotation, pk=pk)
-    products = Product.objects.order_by("name")
-    customers = Customer.objects.order_by("name")
     errors = []
 
     if request.method == "POST":
-        reference = request.POST.get("reference", "").strip()
-        product_id = request.POST.get("product_id")
-        customer_id = request.POST.get("customer_id")
-        quantity_raw = request.POST.get("quantity", "1").strip()
-        unit_price_raw = request.POST.get("unit_price", "0").strip()
-        discount_raw = request.POST.get("discount_percentage", "0").strip()
-        tax_raw = request.POST.get("tax_percentage", "0").strip()
-        status = request.POST.get("status", quotation.status).strip()
-        notes = request.POST.get("notes", "").strip()
-
-        product = Product.objects.filter(pk=product_id).first()
-        customer = Customer.objects.filter(pk=customer_id).first()
-
-        try:
-            quantity = int(quantity_raw)
-            if quantity <= 0:
-                raise ValueError
-        except ValueError:
-            errors.append("Quantity must be a positive integer.")
-            quantity = None
-
-        try:
-            unit_price = Decimal(unit_price_raw)
-        except Exception:
-            errors.append("Unit price must be a number.")
-            unit_price = None
-
-        try:
-            discount_percentage = Decimal(discount_raw or 0)
-        except Exception:
-            errors.append("Discount must be a number.")
-            discount_percentage = None
-
-        try:
-            tax_percentage = Decimal(tax_raw or 0)
-        except Exception:
-            errors.append("Tax must be a number.")
-            tax_percentage = None
-
-        if not reference:
-            errors.append("Reference is required.")
-        elif (
-            Quotation.objects.filter(reference=reference)
-            .exclude(pk=quotation.pk)
-            .exists()
-        ):
-            errors.append("Reference must be unique.")
-
-        if not product:
-            errors.append("Product is required.")
-
-        if not customer:
-            errors.append("Customer is required.")
-
-        if status and status not in dict(Quotation.STATUS_CHOICES):
-            errors.append("Invalid status selected.")
-
+        errors, old, old_lines = _quotation_form(request, quotation)
         if not errors:
-            quotation.reference = reference
-            quotation.product = product
-            quotation.customer = customer
-            quotation.quantity = quantity
-            quotation.unit_price = unit_price
-            quotation.discount_percentage = discount_percentage or 0
-            quotation.tax_percentage = tax_percentage or 0
-            quotation.status = status or quotation.status
-            quotation.notes = notes or None
-            quotation.save()
             messages.success(request, "Quotation updated successfully!")
             return redirect("quotations_index")
-
-        old = {
-            "reference": reference,
-            "product_id": product_id,
-            "customer_id": customer_id,
-            "quantity": quantity_raw,
-            "unit_price": unit_price_raw,
-            "discount_percentage": discount_raw,
-            "tax_percentage": tax_raw,
-            "status": status,
-            "notes": notes,
-        }
     else:
         old = {
             "reference": quotation.reference,
-            "product_id": quotation.product_id,
-            "customer_id": quotation.customer_id,
-            "quantity": quotation.quantity,
-            "unit_price": quotation.unit_price,
-            "discount_percentage": quotation.discount_percentage,
-            "tax_percentage": quotation.tax_percentage,
+            "customer_id": str(quotation.customer_id),
             "status": quotation.status,
             "notes": quotation.notes or "",
         }
-
+        old_lines = [
+            {
+                "product_id": str(line.product_id),
+                "quantity": line.quantity,
+                "unit_price": line.unit_price,
+                "discount_percentage": line.discount_percentage,
+                "tax_percentage": line.tax_percentage,
+            }
+            for line in quotation.lines.order_by("pk")
+        ] or [{"quantity": "1"}]
+
+    _add_labels([old], "customers", "customer_id")
+    _add_labels(old_lines, "products", "product_id")
     context = {
         "errors": errors,
         "old": old,
-        "products": products,
-        "customers": customers,
+        "old_lines": old_lines,
         "quotation": quotation,
         "status_choices": Quotation.STATUS_CHOICES,
     }
@@ -1734,21 +1851,70 @@ def quotation_delete(request, pk):
 
 @login_required
 def purchases_index(request):
-    purchases = Purchase.objects.select_related("supplier", "product").order_by(
-        "-purchase_date", "-created_at"
+    context = {
+        "status_choices": Purchase.StatusChoices.choices,
+        "payment_status_choices": Purchase.PaymentStatusChoices.choices,
+    }
+    return render(request, "purchases/list.html", context)
+
+
+@login_required
+def purchases_data(request):
+    # Lines of purchase orders are listed on their order instead.
+    purchases = (
+        Purchase.objects.filter(order__isnull=True)
+        .select_related("supplier", "product")
+        .order_by("-purchase_date", "-created_at")
     )
-    return render(request, "purchases/list.html", {"purchases": purchases})
+    status = request.GET.get("status")
+    if status in Purchase.StatusChoices.values:
+        purchases = purchases.filter(status=status)
+    payment_status = request.GET.get("payment_status")
+    if payment_status == "outstanding":
+        purchases = purchases.exclude(payment_status=Purchase.PaymentStatusChoices.PAID)
+    elif payment_status in Purchase.PaymentStatusChoices.values:
+        purchases = purchases.filter(payment_status=payment_status)
+    try:
+        if request.GET.get("since"):
+            since = datetime.strptime(request.GET["since"], "%Y-%m-%d").date()
+            purchases = purchases.filter(purchase_date__gte=since)
+        if request.GET.get("until"):
+            until = datetime.strptime(request.GET["until"], "%Y-%m-%d").date()
+            purchases = purchases.filter(purchase_date__lte=until)
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD."}, status=400)
+    return datatable_response(
+        request, purchases, tables.PURCHASE_COLUMNS, tables.PURCHASE_SEARCH
+    )
+
+
+def _posted_choice(post, model, label, errors):
+    """The ``model`` row picked in a form, by primary key from
+    ``<label>_id``. Clients that still post ``<label>_name`` are resolved
+    through :func:`mainapp.names.resolve`; a name shared by several rows
+    is an error rather than a guess."""
+    pk = post.get(f"{label}_id", "").strip()
+    name = post.get(f"{label}_name", "").strip()
+    if not pk and name:
+        resolution = names.resolve(model, [name])
+        if resolution.ambiguous:
+            errors.append(f'Several {label}s are named "{name}"; select one from the list.')
+            return None
+        pk = str(resolution.found.get(name, ""))
+    if not pk and not name:
+        errors.append(f"{label.capitalize()} is required.")
+        return None
+    instance = model.objects.filter(pk=pk).first() if pk.isdigit() else None
+    if instance is None:
+        errors.append(f"Selected {label} does not exist.")
+    return instance
 
 
 @login_required
 def purchase_create(request):
-    suppliers = Supplier.objects.all().order_by("name")
-    products = Product.objects.all().order_by("name")
     errors = []
 
     if request.method == "POST":
-        supplier_name = request.POST.get("supplier_name", "").strip()
-        product_name = request.POST.get("product_name", "").strip()
         purchase_date = request.POST.get("purchase_date", "").strip()
         quantity = request.POST.get("quantity", "").strip()
         unit_price = request.POST.get("unit_price", "").strip()
@@ -1758,10 +1924,8 @@ def purchase_create(request):
         paid_amount = request.POST.get("paid_amount", "").strip()
         description = request.POST.get("description", "").strip()
 
-        if not supplier_name:
-            errors.append("Supplier name is required.")
-        if not product_name:
-            errors.append("Product name is required.")
+        supplier = _posted_choice(request.POST, Supplier, "supplier", errors)
+        product = _posted_choice(request.POST, Product, "product", errors)
         if not purchase_date:
             errors.append("Purchase date is required.")
         if not quantity:
@@ -1774,17 +1938,11 @@ def purchase_create(request):
             errors.append("Tax rate is required.")
         if not status:
             errors.append("Status is required.")
+        elif status not in Purchase.StatusChoices.values:
+            errors.append("Invalid status selected.")
         if paid_amount == "":
             errors.append("Paid amount is required.")
 
-        supplier = Supplier.objects.filter(name=supplier_name).first()
-        if not supplier:
-            errors.append("Selected supplier does not exist.")
-
-        product = Product.objects.filter(name=product_name).first()
-        if not product:
-            errors.append("Selected product does not exist.")
-
         try:
             quantity_val = int(quantity)
             if quantity_val < 0:
@@ -1829,11 +1987,12 @@ def purchase_create(request):
             payment_status = Purchase.PaymentStatusChoices.PAID
 
         if not errors:
+            reference = references.next_reference("purchase")
             with transaction.atomic():
                 Purchase.objects.create(
                     supplier=supplier,
                     product=product,
-                    reference=str(Purchase.objects.count() + 1),
+                    reference=reference,
                     purchase_date=purchase_date,
                     quantity=quantity_val,
                     unit_price=unit_price_val,
@@ -1852,8 +2011,8 @@ def purchase_create(request):
             return redirect("purchases_index")
 
         old = {
-            "supplier_name": supplier_name,
-            "product_name": product_name,
+            "supplier_id": str(supplier.pk) if supplier else "",
+            "product_id": str(product.pk) if product else "",
             "purchase_date": purchase_date,
             "quantity": quantity,
             "unit_price": unit_price,
@@ -1867,11 +2026,11 @@ def purchase_create(request):
         errors = []
         old = {}
 
+    _add_labels([old], "suppliers", "supplier_id")
+    _add_labels([old], "products", "product_id")
     context = {
         "errors": errors,
         "old": old,
-        "suppliers": suppliers,
-        "products": products,
     }
     return render(request, "purchases/add.html", context)
 
@@ -1879,13 +2038,9 @@ def purchase_create(request):
 @login_required
 def purchase_edit(request, pk):
     purchase = get_object_or_404(Purchase, pk=pk)
-    suppliers = Supplier.objects.all().order_by("name")
-    products = Product.objects.all().order_by("name")
     errors = []
 
     if request.method == "POST":
-        supplier_name = request.POST.get("supplier_name", "").strip()
-        product_name = request.POST.get("product_name", "").strip()
         purchase_date = request.POST.get("purchase_date", "").strip()
         quantity = request.POST.get("quantity", "").strip()
         unit_price = request.POST.get("unit_price", "").strip()
@@ -1895,10 +2050,8 @@ def purchase_edit(request, pk):
         paid_amount = request.POST.get("paid_amount", "").strip()
         description = request.POST.get("description", "").strip()
 
-        if not supplier_name:
-            errors.append("Supplier name is required.")
-        if not product_name:
-            errors.append("Product name is required.")
+        supplier = _posted_choice(request.POST, Supplier, "supplier", errors)
+        product = _posted_choice(request.POST, Product, "product", errors)
         if not purchase_date:
             errors.append("Purchase date is required.")
         if not quantity:
@@ -1911,16 +2064,11 @@ def purchase_edit(request, pk):
             errors.append("Tax rate is required.")
         if not status:
             errors.append("Status is required.")
+        elif status not in Purchase.StatusChoices.values:
+            errors.append("Invalid status selected.")
         if paid_amount == "":
             errors.append("Paid amount is required.")
 
-        supplier = Supplier.objects.filter(name=supplier_name).first()
-        if not supplier:
-            errors.append("Selected supplier does not exist.")
-        product = Product.objects.filter(name=product_name).first()
-        if not product:
-            errors.append("Selected product does not exist.")
-
         try:
             quantity_val = int(quantity)
             if quantity_val < 0:
@@ -1980,13 +2128,15 @@ def purchase_edit(request, pk):
                 purchase.description = description or None
                 purchase.payment_status = payment_status
                 purchase.save()
+                if purchase.order_id:
+                    orders.refresh_totals([purchase.order_id])
 
             messages.success(request, "Purchase updated successfully!")
             return redirect("purchases_index")
 
         old = {
-            "supplier_name": supplier_name,
-            "product_name": product_name,
+            "supplier_id": str(supplier.pk) if supplier else "",
+            "product_id": str(product.pk) if product else "",
             "purchase_date": purchase_date,
             "quantity": quantity,
             "unit_price": unit_price,
@@ -1998,8 +2148,8 @@ def purchase_edit(request, pk):
         }
     else:
         old = {
-            "supplier_name": purchase.supplier.name if purchase.supplier else "",
-            "product_name": purchase.product.name if purchase.product else "",
+            "supplier_id": str(purchase.supplier_id or ""),
+            "product_id": str(purchase.product_id or ""),
             "purchase_date": purchase.purchase_date,
             "quantity": purchase.quantity,
             "unit_price": purchase.unit_price,
@@ -2010,12 +2160,12 @@ def purchase_edit(request, pk):
             "description": purchase.description or "",
         }
 
+    _add_labels([old], "suppliers", "supplier_id")
+    _add_labels([old], "products", "product_id")
     context = {
         "errors": errors,
         "old": old,
         "purchase": purchase,
-        "suppliers": suppliers,
-        "products": products,
     }
     return render(request, "purchases/edit.html", context)
 
@@ -2023,11 +2173,11 @@ def purchase_edit(request, pk):
 @login_required
 def purchase_delete(request, pk):
     purchase = get_object_or_404(Purchase, pk=pk)
-    if request.method == "POST":
+    with transaction.atomic():
         purchase.delete()
-        messages.success(request, "Purchase deleted successfully.")
-        return redirect("purchases_index")
-    purchase.delete()
+        # A line of an order: its totals and payment status follow.
+        if purchase.order_id:
+            orders.refresh_totals([purchase.order_id])
     messages.success(request, "Purchase deleted successfully.")
     return redirect("purchases_index")
 
@@ -2057,34 +2207,260 @@ def purchase_adjust_quantity(request):
         messages.error(request, "Invalid purchase ID.")
         return redirect("purchases_index")
 
-    with transaction.atomic():
-        purchase = get_object_or_404(
-            Purchase.objects.select_related("product"), pk=purchase_id_int
-        )
-        product = purchase.product
-        if not product:
-            messages.error(request, "This purchase has no product attached.")
+    purchase = get_object_or_404(Purchase, pk=purchase_id_int)
+    if not purchase.product_id:
+        messages.error(request, "This purchase has no product attached.")
+        return redirect("purchases_index")
+
+    if not purchase.is_quantity_added_to_product:
+        stock.receive([purchase.pk])
+        messages.success(request, "Product quantity incremented successfully!")
+    else:
+        result = stock.unreceive([purchase.pk])[purchase.pk]
+        if result == stock.Line.INSUFFICIENT_STOCK:
+            messages.warning(request, "Not enough stock to remove this purchase!")
             return redirect("purchases_index")
+        messages.success(request, "Product quantity decremented successfully!")
+
+    return redirect("purchases_index")
+
+
+BULK_RECEIVE_LIMIT = 5000
+
+
+@login_required
+def purchases_bulk_receive(request):
+    """Receive or reverse many purchases at once.
+
+    Takes ``purchase_ids`` (repeated) and ``action`` (``receive`` or
+    ``unreceive``). Answers JSON with one result per purchase when asked
+    for (``Accept: application/json``), otherwise sums the results up in
+    a message on the purchase list, or on the local page posted as
+    ``next``.
+    """
+    wants_json = "application/json" in request.headers.get("Accept", "")
+    back = request.POST.get("next", "")
+    if not url_has_allowed_host_and_scheme(
+        back, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        back = "purchases_index"
+    if request.method != "POST":
+        if wants_json:
+            return JsonResponse({"error": "POST required."}, status=405)
+        messages.error(request, "Invalid request method.")
+        return redirect("purchases_index")
+
+    action = request.POST.get("action")
+    try:
+        purchase_ids = [int(value) for value in request.POST.getlist("purchase_ids")]
+    except ValueError:
+        purchase_ids = None
+    error = None
+    if action not in ("receive", "unreceive"):
+        error = "Unknown action."
+    elif not purchase_ids:
+        error = "Select at least one purchase."
+    elif len(purchase_ids) > BULK_RECEIVE_LIMIT:
+        error = f"At most {BULK_RECEIVE_LIMIT} purchases can be processed at once."
+    if error:
+        if wants_json:
+            return JsonResponse({"error": error}, status=400)
+        messages.error(request, error)
+        return redirect(back)
+
+    apply = stock.receive if action == "receive" else stock.unreceive
+    results = apply(purchase_ids)
+
+    if wants_json:
+        return JsonResponse(
+            {
+                "action": action,
+                "results": [
+                    {"id": purchase_id, "status": status}
+                    for purchase_id, status in sorted(results.items())
+                ],
+            }
+        )
+
+    counts = {}
+    for status in results.values():
+        counts[status] = counts.get(status, 0) + 1
+    summary = ", ".join(
+        f"{count} {status.replace('_', ' ')}" for status, count in sorted(counts.items())
+    )
+    done = counts.get(stock.Line.RECEIVED, 0) + counts.get(stock.Line.REVERSED, 0)
+    failed = [
+        purchase_id
+        for purchase_id, status in results.items()
+        if status in (stock.Line.INSUFFICIENT_STOCK, stock.Line.NO_PRODUCT)
+    ]
+    if failed:
+        failed_references = Purchase.objects.filter(pk__in=failed).values_list(
+            "reference", flat=True
+        )
+        messages.warning(
+            request, f"{summary}. Not applied: {', '.join(sorted(failed_references))}."
+        )
+    elif done:
+        messages.success(request, f"Stock updated: {summary}.")
+    else:
+        messages.info(request, f"Nothing to change: {summary}.")
+    return redirect(back)
+
+
+PURCHASE_ORDER_MAX_LINES = 1000
+
+
+@login_required
+def purchase_orders_index(request):
+    return render(request, "purchase_orders/list.html")
+
+
+@login_required
+def purchase_orders_data(request):
+    purchase_orders = PurchaseOrder.objects.select_related("supplier").order_by(
+        "-order_date", "-created_at"
+    )
+    return datatable_response(
+        request,
+        purchase_orders,
+        tables.PURCHASE_ORDER_COLUMNS,
+        tables.PURCHASE_ORDER_SEARCH,
+    )
+
+
+@login_required
+def purchase_order_create(request):
+    errors = []
+    old = {}
+    old_lines = [{}]
+
+    if request.method == "POST":
+        supplier_id = request.POST.get("supplier_id", "").strip()
+        order_date = request.POST.get("order_date", "").strip()
+        status = request.POST.get("status", "pending").strip()
+        paid_amount = request.POST.get("paid_amount", "").strip()
+        description = request.POST.get("description", "").strip()
+
+        supplier = None
+        if supplier_id.isdigit():
+            supplier = Supplier.objects.filter(pk=supplier_id).first()
+        if not supplier:
+            errors.append("Select an existing supplier.")
+
+        order_date_val = parse_date(order_date) if order_date else None
+        if order_date_val is None:
+            errors.append("A valid order date is required.")
+
+        if status not in Purchase.StatusChoices.values:
+            errors.append("Select a valid status.")
+
+        try:
+            paid_amount_val = Decimal(paid_amount or "0")
+            if not paid_amount_val.is_finite() or paid_amount_val < 0:
+                raise ValueError
+        except Exception:
+            errors.append("Paid amount must be a number of at least 0.")
+            paid_amount_val = Decimal("0")
+
+        lines, old_lines = _posted_lines(
+            request.POST,
+            errors,
+            ["product_id", "quantity", "unit_price", "discount", "tax_rate"],
+            OrderLine,
+            max_lines=PURCHASE_ORDER_MAX_LINES,
+        )
+
+        if lines and not errors:
+            _, totals = orders.price(lines)
+            if paid_amount_val > totals["total"]:
+                errors.append("Paid amount cannot exceed the order total.")
+
+        if not errors:
+            order = orders.create(
+                supplier,
+                order_date_val,
+                lines,
+                status=status,
+                paid_amount=paid_amount_val,
+                description=description,
+            )
+            messages.success(
+                request,
+                f"Purchase order {order.reference} created with {order.line_count} lines.",
+            )
+            return redirect("purchase_orders_detail", pk=order.pk)
+
+        old = {
+            "supplier_id": supplier_id,
+            "order_date": order_date,
+            "status": status,
+            "paid_amount": paid_amount,
+            "description": description,
+        }
+        old_lines = old_lines or [{}]
 
-        if not purchase.is_quantity_added_to_product:
+    _add_labels([old], "suppliers", "supplier_id")
+    _add_labels(old_lines, "products", "product_id")
+    context = {
+        "errors": errors,
+        "old": old,
+        "old_lines": old_lines,
+        "statuses": Purchase.StatusChoices.choices,
+    }
+    return render(request, "purchase_orders/add.html", context)
+
+
+@login_required
+def purchase_order_detail(request, pk):
+    order = get_object_or_404(
+        PurchaseOrder.objects.select_related("supplier"), pk=pk
+    )
 
-            product.quantity += purchase.quantity
-            product.save(update_fields=["quantity"])
-            purchase.is_quantity_added_to_product = True
-            purchase.save(update_fields=["is_quantity_added_to_product"])
-            messages.success(request, "Product quantity incremented successfully!")
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "payment":
+            try:
+                paid_amount = Decimal(request.POST.get("paid_amount", "").strip())
+                if not paid_amount.is_finite() or paid_amount < 0:
+                    raise ValueError
+            except Exception:
+                messages.error(request, "Paid amount must be a number of at least 0.")
+            else:
+                if paid_amount > order.total:
+                    messages.error(request, "Paid amount cannot exceed the order total.")
+                else:
+                    orders.set_payment(order, paid_amount)
+                    messages.success(request, "Payment updated.")
+        elif action == "status":
+            status = request.POST.get("status", "")
+            if status in Purchase.StatusChoices.values:
+                orders.set_status(order, status)
+                messages.success(request, "Status updated.")
+            else:
+                messages.error(request, "Select a valid status.")
         else:
+            messages.error(request, "Unknown action.")
+        return redirect("purchase_orders_detail", pk=order.pk)
 
-            if product.quantity < purchase.quantity:
-                messages.warning(request, "Not enough stock to remove this purchase!")
-                return redirect("purchases_index")
-            product.quantity -= purchase.quantity
-            product.save(update_fields=["quantity"])
-            purchase.is_quantity_added_to_product = False
-            purchase.save(update_fields=["is_quantity_added_to_product"])
-            messages.success(request, "Product quantity decremented successfully!")
+    lines = order.lines.select_related("product").order_by("pk")
+    context = {
+        "order": order,
+        "lines": lines,
+        "statuses": Purchase.StatusChoices.choices,
+    }
+    return render(request, "purchase_orders/detail.html", context)
 
-    return redirect("purchases_index")
+
+@login_required
+def purchase_order_delete(request, pk):
+    order = get_object_or_404(PurchaseOrder, pk=pk)
+    if request.method != "POST":
+        messages.error(request, "Invalid request method.")
+        return redirect("purchase_orders_index")
+    orders.delete(order)
+    messages.success(request, "Purchase order deleted successfully.")
+    return redirect("purchase_orders_index")
 
 
 @login_required
@@ -0,0 +1,208 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "</Relationships>"
+)
+
+# Cell formats, by index: 0 default, 1 title, 2 header, 3 body.
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="3">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="16"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="12"/><color rgb="00FFFFFF"/><name val="Calibri"/></font>'
+    "</fonts>"
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="004CAF50"/><bgColor rgb="004CAF50"/></patternFill></fill>'
+    "</fills>"
+    '<borders count="2">'
+    "<border><left/><right/><top/><bottom/><diagonal/></border>"
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    "</borders>"
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="2" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    "</cellXfs>"
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+SHEET_HEAD_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+
+TITLE_STYLE = 1
+HEADER_STYLE = 2
+BODY_STYLE = 3
+
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
+
+class _ChunkBuffer:
+    # Write-only sink for ZipFile; the stream has no tell()/seek(), so
+    # zipfile falls back to data descriptors and never rewinds.
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+class XlsxStreamWriter:
+    """Single-sheet XLSX writer that yields the file as it is produced.
+
+    Rows are written as inline strings straight into a deflate stream, so
+    memory stays flat regardless of row count. Column widths are sized from
+    the header and the first ``width_sample`` rows, which are the only rows
+    held in memory at any point.
+    """
+
+    flush_size = 64 * 1024
+    max_width = 50
+
+    def __init__(self, title, headers, width_sample=1000):
+        self.title = title
+        self.headers = [str(h) for h in headers]
+        self.width_sample = width_sample
+        self.num_cols = len(self.headers)
+        self.letters = [get_column_letter(i) for i in range(1, self.num_cols + 1)]
+        self.row_count = 0
+
+    def _cell(self, ref, value, style):
+        if value is None or value == "":
+            return f'<c r="{ref}" s="{style}"/>'
+        text = escape(ILLEGAL_CHARACTERS_RE.sub("", str(value)))
+        return (
+            f'<c r="{ref}" s="{style}" t="inlineStr">'
+            f'<is><t xml:space="preserve">{text}</t></is></c>'
+        )
+
+    def _row(self, row_num, values, style):
+        cells = "".join(
+            self._cell(f"{letter}{row_num}", value, style)
+            for letter, value in zip(self.letters, values)
+        )
+        return f'<row r="{row_num}">{cells}</row>'
+
+    def _cols(self, sample):
+        widths = [len(h) for h in self.headers]
+        for row in sample:
+            for i, value in enumerate(row):
+                length = len(str(value))
+                if length > widths[i]:
+                    widths[i] = length
+        cols = "".join(
+            f'<col min="{i}" max="{i}" width="{min(w + 2, self.max_width)}" customWidth="1"/>'
+            for i, w in enumerate(widths, 1)
+        )
+        return f"<cols>{cols}</cols>"
+
+    def iter_bytes(self, rows, footer=None):
+        """Yield the XLSX file for ``rows``; ``footer(row_count)`` returns the
+        text written under the table once all rows are known."""
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+            zf.writestr("_rels/.rels", ROOT_RELS_XML)
+            zf.writestr(
+                "xl/workbook.xml",
+                WORKBOOK_XML.format(title=escape(self.title[:31], {'"': "&quot;"})),
+            )
+            zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+            zf.writestr("xl/styles.xml", STYLES_XML)
+            yield buffer.drain()
+
+            rows = iter(rows)
+            sample = []
+            for row in rows:
+                sample.append(row)
+                if len(sample) >= self.width_sample:
+                    break
+
+            # The sheet's size is not known up front; without ZIP64 from
+            # the start, zipfile refuses to write past 2 GiB.
+            with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+                sheet.write(SHEET_HEAD_XML.encode())
+                sheet.write(self._cols(sample).encode())
+                sheet.write(b"<sheetData>")
+                sheet.write(self._row(1, [self.title], TITLE_STYLE).encode())
+                sheet.write(self._row(3, self.headers, HEADER_STYLE).encode())
+
+                row_num = 4
+                for source in (sample, rows):
+                    for row in source:
+                        sheet.write(self._row(row_num, row, BODY_STYLE).encode())
+                        row_num += 1
+                        if buffer.size >= self.flush_size:
+                            yield buffer.drain()
+                sample = None
+                self.row_count = row_num - 4
+
+                if footer is not None:
+                    sheet.write(
+                        self._row(row_num + 1, [footer(self.row_count)], 0).encode()
+                    )
+                sheet.write(b"</sheetData>")
+                if self.num_cols > 1:
+                    sheet.write(
+                        f'<mergeCells count="1"><mergeCell ref="A1:{self.letters[-1]}1"/></mergeCells>'.encode()
+                    )
+                sheet.write(b"</worksheet>")
+        yield buffer.drain()